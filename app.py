@@ -1,21 +1,45 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from datetime import datetime
 import os
+import io
+import csv
 import json
-from typing import Optional
+import re
+from typing import List, Optional
 import uvicorn
-from termcolor import colored
-from crewai import Crew, Process
+from logging_setup import get_logger
 import shutil
+import logging
+import threading
+import asyncio
 
 # Import the lead generation script
-from main import create_tasks
-from web_tools import WebTools
+from main import arun_pipeline, run_pipeline
+from batch_runner import BATCH_CONCURRENCY, BatchRunner, parse_entries
+from web_tools import WebTools, CSV_FIELDNAMES
+from driver_pool import get_default_pool
+from page_readiness import get_default_readiness
+from http_fetcher import get_default_fetcher
+from async_fetcher import get_default_async_fetcher
+from page_cache import get_default_cache
+from contact_probe import get_default_prober
+from politeness import get_default_scheduler
+from chrome_profile import get_default_profile
+from replay import open_tape
+from metrics import get_default_metrics
+from lead_store import get_default_lead_store
+from llm_cache import get_default_llm_cache, get_default_usage_tracker
+from job_manager import JOB_RUNNER, AsyncJobManager, Job, JobManager, JobCancelled, QueueFull
+from event_stream import sse_stream
+from csv_stream import StreamingCsvWriter
+from qualification import normalize_url
+
+logger = get_logger(__name__)
 
 app = FastAPI()
 
@@ -34,110 +58,167 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variable to store job status
-current_job_status = {
-    "is_running": False,
-    "current_agent": None,
-    "current_task": None,
-    "error": None,
-    "csv_path": None
-}
-
 class SearchParams(BaseModel):
     query: str
     num_prospects: int
+    parallel_qualification: Optional[bool] = None
+    pipeline_mode: Optional[str] = None  # "crew" or "lean"
 
-def run_lead_generation(search_params: SearchParams):
-    """Run the lead generation process"""
-    try:
-        global current_job_status
-        current_job_status["is_running"] = True
-        current_job_status["error"] = None
-        current_job_status["csv_path"] = None
-        current_job_status["current_agent"] = "Initializing"
-        current_job_status["current_task"] = "Setting up environment"
+class BatchQuery(BaseModel):
+    query: str
+    num_prospects: Optional[int] = None
+    pipeline_mode: Optional[str] = None
+    parallel_qualification: Optional[bool] = None
 
+class BatchParams(BaseModel):
+    queries: List[BatchQuery]
+    concurrency: Optional[int] = None
+    pipeline_mode: Optional[str] = None
+    batch_id: Optional[str] = None  # Resume an earlier batch
+
+class LeadGenerationRun:
+    """Output file, streaming CSV and tools for one lead generation job, shared by both job runners"""
+
+    def __init__(self, job: Job):
+        self.job = job
+        search_params = job.params
         # Create a safe filename from the query
         safe_query = "".join(c for c in search_params.query if c.isalnum() or c in (' ', '-', '_')).rstrip()
         safe_query = safe_query.replace(' ', '_')[:50]  # Limit filename length
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_filename = f"{safe_query}_leads_{timestamp}.csv"
-        output_file = os.path.join('static', 'downloads', csv_filename)
+        self.csv_filename = f"{safe_query}_leads_{timestamp}_{job.id[:8]}.csv"
+        self.output_file = os.path.join('static', 'downloads', self.csv_filename)
 
         # Ensure the downloads directory exists
         os.makedirs(os.path.join('static', 'downloads'), exist_ok=True)
 
-        # Initialize tools
-        web_tools = WebTools()
+        # Prospects are appended to the CSV as soon as they are researched
+        self.csv_writer = StreamingCsvWriter(
+            self.output_file,
+            CSV_FIELDNAMES,
+            defaults={"Search Query": search_params.query},
+            key_func=normalize_url,
+            on_row=lambda row, count: stream_row(job, row, count)
+        )
+        job.results = self.csv_writer
+
+        # Initialize tools with a driver checked out of the shared pool
+        self.web_tools = WebTools(pool=get_default_pool(), csv_writer=self.csv_writer, job_id=job.id,
+                                  tape=open_tape(job.id))
+
+    def pipeline_args(self):
+        """Arguments for run_pipeline / arun_pipeline"""
+        job = self.job
+        search_params = job.params
 
-        # Create tasks with the filename
-        tasks = create_tasks(web_tools, search_params.query, search_params.num_prospects, output_file)
+        def on_stage(name, description):
+            """Report each lean pipeline stage"""
+            job.check_cancelled()
+            job.update(current_agent=name, current_task=description)
 
         def process_step(step):
-            """Process each step and update status"""
-            update_status(step)
-            # Print detailed step information for debugging
-            if hasattr(step, 'agent'):
-                print(colored("\n# Agent: " + step.agent.role, "yellow"))
-                if hasattr(step, 'task'):
-                    print(colored("## Task: " + step.task.description.split(chr(10))[0], "yellow"))
-                if hasattr(step, 'tool'):
-                    print(colored("## Using tool: " + step.tool, "yellow"))
-                if hasattr(step, 'tool_input'):
-                    print(colored("## Tool Input: \n" + str(step.tool_input), "yellow"))
-                if hasattr(step, 'tool_output'):
-                    print(colored("## Tool Output: \n" + str(step.tool_output), "yellow"))
-
-        # Create and run crew
-        crew = Crew(
-            agents=[task.agent for task in tasks],
-            tasks=tasks,
-            process=Process.sequential,
-            verbose=True,
+            """Process each crew step and update status"""
+            job.check_cancelled()
+            update_status(job, step)
+            publish_step(job, step)
+            log_step(step)
+
+        return dict(
+            web_tools=self.web_tools,
+            search_query=search_params.query,
+            num_prospects=search_params.num_prospects,
+            output_file=self.output_file,
+            mode=search_params.pipeline_mode,
+            job_id=job.id,
+            parallel_qualification=search_params.parallel_qualification,
+            on_stage=on_stage,
             step_callback=process_step
         )
 
-        # Execute the tasks
-        result = crew.kickoff()
+    def complete(self):
+        self.job.check_cancelled()
+
+        # Rows streamed during research are kept even if the agent never saved the file
+        self.csv_writer.finalize()
 
         # Update status with CSV path
-        if os.path.exists(output_file):
-            current_job_status["csv_path"] = f"/static/downloads/{csv_filename}"
-            current_job_status["is_running"] = False
-            current_job_status["current_agent"] = "Completed"
-            current_job_status["current_task"] = "Task finished - CSV file ready for download"
-            print(colored(f"CSV file created successfully: {csv_filename}", "green"))
+        if os.path.exists(self.output_file):
+            self.job.update(
+                csv_path=f"/static/downloads/{self.csv_filename}",
+                current_agent="Completed",
+                current_task="Task finished - CSV file ready for download"
+            )
+            logger.success(f"CSV file created successfully: {self.csv_filename}")
         else:
             raise Exception("CSV file was not created successfully")
 
+    def fail(self, error):
+        if not isinstance(error, (JobCancelled, asyncio.CancelledError)):
+            logger.error(f"Error in lead generation: {str(error)}")
+        save_partial_results(self.job, self.csv_writer, self.csv_filename)
+
+def run_lead_generation(job: Job):
+    """Run the lead generation process for a queued job on a worker thread"""
+    run = LeadGenerationRun(job)
+    try:
+        run_pipeline(**run.pipeline_args())
+        run.complete()
     except Exception as e:
-        current_job_status["error"] = str(e)
-        current_job_status["is_running"] = False
-        current_job_status["current_agent"] = "Error"
-        current_job_status["current_task"] = f"Error: {str(e)}"
-        print(colored(f"Error in lead generation: {str(e)}", "red"))
-        raise HTTPException(status_code=500, detail=str(e))
+        run.fail(e)
+        raise
+    finally:
+        run.web_tools.cleanup()
+
+async def arun_lead_generation(job: Job):
+    """Run the lead generation process for a queued job on the event loop, with the async tools"""
+    # Opening the CSV and tape, and finalizing them, touch the disk, so they run on worker threads
+    run = await asyncio.to_thread(LeadGenerationRun, job)
+    try:
+        await arun_pipeline(**run.pipeline_args())
+        await asyncio.to_thread(run.complete)
+    except (Exception, asyncio.CancelledError) as e:
+        await asyncio.to_thread(run.fail, e)
+        raise
     finally:
-        if 'web_tools' in locals():
-            web_tools.cleanup()
-            print(colored("Closing Chrome WebDriver...", "cyan"))
+        await run.web_tools.acleanup()
+
+def log_step(step):
+    """Log crew step details at debug level; tool inputs and outputs are truncated and sampled"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug(
+        f"Crew step: {type(step).__name__}",
+        tool=getattr(step, 'tool', None),
+        tool_input=getattr(step, 'tool_input', None),
+        # Objects are only turned into (truncated) text by the log writer thread
+        tool_output=getattr(step, 'tool_output', None) or getattr(step, 'result', None),
+        payload=True
+    )
+
+def stream_row(job: Job, row, count):
+    """Report a prospect appended to the job's CSV"""
+    job.update(prospects_written=count)
+    job.publish("row", row={field: row.get(field, "") for field in CSV_FIELDNAMES})
 
-def update_status(step):
-    """Update the current job status based on the crew step"""
-    global current_job_status
+def save_partial_results(job: Job, csv_writer, csv_filename):
+    """Keep the rows streamed before a job failed or was cancelled"""
     try:
-        # Print raw step information for debugging
-        print(colored("\nRaw Step Info:", "blue"))
-        print(colored(f"Step type: {type(step)}", "blue"))
-        print(colored(f"Step attributes: {dir(step)}", "blue"))
+        if csv_writer.finalize():
+            job.update(csv_path=f"/static/downloads/{csv_filename}", partial_results=True)
+            logger.warning(f"Saved partial results: {csv_filename}")
+    except Exception as e:
+        logger.error(f"Error saving partial results: {str(e)}")
 
+def update_status(job: Job, step):
+    """Update a job's status based on the crew step"""
+    try:
         # Set agent name
         if hasattr(step, 'agent') and step.agent:
-            current_job_status["current_agent"] = step.agent.role
+            job.update(current_agent=step.agent.role)
         elif hasattr(step, 'text') and 'Agent:' in step.text:
             # Extract agent name from text if available
             agent_text = step.text.split('Agent:')[1].split('\n')[0].strip()
-            current_job_status["current_agent"] = agent_text
+            job.update(current_agent=agent_text)
             
         # Set task description
         if hasattr(step, 'task') and step.task:
@@ -145,26 +226,87 @@ def update_status(step):
             if hasattr(step, 'tool') and step.tool:
                 tool_name = step.tool.replace('_', ' ').title()
                 task_desc = f"{task_desc} (Using {tool_name})"
-            current_job_status["current_task"] = task_desc
+            job.update(current_task=task_desc)
         elif hasattr(step, 'thought'):
-            current_job_status["current_task"] = f"Thinking: {step.thought[:100]}..."
+            job.update(current_task=f"Thinking: {step.thought[:100]}...")
         elif hasattr(step, 'text'):
-            current_job_status["current_task"] = f"Processing: {step.text[:100]}..."
+            job.update(current_task=f"Processing: {step.text[:100]}...")
         else:
-            current_job_status["current_task"] = "Processing task"
+            job.update(current_task="Processing task")
             
-        # Print status update for debugging
-        print(colored("\nStatus Update:", "green"))
-        print(colored(f"Agent: {current_job_status['current_agent']}", "green"))
-        print(colored(f"Task: {current_job_status['current_task']}", "green"))
+        if logger.isEnabledFor(logging.DEBUG):
+            status = job.to_dict()
+            logger.debug("Status update", job_id=job.id, agent=status['current_agent'], task=status['current_task'])
             
     except Exception as e:
-        print(colored(f"Error updating status: {str(e)}", "red"))
-        print(colored(f"Error traceback:", "red"))
-        import traceback
-        traceback.print_exc()
-        current_job_status["current_agent"] = "Error"
-        current_job_status["current_task"] = f"Error: {str(e)}"
+        logger.exception(f"Error updating status: {str(e)}")
+        job.update(current_agent="Error", current_task=f"Error: {str(e)}")
+
+def publish_step(job: Job, step):
+    """Push a crew step to the job's event subscribers"""
+    try:
+        job.publish(
+            "step",
+            agent=step.agent.role if getattr(step, 'agent', None) else None,
+            tool=getattr(step, 'tool', None),
+            tool_input=str(getattr(step, 'tool_input', ''))[:500] or None,
+            thought=str(getattr(step, 'thought', ''))[:500] or None,
+        )
+    except Exception as e:
+        logger.error(f"Error publishing step event: {str(e)}")
+
+def run_batch(job: Job):
+    """Run every query of a batch job, writing per-query and combined CSVs under static/downloads/batches"""
+    params = job.params
+    batch_id = params.batch_id or job.id
+    output_dir = os.path.join('static', 'downloads', 'batches', batch_id)
+
+    def on_progress(entry, event, counts):
+        job.update(
+            current_agent=f"Batch: {counts['done']} done, {counts['failed']} failed, {counts['pending']} pending",
+            current_task=f"Query {event}: {entry.query}",
+            batch_progress=counts
+        )
+        job.publish("batch", query=entry.query, event=event, **counts)
+
+    runner = BatchRunner(
+        parse_entries([query.dict() for query in params.queries]),
+        output_dir,
+        concurrency=params.concurrency or BATCH_CONCURRENCY,
+        pipeline_mode=params.pipeline_mode,
+        batch_id=batch_id,
+        on_progress=on_progress,
+        cancel_event=job.cancel_event
+    )
+    summary = runner.run()
+    job.check_cancelled()
+    job.update(
+        batch_id=batch_id,
+        batch_progress=runner.counts(),
+        csv_path=f"/static/downloads/batches/{batch_id}/{os.path.basename(runner.combined_file)}",
+        current_agent="Completed",
+        current_task=f"{summary['done']} of {summary['queries']} queries finished"
+    )
+
+# Job manager running lead generation jobs from a bounded queue, on the event loop unless JOB_RUNNER=thread
+job_manager = JobManager(run_lead_generation) if JOB_RUNNER == "thread" else AsyncJobManager(arun_lead_generation)
+# Batches are queued separately; each one runs its queries concurrently
+batch_manager = JobManager(run_batch, max_workers=1)
+
+@app.on_event("startup")
+async def start_workers():
+    """Start job workers and warm up the driver pool before the first job arrives"""
+    job_manager.start()
+    batch_manager.start()
+    threading.Thread(target=get_default_pool().warm_up, daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_workers():
+    """Cancel outstanding jobs, close the async HTTP client and quit all pooled Chrome drivers"""
+    job_manager.shutdown()
+    batch_manager.shutdown()
+    await get_default_async_fetcher().aclose()
+    get_default_pool().close()
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -172,18 +314,189 @@ async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/run")
-async def run(search_params: SearchParams, background_tasks: BackgroundTasks):
-    """Start the lead generation process"""
-    if current_job_status["is_running"]:
-        raise HTTPException(status_code=400, detail="A job is already running")
-    
-    background_tasks.add_task(run_lead_generation, search_params)
-    return {"message": "Job started successfully"}
+async def run(search_params: SearchParams):
+    """Queue a lead generation job"""
+    try:
+        job = job_manager.submit(search_params)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"message": "Job queued successfully", "job_id": job.id}
+
+@app.post("/batch")
+async def run_batch_queries(batch_params: BatchParams):
+    """Queue a batch of queries; pass an earlier batch_id to resume it"""
+    if not parse_entries([query.dict() for query in batch_params.queries]):
+        raise HTTPException(status_code=400, detail="No queries given")
+    if batch_params.batch_id and not re.fullmatch(r"[\w-]+", batch_params.batch_id):
+        raise HTTPException(status_code=400, detail="batch_id may only contain letters, digits, '-' and '_'")
+    try:
+        job = batch_manager.submit(batch_params)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"message": "Batch queued successfully", "job_id": job.id, "batch_id": batch_params.batch_id or job.id}
+
+@app.get("/batch/{job_id}")
+async def batch_status(job_id: str):
+    """Get the status of a batch job"""
+    job = batch_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return job.to_dict()
+
+@app.post("/batch/{job_id}/cancel")
+async def cancel_batch(job_id: str):
+    """Cancel a batch; running queries stop at their next step and can be resumed later"""
+    job = batch_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return job.to_dict()
+
+def job_status_with_usage(job: Job):
+    """Job status plus its LLM token, latency and cost counters per agent and its timing metrics"""
+    return {
+        **job.to_dict(),
+        "llm_usage": get_default_usage_tracker().for_job(job.id),
+        "metrics": get_default_metrics().for_job(job.id),
+    }
 
 @app.get("/status")
 async def status():
-    """Get the current job status"""
-    return current_job_status
+    """Get the status of the most recently submitted job"""
+    job = job_manager.latest()
+    if job is None:
+        return {"is_running": False, "current_agent": None, "current_task": None, "error": None, "csv_path": None}
+    return job_status_with_usage(job)
+
+@app.get("/status/{job_id}")
+async def job_status(job_id: str):
+    """Get the status of a single job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status_with_usage(job)
+
+@app.get("/jobs")
+async def list_jobs():
+    """List queued, running and finished jobs"""
+    return job_manager.list_jobs()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, after: Optional[int] = None):
+    """Stream a job's status and step events as Server-Sent Events.
+
+    Events are replayed after the ``after`` offset, or after the ``Last-Event-ID``
+    header sent by reconnecting EventSource clients.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if after is None:
+        last_event_id = request.headers.get("last-event-id")
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+    return StreamingResponse(
+        sse_stream(job.events, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, format: str = "csv"):
+    """Rows written so far for a job, available while it is still running"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    writer = job.results
+    rows = writer.rows() if writer else []
+    if format == "json":
+        return {
+            "job_id": job.id,
+            "state": job.state,
+            "complete": bool(writer and writer.finalized),
+            "rows": rows,
+        }
+
+    def generate():
+        buffer = io.StringIO()
+        csv_out = csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES, extrasaction="ignore")
+        csv_out.writeheader()
+        for row in rows:
+            csv_out.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{job.id[:8]}_partial_leads.csv"'},
+    )
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage, tool, page load and LLM timings across all jobs in the Prometheus text format"""
+    return PlainTextResponse(get_default_metrics().render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    """The same metrics as JSON, with averages and percentiles"""
+    return get_default_metrics().summary()
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """Get driver pool size and wait-time metrics, and the Chrome profile drivers load pages with"""
+    return {**get_default_pool().stats(), "profile": get_default_profile().describe()}
+
+@app.get("/readiness/stats")
+async def readiness_stats():
+    """Get page readiness wait times, per-site timeouts and time saved versus fixed sleeps"""
+    return get_default_readiness().stats()
+
+@app.get("/fetch/stats")
+async def fetch_stats():
+    """Get how often pages were served from cache, plain HTTP or Chrome, and contact probing counters"""
+    return {**get_default_fetcher().stats(), "contact_probe": get_default_prober().stats()}
+
+@app.get("/politeness/stats")
+async def politeness_stats():
+    """Get per-host queue depth, wait times, backoff and robots.txt crawl delays"""
+    scheduler = get_default_scheduler()
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.stats()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Get page cache hit/miss statistics and size"""
+    cache = get_default_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/leads/stats")
+async def lead_stats():
+    """Get how many prospects were reused, refreshed or new, and the size of the lead store"""
+    store = get_default_lead_store()
+    if store is None:
+        return {"enabled": False}
+    return {"enabled": True, **store.stats()}
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Get LLM response cache statistics and token usage across all jobs"""
+    cache = get_default_llm_cache()
+    return {
+        "cache": {"enabled": True, **cache.stats()} if cache else {"enabled": False},
+        "usage": get_default_usage_tracker().totals(),
+    }
 
 @app.get("/download/{filename}")
 async def download_file(filename: str):
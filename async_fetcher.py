@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from logging_setup import get_logger
+from http_fetcher import HTTP_BACKOFF_RETRIES, HTTP_TIMEOUT, USER_AGENT, TieredFetcher, get_default_fetcher, snapshot_from_response
+from politeness import BACKOFF_STATUSES, get_default_scheduler
+from driver_pool import POOL_MAX_SIZE
+from metrics import get_default_metrics
+import contextvars
+import functools
+import threading
+import asyncio
+import weakref
+import httpx
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Async client settings (override via environment)
+# Connections the async HTTP client opens across all hosts, and how many it keeps alive between requests
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv("ASYNC_HTTP_MAX_KEEPALIVE", "50"))
+# Chrome renders running at once; Selenium has no async API, so each one occupies a render thread
+ASYNC_BROWSER_CONCURRENCY = int(os.getenv("ASYNC_BROWSER_CONCURRENCY", str(POOL_MAX_SIZE)))
+
+
+class AsyncHttpFetcher:
+    """Keep-alive HTTP client for coroutines, throttled by the same politeness scheduler as HttpFetcher.
+
+    Connections belong to the event loop that opened them, so one
+    ``httpx.AsyncClient`` is kept per running loop.
+    """
+
+    def __init__(self, timeout=HTTP_TIMEOUT, max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                 max_keepalive=ASYNC_HTTP_MAX_KEEPALIVE, scheduler=None, retries=HTTP_BACKOFF_RETRIES):
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.scheduler = scheduler if scheduler is not None else get_default_scheduler()
+        self.retries = retries
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                    "Accept-Language": "en-GB,en;q=0.9",
+                },
+            )
+        return client
+
+    async def get(self, url, headers=None):
+        """GET a URL, returning the response or None on network errors"""
+        return await self.request("GET", url, headers=headers)
+
+    async def head(self, url):
+        """HEAD a URL, returning the response or None on network errors"""
+        return await self.request("HEAD", url)
+
+    async def request(self, method, url, headers=None):
+        """Send a request through the host's politeness slot, retrying after backoff on 429/5xx"""
+        with get_default_metrics().span("http_request", method=method):
+            return await self._request(method, url, headers)
+
+    async def _request(self, method, url, headers=None):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.scheduler.aslot(url) if self.scheduler else nullcontext():
+                    response = await self._client().request(method, url, headers=headers)
+            except (httpx.HTTPError, httpx.InvalidURL) as e:
+                logger.warning(f"HTTP fetch failed for {url}: {str(e)}")
+                return None
+            if self.scheduler:
+                self.scheduler.record(url, response.status_code, response.headers)
+            if response.status_code not in BACKOFF_STATUSES or attempt == self.retries:
+                return response
+
+    async def fetch(self, url, headers=None):
+        """Fetch and parse an HTML page; returns None when the page is not usable HTML"""
+        return snapshot_from_response(url, await self.get(url, headers=headers))
+
+    async def aclose(self):
+        """Close the running loop's client"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+class AsyncBrowser:
+    """Chrome renders awaited from coroutines.
+
+    Renders run on a dedicated thread pool sized like the driver pool, so pages
+    waiting for a browser queue on the event loop rather than each holding a
+    thread, and long renders never starve the loop's default executor.
+    """
+
+    def __init__(self, max_concurrency=ASYNC_BROWSER_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="async-browser")
+
+    async def run(self, func, *args):
+        """Run a blocking browser call on a render thread; spans it records count towards the caller's job"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(context.run, func, *args))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncTieredFetcher:
+    """TieredFetcher for coroutines: page cache, then the async HTTP client, then Chrome on a render thread.
+
+    The wrapped TieredFetcher supplies the cache, the escalation rules and the
+    served / escalated counters, so /fetch/stats covers both APIs.
+    """
+
+    def __init__(self, tiered=None, http=None, browser=None):
+        self.tiered = tiered or TieredFetcher()
+        self.http = http or AsyncHttpFetcher()
+        # Render threads are shared by every async fetcher unless one is given
+        self.browser = browser or get_default_async_browser()
+
+    async def load(self, url, get_driver, readiness, selector=None, force_browser=False, browser_lock=None,
+                   release=None):
+        """Return a PageSnapshot for ``url`` from the cheapest tier that can serve it (see TieredFetcher.load).
+
+        ``release`` is called after a render, still holding ``browser_lock``, so
+        callers can hand their driver back instead of keeping it between renders.
+        """
+        started = time.perf_counter()
+        # Page cache reads and writes are SQLite calls, so they run on a worker thread
+        cached, snapshot = await asyncio.to_thread(self.tiered.lookup, url, started, force_browser)
+        if snapshot is not None:
+            return snapshot
+
+        if self.tiered.fast_path and not force_browser:
+            fetched = await self.http.fetch(url, headers=self.tiered.validators(cached))
+            snapshot = await asyncio.to_thread(self.tiered.from_http, url, fetched, cached, started)
+            if snapshot is not None:
+                return snapshot
+        return await self.browser.run(self._render, url, get_driver, readiness, selector, browser_lock, release, started)
+
+    def _render(self, url, get_driver, readiness, selector, browser_lock, release, started):
+        with browser_lock or nullcontext():
+            try:
+                return self.tiered.render(url, get_driver, readiness, selector, started=started)
+            finally:
+                if release is not None:
+                    release()
+
+    def record_empty_escalation(self):
+        self.tiered.record_empty_escalation()
+
+    def stats(self):
+        return self.tiered.stats()
+
+    async def aclose(self):
+        """Close the running loop's HTTP client; the render threads may be shared, so they stay up"""
+        await self.http.aclose()
+
+
+_default_browser = None
+_default_browser_lock = threading.Lock()
+
+
+def get_default_async_browser():
+    """Return the process-wide render threads, so async fetchers never start a thread pool each"""
+    global _default_browser
+    with _default_browser_lock:
+        if _default_browser is None:
+            _default_browser = AsyncBrowser()
+        return _default_browser
+
+
+_default_async_fetcher = None
+_default_async_fetcher_lock = threading.Lock()
+
+
+def get_default_async_fetcher():
+    """Return the process-wide async fetcher, sharing the default fetcher's cache and counters"""
+    global _default_async_fetcher
+    with _default_async_fetcher_lock:
+        if _default_async_fetcher is None:
+            _default_async_fetcher = AsyncTieredFetcher(get_default_fetcher())
+        return _default_async_fetcher
@@ -0,0 +1,255 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging_setup import get_logger
+from main import DEFAULT_NUM_PROSPECTS, OUTPUT_DIR, run_pipeline
+from web_tools import WebTools, CSV_FIELDNAMES
+from driver_pool import get_default_pool
+from csv_stream import StreamingCsvWriter, merge_rows
+from lead_store import DomainClaims
+from job_manager import JobCancelled
+from qualification import normalize_url
+from replay import open_tape
+import argparse
+import threading
+import hashlib
+import json
+import csv
+import os
+
+logger = get_logger(__name__)
+
+# Queries of a batch run at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", os.path.join(OUTPUT_DIR, "batches"))
+
+CHECKPOINT_FILE = "checkpoint.json"
+COMBINED_FILE = "combined_leads.csv"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class BatchEntry:
+    """One query of a batch"""
+
+    def __init__(self, query, num_prospects=DEFAULT_NUM_PROSPECTS, pipeline_mode=None, parallel_qualification=None):
+        self.query = " ".join(query.split())
+        self.num_prospects = int(num_prospects or DEFAULT_NUM_PROSPECTS)
+        self.pipeline_mode = pipeline_mode or None
+        self.parallel_qualification = parallel_qualification
+
+    @property
+    def key(self):
+        """Stable id, so the same query is recognised when a batch is resumed"""
+        text = f"{self.query.lower()}|{self.num_prospects}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def filename(self):
+        safe_query = "".join(c for c in self.query if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        return f"{safe_query.replace(' ', '_')[:50]}_leads_{self.key}.csv"
+
+
+def parse_entries(items):
+    """BatchEntry list from dicts with ``query`` (or ``search_query``) keys; duplicate queries are dropped"""
+    entries = {}
+    for item in items:
+        query = (item.get("query") or item.get("search_query") or "").strip()
+        if not query:
+            continue
+        parallel = item.get("parallel_qualification")
+        if isinstance(parallel, str):
+            # CSV cells arrive as text
+            parallel = parallel.strip().lower() in ("1", "true", "yes") if parallel.strip() else None
+        entry = BatchEntry(query, item.get("num_prospects"), item.get("pipeline_mode"), parallel)
+        entries.setdefault(entry.key, entry)
+    return list(entries.values())
+
+
+def load_entries(path):
+    """Read batch entries from a JSONL file (one object per line) or a CSV file with a header row"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            items = list(csv.DictReader(f))
+        else:
+            items = [json.loads(line) for line in f if line.strip()]
+    return parse_entries(items)
+
+
+class Checkpoint:
+    """Per-query state of a batch, rewritten atomically after every change"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    def state(self, key):
+        return self.entries.get(key, {}).get("status", PENDING)
+
+    def mark(self, entry, **fields):
+        with self._lock:
+            record = self.entries.setdefault(entry.key, {"query": entry.query, "num_prospects": entry.num_prospects})
+            record.update(fields, updated_at=datetime.now().isoformat())
+            self._save()
+
+    def counts(self, keys):
+        """Number of ``keys`` in each state"""
+        states = [self.state(key) for key in keys]
+        return {state: states.count(state) for state in (PENDING, DONE, FAILED)}
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class BatchRunner:
+    """Runs the queries of a batch on a shared driver pool and caches, a few at a time.
+
+    Queries already finished according to the checkpoint are skipped, and search
+    results another query of the batch has started researching are dropped.
+    """
+
+    def __init__(self, entries, output_dir, concurrency=BATCH_CONCURRENCY, pipeline_mode=None, batch_id=None,
+                 on_progress=None, cancel_event=None):
+        self.entries = entries
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.pipeline_mode = pipeline_mode
+        self.batch_id = batch_id or os.path.basename(os.path.normpath(output_dir))
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.claims = DomainClaims()
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(os.path.join(output_dir, CHECKPOINT_FILE))
+        self.combined_file = os.path.join(output_dir, COMBINED_FILE)
+
+    def run(self):
+        """Run every unfinished query, then write the combined CSV; returns the summary"""
+        pending = [entry for entry in self.entries if self.checkpoint.state(entry.key) != DONE]
+        skipped = len(self.entries) - len(pending)
+        if skipped:
+            logger.info(f"Resuming batch {self.batch_id}: {skipped} of {len(self.entries)} queries already done")
+        workers = max(1, min(self.concurrency, len(pending)))
+        logger.info(f"Running {len(pending)} queries with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+            list(executor.map(self.run_entry, pending))
+        self.write_combined()
+        return self.summary()
+
+    def run_entry(self, entry):
+        if self.cancel_event.is_set():
+            return
+        output_file = os.path.join(self.output_dir, entry.filename)
+        job_id = f"{self.batch_id}-{entry.key}"
+        self.checkpoint.mark(entry, status=PENDING, output_file=output_file, started_at=datetime.now().isoformat())
+        self._report(entry, "started")
+        # Appends to rows a previous, interrupted run already streamed for this query
+        writer = StreamingCsvWriter(output_file, CSV_FIELDNAMES, defaults={"Search Query": entry.query},
+                                    key_func=normalize_url)
+        if os.path.exists(output_file):
+            # Partial results saved by a failed run are carried over, since finalizing replaces the file
+            with open(output_file, newline="", encoding="utf-8") as f:
+                writer.write_rows(list(csv.DictReader(f)))
+        web_tools = WebTools(pool=get_default_pool(), csv_writer=writer, job_id=job_id, claims=self.claims,
+                             tape=open_tape(job_id))
+        try:
+            run_pipeline(
+                web_tools,
+                entry.query,
+                entry.num_prospects,
+                output_file,
+                mode=entry.pipeline_mode or self.pipeline_mode,
+                job_id=job_id,
+                parallel_qualification=entry.parallel_qualification,
+                on_stage=lambda name, description: self._check_cancelled(),
+                step_callback=lambda step: self._check_cancelled()
+            )
+            writer.finalize()
+            self.checkpoint.mark(entry, status=DONE, rows=writer.prospect_count, error=None)
+            self._report(entry, "done")
+        except Exception as e:
+            # Rows researched before the failure are kept; the query is retried on resume
+            writer.finalize()
+            cancelled = isinstance(e, JobCancelled)
+            self.checkpoint.mark(entry, status=PENDING if cancelled else FAILED, rows=writer.prospect_count,
+                                 error=None if cancelled else str(e))
+            logger.error(f"Error running query '{entry.query}': {str(e)}")
+            self._report(entry, "cancelled" if cancelled else "failed")
+        finally:
+            web_tools.cleanup()
+
+    def write_combined(self):
+        """Merge every query's CSV into one file, one row per URL"""
+        rows = []
+        for entry in self.entries:
+            path = os.path.join(self.output_dir, entry.filename)
+            if os.path.exists(path):
+                with open(path, newline="", encoding="utf-8") as f:
+                    rows.extend(csv.DictReader(f))
+        rows = merge_rows(rows, "URL", CSV_FIELDNAMES, normalize_url)
+        tmp_path = self.combined_file + ".tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.combined_file)
+        logger.success(f"Wrote {len(rows)} combined leads to {self.combined_file}")
+        return len(rows)
+
+    def summary(self):
+        return {
+            "batch_id": self.batch_id,
+            "output_dir": self.output_dir,
+            "combined_file": self.combined_file if os.path.exists(self.combined_file) else None,
+            "queries": len(self.entries),
+            **self.counts(),
+            "entries": {key: dict(record) for key, record in self.checkpoint.entries.items()},
+        }
+
+    def counts(self):
+        return self.checkpoint.counts([entry.key for entry in self.entries])
+
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Batch {self.batch_id} was cancelled")
+
+    def _report(self, entry, event):
+        if self.on_progress:
+            try:
+                self.on_progress(entry, event, self.counts())
+            except Exception as e:
+                logger.error(f"Error in batch progress callback: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many lead generation queries from a JSONL or CSV file")
+    parser.add_argument("input", help="JSONL or CSV file of {query, num_prospects} entries")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--mode", choices=["crew", "lean"], default=None, help="Pipeline mode (default PIPELINE_MODE)")
+    parser.add_argument("--batch-id", default=None, help="Resume this batch (default derived from the input file)")
+    parser.add_argument("--output-dir", default=BATCH_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    entries = load_entries(args.input)
+    # The same input file maps to the same batch directory, so re-running resumes it
+    batch_id = args.batch_id or os.path.splitext(os.path.basename(args.input))[0]
+    runner = BatchRunner(entries, os.path.join(args.output_dir, batch_id), args.concurrency, args.mode, batch_id)
+    try:
+        summary = runner.run()
+    finally:
+        get_default_pool().close()
+    logger.success(f"Batch {batch_id}: {summary[DONE]} done, {summary[FAILED]} failed, "
+                   f"{summary[PENDING]} pending - {summary['combined_file']}")
+
+
+if __name__ == "__main__":
+    main()
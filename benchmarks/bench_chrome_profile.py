@@ -0,0 +1,210 @@
+"""Compare page load time, bytes and memory of the full and extraction Chrome profiles.
+
+Serves the agency pages in benchmarks/fixtures/pages from a local HTTP server,
+each decorated with the weight real agency sites carry (hero images, web fonts,
+a background video and analytics / ad scripts). Every hostname resolves to the
+local server, so tracker hosts such as www.google-analytics.com are served
+locally too. Each page is loaded in headless Chrome with both profiles and
+timed until the readiness check passes.
+
+    python benchmarks/bench_chrome_profile.py --images 8 --resource-latency 0.05 --runs 3
+"""
+import argparse
+import glob
+import http.server
+import os
+import socketserver
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Browser loads are timed without the per-host throttle; read at import time
+os.environ.setdefault("POLITENESS_ENABLED", "false")
+
+from driver_pool import create_chrome_driver
+from chrome_profile import ChromeProfile
+from page_readiness import PageReadiness
+from dom_snapshot import collect_dom
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+TRACKERS = [
+    "www.google-analytics.com/analytics.js",
+    "www.googletagmanager.com/gtm.js",
+    "connect.facebook.net/en_US/fbevents.js",
+    "static.hotjar.com/c/hotjar.js",
+    "snap.licdn.com/li.lms-analytics/insight.min.js",
+]
+
+RESOURCE_SIZES = {".jpg": 250_000, ".woff2": 80_000, ".mp4": 3_000_000, ".js": 90_000, ".css": 4_000}
+CONTENT_TYPES = {".jpg": "image/jpeg", ".woff2": "font/woff2", ".mp4": "video/mp4",
+                 ".js": "application/javascript", ".css": "text/css", ".html": "text/html; charset=utf-8"}
+
+# Bytes and resources the page downloaded, as reported by Resource Timing
+PAGE_WEIGHT_SCRIPT = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return {bytes: entries.reduce((sum, e) => sum + (e.transferSize || 0), 0), resources: entries.length - 1};
+"""
+
+
+def decorate(html, name, images):
+    """Add the images, fonts, video and trackers a typical agency page loads"""
+    head = "".join(
+        f'<script async src="http://{tracker}?page={name}"></script>' for tracker in TRACKERS
+    ) + f"""<style>@font-face {{ font-family: Brand; src: url('/assets/{name}-brand.woff2'); }}
+@font-face {{ font-family: BrandBold; src: url('/assets/{name}-brand-bold.woff2'); }}
+body {{ font-family: Brand, sans-serif; }} h1, h2 {{ font-family: BrandBold, sans-serif; }}</style>"""
+    body = "".join(f'<img src="/assets/{name}-hero-{i}.jpg" alt="">' for i in range(images))
+    body += f'<video src="/assets/{name}-showreel.mp4" preload="auto" muted></video>'
+    html = html.replace("https://www.googletagmanager.com", "http://www.googletagmanager.com")
+    return html.replace("</head>", head + "</head>", 1).replace("</body>", body + "</body>", 1)
+
+
+def serve(images, resource_latency):
+    """Serve the decorated fixture pages and generated assets on a random local port"""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            pages[f"/{name}.html"] = decorate(f.read(), name, images).encode("utf-8")
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            ext = os.path.splitext(path)[1]
+            if path in pages:
+                body = pages[path]
+            elif ext in RESOURCE_SIZES:
+                time.sleep(resource_latency)
+                body = b"/* filler */\n" * (RESOURCE_SIZES[ext] // 14) if ext in (".js", ".css") \
+                    else os.urandom(RESOURCE_SIZES[ext])
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES.get(ext, "application/octet-stream"))
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Timing-Allow-Origin", "*")
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Chrome stops reading once a load is cancelled or blocked
+
+        def log_message(self, *args):
+            pass
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    return server, port, [f"http://agency.test:{port}{path}" for path in pages]
+
+
+def local_hosts(profile, port):
+    """Resolve every hostname to the fixture server when Chrome starts with ``profile``"""
+    apply = profile.apply
+
+    def apply_local(options):
+        options.add_argument(f"--host-resolver-rules=MAP * 127.0.0.1:{port}")
+        return apply(options)
+
+    profile.apply = apply_local
+    return profile
+
+
+def chrome_rss(root_pid):
+    """Resident memory (bytes) of every process under ``root_pid``; None where /proc is unavailable"""
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        return None
+    total = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+def measure(profile, port, urls, runs):
+    driver = create_chrome_driver(local_hosts(profile, port))
+    readiness = PageReadiness(scheduler=None, ready_states=profile.ready_states)
+    times, weights, text_lengths, peak_rss, heap = [], [], [], 0, 0
+    try:
+        for _ in range(runs):
+            for url in urls:
+                driver.get("about:blank")
+                started = time.perf_counter()
+                readiness.load(driver, url)
+                times.append(time.perf_counter() - started)
+                weights.append(driver.execute_script(PAGE_WEIGHT_SCRIPT))
+                text_lengths.append(len((collect_dom(driver).get("text") or "")))
+                metrics = {m["name"]: m["value"] for m in driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]}
+                heap = max(heap, metrics.get("JSHeapUsedSize", 0))
+                peak_rss = max(peak_rss, chrome_rss(driver.service.process.pid) or 0)
+    finally:
+        driver.quit()
+    return {
+        "name": profile.name,
+        "times": times,
+        "bytes": statistics.median(w["bytes"] for w in weights),
+        "resources": statistics.median(w["resources"] for w in weights),
+        "text": min(text_lengths),
+        "rss": peak_rss,
+        "heap": heap,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=8, help="Hero images added to every page")
+    parser.add_argument("--resource-latency", type=float, default=0.05, help="Simulated seconds per asset request")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server, port, urls = serve(args.images, args.resource_latency)
+    try:
+        results = [
+            measure(ChromeProfile.full(), port, urls, args.runs),
+            measure(ChromeProfile(), port, urls, args.runs),
+        ]
+    finally:
+        server.shutdown()
+
+    print(f"{len(urls)} fixture pages, {args.images} images each, {args.resource_latency}s per asset, "
+          f"{args.runs} runs")
+    print(f"{'profile':<11} {'median ms':>10} {'p95 ms':>8} {'KB/page':>9} {'requests':>9} {'text chars':>11} "
+          f"{'peak RSS MB':>12} {'JS heap MB':>11}")
+    for result in results:
+        times = sorted(result["times"])
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{result['name']:<11} {statistics.median(times) * 1000:>10.0f} {p95 * 1000:>8.0f} "
+              f"{result['bytes'] / 1024:>9.0f} {result['resources']:>9.0f} {result['text']:>11} "
+              f"{result['rss'] / 2 ** 20:>12.0f} {result['heap'] / 2 ** 20:>11.1f}")
+    full, extraction = results
+    print(f"\nExtraction profile: {statistics.median(full['times']) / statistics.median(extraction['times']):.1f}x "
+          f"faster loads, {1 - extraction['bytes'] / max(full['bytes'], 1):.0%} fewer bytes, "
+          f"{1 - extraction['rss'] / max(full['rss'], 1):.0%} less peak memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Compare per-element WebDriver extraction with the single-script DOM snapshot.
+
+Serves a generated agency page from a local HTTP server, loads it in headless
+Chrome and runs both extraction strategies against it, counting WebDriver
+commands (each one is an HTTP round trip to chromedriver) and wall time.
+
+    python benchmarks/bench_dom_extraction.py --paragraphs 300 --links 150 --runs 5
+"""
+import argparse
+import http.server
+import os
+import re
+import socketserver
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By
+from driver_pool import create_chrome_driver
+from dom_snapshot import collect_dom
+
+
+def build_page(num_paragraphs, num_links):
+    """A synthetic agency page with many paragraphs, links and a footer"""
+    paragraphs = "\n".join(
+        f"<p>Paragraph {i}: we run influencer campaigns for brands across the UK.</p>"
+        for i in range(num_paragraphs)
+    )
+    links = "\n".join(f'<a href="/work/{i}">Case study {i}</a>' for i in range(num_links))
+    return f"""<html><body>
+<nav><a href="/contact">Contact us</a></nav>
+<section id="about"><p>About us: a talent marketing agency.</p></section>
+<div class="services">Influencer strategy, talent management</div>
+<main>{paragraphs}{links}</main>
+<p>Studio, 1 High Street, London SW1A 1AA</p>
+<footer class="site-footer">
+  <a href="https://www.linkedin.com/company/agency">LinkedIn</a>
+  <a href="https://www.instagram.com/agency">Instagram</a>
+  <div class="footer-address">1 High Street, London SW1A 1AA</div>
+</footer>
+</body></html>"""
+
+
+def serve(html):
+    """Serve ``html`` for every path on a random local port"""
+    body = html.encode("utf-8")
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+class CommandCounter:
+    """Counts WebDriver commands by wrapping ``driver.execute``"""
+
+    def __init__(self, driver):
+        self.count = 0
+        original = driver.execute
+
+        def execute(command, params=None):
+            self.count += 1
+            return original(command, params)
+
+        driver.execute = execute
+
+
+def legacy_extract(driver):
+    """The per-element extraction loop WebTools used before the DOM snapshot"""
+    result = {"links": [], "addresses": []}
+    for link in driver.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"], a[href*="instagram.com"]'):
+        result["links"].append(link.get_attribute("href"))
+    for footer in driver.find_elements(By.CSS_SELECTOR, 'footer, .footer, [class*="footer"]'):
+        for link in footer.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"], a[href*="instagram.com"]'):
+            result["links"].append(link.get_attribute("href"))
+    result["text"] = driver.find_element(By.TAG_NAME, "body").text
+    result["html"] = driver.page_source
+    address_elements = driver.find_elements(
+        By.XPATH,
+        "//*[contains(@class, 'address') or contains(@class, 'location') or contains(@class, 'contact-details')]"
+    )
+    if not address_elements:
+        for p in driver.find_elements(By.TAG_NAME, "p"):
+            if re.search(r'[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}', p.text):
+                address_elements.append(p)
+    for elem in address_elements:
+        result["addresses"].append(elem.text.strip())
+    # Paragraph scan as done when no address container exists
+    result["paragraphs"] = [p.text for p in driver.find_elements(By.TAG_NAME, "p")]
+    return result
+
+
+def measure(name, func, driver, counter, runs):
+    times = []
+    commands = []
+    for _ in range(runs):
+        counter.count = 0
+        started = time.perf_counter()
+        func(driver)
+        times.append(time.perf_counter() - started)
+        commands.append(counter.count)
+    print(f"{name:<14} {statistics.median(commands):>10.0f} {statistics.median(times) * 1000:>12.1f} "
+          f"{min(times) * 1000:>10.1f} {max(times) * 1000:>10.1f}")
+    return statistics.median(times), statistics.median(commands)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=300)
+    parser.add_argument("--links", type=int, default=150)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server, url = serve(build_page(args.paragraphs, args.links))
+    driver = create_chrome_driver()
+    try:
+        driver.get(url)
+        counter = CommandCounter(driver)
+        print(f"Page: {args.paragraphs} paragraphs, {args.links} links, {args.runs} runs")
+        print(f"{'strategy':<14} {'commands':>10} {'median ms':>12} {'min ms':>10} {'max ms':>10}")
+        legacy_time, legacy_cmds = measure("per-element", legacy_extract, driver, counter, args.runs)
+        batch_time, batch_cmds = measure("dom snapshot", collect_dom, driver, counter, args.runs)
+        print(f"\nRound trips: {legacy_cmds:.0f} -> {batch_cmds:.0f}; "
+              f"speed-up: {legacy_time / batch_time if batch_time else float('inf'):.1f}x")
+    finally:
+        driver.quit()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Micro-benchmark: legacy regex/keyword extraction vs the precompiled extractors engine.
+
+Runs both implementations over the saved HTML fixtures in benchmarks/fixtures/pages
+(already parsed, so only extraction is timed) and reports per-page time.
+
+    python benchmarks/bench_extractors.py --runs 200
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from http_fetcher import parse_html
+from page_extraction import AI_KEYWORDS, ENTERPRISE_KEYWORDS, extract_content, extract_contacts
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "pages")
+
+
+def legacy_extract(snapshot):
+    """The extraction WebTools did before the engine: string patterns, separate passes, one scan per keyword"""
+    import re
+    page_text = snapshot.text
+    body_text = page_text.lower()
+    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+    emails = [e for e in re.findall(email_pattern, page_text)
+              if not any(x in e.lower() for x in ["example", "domain", "email"])]
+    phones = re.findall(r'(?:\+44|0)(?:[\s-]*\d){9,10}', page_text)
+    addresses = list(snapshot.addresses) or [
+        p for p in snapshot.paragraphs if re.search(r'[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}', p)
+    ]
+    has_ai = any(keyword in body_text for keyword in AI_KEYWORDS)
+    has_enterprise = any(keyword in body_text for keyword in ENTERPRISE_KEYWORDS)
+    return emails, phones, addresses, has_ai, has_enterprise
+
+
+def engine_extract(snapshot):
+    return extract_contacts(snapshot), extract_content(snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(FIXTURES, "*.html")))
+    if not paths:
+        sys.exit(f"No fixtures found in {FIXTURES}")
+
+    print(f"{'fixture':<28} {'text chars':>10} {'legacy us':>10} {'engine us':>10} {'speed-up':>9}")
+    totals = [0.0, 0.0]
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            snapshot = parse_html(f.read(), "https://fixture.test/")
+        legacy = timeit.timeit(lambda: legacy_extract(snapshot), number=args.runs) / args.runs
+        engine = timeit.timeit(lambda: engine_extract(snapshot), number=args.runs) / args.runs
+        totals[0] += legacy
+        totals[1] += engine
+        print(f"{os.path.basename(path):<28} {len(snapshot.text):>10} {legacy * 1e6:>10.1f} "
+              f"{engine * 1e6:>10.1f} {legacy / engine:>8.2f}x")
+
+    print(f"{'total':<28} {'':>10} {totals[0] * 1e6:>10.1f} {totals[1] * 1e6:>10.1f} "
+          f"{totals[0] / totals[1]:>8.2f}x")
+
+    print("\nEngine results:")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            contacts, content = engine_extract(parse_html(f.read(), "https://fixture.test/"))
+        print(f"  {os.path.basename(path)}: emails={contacts['emails']} phones={contacts['phones']} "
+              f"ai={content['has_ai_mention']} enterprise={content['has_enterprise']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Compare end-to-end job latency of the crew and lean pipeline modes.
+
+Serves generated agency sites from a local HTTP server and runs a full job in
+each mode with the offline stub model, which sleeps for ``--llm-latency`` per
+call to stand in for a real completion. In crew mode a scripted stub drives the
+agents through the same tool calls a model would make (search, qualify
+prospects, score them in batches, save), so both modes do identical web work
+and differ only in how many model round trips they need.
+
+    python benchmarks/bench_pipeline_modes.py --prospects 5 --llm-latency 1.5 --runs 3
+"""
+import argparse
+import csv
+import http.server
+import json
+import os
+import re
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Isolate the benchmark from shared caches and the real model; read at import time
+os.environ.setdefault("LLM_STUB", "true")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("LEAD_STORE_ENABLED", "false")
+os.environ.setdefault("POLITENESS_ENABLED", "false")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Crew, Process
+from web_tools import WebTools, CSV_FIELDNAMES
+from csv_stream import StreamingCsvWriter
+from qualification import normalize_url
+from main import MODEL, create_tasks
+from lean_pipeline import LeanPipeline, parse_query
+from llm_cache import UsageTracker, build_llm
+
+QUERY = "UK influencer talent marketing agency"
+
+
+def build_site(index):
+    """Home and contact page for one synthetic agency"""
+    name = f"Agency {index}"
+    home = f"""<html><head><title>{name} | Influencer Marketing</title></head><body>
+<nav><a href="contact">Contact us</a></nav>
+<h1>{name}</h1>
+<section id="about"><p>About us: {name} is a London talent marketing agency working with
+enterprise brands on influencer campaigns, creator partnerships and social content.</p></section>
+<div class="services">Influencer strategy, talent management, paid social, AI-assisted campaign analytics</div>
+<section class="clients"><p>Clients include global retail, beauty and fintech brands.</p></section>
+<footer class="site-footer">
+  <a href="https://www.linkedin.com/company/agency-{index}">LinkedIn</a>
+  <a href="https://www.instagram.com/agency{index}">Instagram</a>
+  <p>hello@agency{index}.co.uk | +44 20 7946 0{index:03d}</p>
+  <div class="footer-address">{index} High Street, London SW1A 1AA</div>
+</footer></body></html>"""
+    contact = f"""<html><body><h1>Contact {name}</h1>
+<p>New business: newbiz@agency{index}.co.uk</p><p>Call +44 20 7946 0{index:03d}</p>
+<p class="address">{index} High Street, London SW1A 1AA</p></body></html>"""
+    return {"": home, "contact": contact}
+
+
+def serve(num_sites, page_latency):
+    """Serve ``num_sites`` agencies under /agency-<n>/ on a random local port"""
+    pages = {}
+    for index in range(num_sites):
+        for path, html in build_site(index).items():
+            pages[f"/agency-{index}/{path}"] = html.encode("utf-8")
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def _respond(self, send_body):
+            time.sleep(page_latency)
+            body = pages.get(self.path.split("?")[0])
+            self.send_response(200 if body else 404)
+            body = body or b"Not found"
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(True)
+
+        def do_HEAD(self):
+            self._respond(False)
+
+        def log_message(self, *args):
+            pass
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, [f"{base}/agency-{index}/" for index in range(num_sites)]
+
+
+class FixtureWebTools(WebTools):
+    """WebTools whose search returns the local fixture sites"""
+
+    def __init__(self, site_urls, **kwargs):
+        super().__init__(**kwargs)
+        self.site_urls = site_urls
+
+    def search_urls(self, query, num_results=None):
+        return [{"url": url, "title": f"Agency {i}", "snippet": query} for i, url in enumerate(self.site_urls)]
+
+
+def tool_arguments(messages, tool_name):
+    """Argument names of ``tool_name`` as listed in the agent's system prompt"""
+    prompt = messages[0]["content"] if isinstance(messages, list) else messages
+    match = re.search(rf"Tool Name: {re.escape(tool_name)}\nTool Arguments: (\{{.*?\n\}})", prompt, re.DOTALL)
+    if not match:
+        return []
+    try:
+        return list(json.loads(match.group(1)).get("properties", {}))
+    except json.JSONDecodeError:
+        return []
+
+
+def action(messages, tool_name, primary, **named):
+    """A ReAct tool call, filling the tool's arguments from ``named`` or ``primary``"""
+    names = tool_arguments(messages, tool_name) or ["tool_input"]
+    arguments = {name: named.get(name, primary) for name in names}
+    return f"Thought: I should use {tool_name}\nAction: {tool_name}\nAction Input: {json.dumps(arguments)}"
+
+
+def final(answer):
+    return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+def score(row):
+    return {
+        "Company Name": row.get("URL", "").rstrip("/").rsplit("/", 1)[-1].replace("-", " ").title(),
+        "Decision Makers": "",
+        "AI Interest Score": 7,
+        "Qualification Notes": "Mentions AI-assisted analytics and works with enterprise brands.",
+    }
+
+
+def crew_responder(web_tools, site_urls, output_file):
+    """Scripted model that plays each agent in turn like a well-behaved LLM would"""
+
+    def respond(messages):
+        system = messages[0]["content"] if isinstance(messages, list) else str(messages)
+        observed = sum("Observation:" in str(m.get("content", "")) for m in messages[1:]) \
+            if isinstance(messages, list) else 0
+        if not system.startswith("You are "):
+            # Memory extraction and other internal prompts
+            return json.dumps({"memories": []})
+        role = system[len("You are "):].split(".", 1)[0]
+        if role == "Query Analyzer":
+            return final(json.dumps(parse_query(QUERY)))
+        if role == "Lead Researcher":
+            if not observed:
+                return action(messages, "search_urls", QUERY, query=QUERY)
+            return final(json.dumps(site_urls))
+        if role == "Lead Qualifier":
+            if not observed:
+                return action(messages, "qualify_prospects", json.dumps(site_urls), urls=json.dumps(site_urls))
+            if observed == 1:
+                return action(messages, "score_prospects", json.dumps(site_urls), urls=json.dumps(site_urls))
+            return final(json.dumps(web_tools.qualified_prospects[-len(site_urls):]))
+        if role == "Data Manager":
+            if not observed:
+                rows = web_tools.qualified_prospects[-len(site_urls):]
+                return action(messages, "save_to_csv_file", json.dumps(rows), data=json.dumps(rows),
+                              output_file=output_file)
+            return final(f"Saved the leads to {output_file}")
+        return final("Done")
+
+    return respond
+
+
+def scorer_responder(messages):
+    """Stub answer to a batched scoring prompt: one score per prospect line"""
+    prompt = messages[-1]["content"]
+    answers = []
+    for line in prompt.splitlines():
+        if line.startswith("{") and '"URL"' in line:
+            prospect = json.loads(line)
+            answers.append({"URL": prospect["URL"], **score(prospect)})
+    return json.dumps(answers)
+
+
+def fixture_tools(site_urls, output_file, job_id):
+    """WebTools streaming prospects into the job's CSV, as the web app sets them up"""
+    writer = StreamingCsvWriter(output_file, CSV_FIELDNAMES, key_func=normalize_url)
+    return FixtureWebTools(site_urls, csv_writer=writer, job_id=job_id)
+
+
+def run_crew(site_urls, output_file, tracker, job_id, llm_latency):
+    web_tools = fixture_tools(site_urls, output_file, job_id)
+    try:
+        tasks = create_tasks(web_tools, QUERY, len(site_urls), output_file, parallel_qualification=True, job_id=job_id)
+        responder = crew_responder(web_tools, site_urls, output_file)
+        for task in tasks:
+            task.agent.verbose = False
+            task.agent.llm.tracker = tracker
+            task.agent.llm.inner.responder = responder
+            task.agent.llm.inner.latency = llm_latency
+        web_tools.scoring_llm.tracker = tracker
+        web_tools.scoring_llm.inner.responder = scorer_responder
+        web_tools.scoring_llm.inner.latency = llm_latency
+        Crew(agents=[task.agent for task in tasks], tasks=tasks, process=Process.sequential,
+             verbose=False).kickoff()
+        web_tools.csv_writer.finalize()
+    finally:
+        web_tools.cleanup()
+
+
+def run_lean(site_urls, output_file, tracker, job_id, llm_latency):
+    web_tools = fixture_tools(site_urls, output_file, job_id)
+    try:
+        llm = build_llm(MODEL, job_id=job_id, stub=True, tracker=tracker, agent="Lead Scorer")
+        llm.inner.responder = scorer_responder
+        llm.inner.latency = llm_latency
+        LeanPipeline(web_tools, QUERY, len(site_urls), output_file, MODEL, job_id=job_id, llm=llm).run()
+        web_tools.csv_writer.finalize()
+    finally:
+        web_tools.cleanup()
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, newline="", encoding="utf-8") as f:
+        return len(list(csv.DictReader(f)))
+
+
+def measure(name, runner, site_urls, runs, llm_latency, workdir):
+    times = []
+    usage = None
+    rows = 0
+    for run in range(runs):
+        tracker = UsageTracker()
+        job_id = f"{name}-{run}"
+        output_file = os.path.join(workdir, f"{job_id}_leads_bench.csv")
+        started = time.perf_counter()
+        runner(site_urls, output_file, tracker, job_id, llm_latency)
+        times.append(time.perf_counter() - started)
+        usage = tracker.for_job(job_id)["total"]
+        rows = count_rows(output_file)
+    return {"name": name, "times": times, "usage": usage, "rows": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prospects", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Simulated seconds per model call")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="Simulated seconds per page request")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server, site_urls = serve(args.prospects, args.page_latency)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = [
+                measure("crew", run_crew, site_urls, args.runs, args.llm_latency, workdir),
+                measure("lean", run_lean, site_urls, args.runs, args.llm_latency, workdir),
+            ]
+        # Printed after both runs so the agents' console output does not interleave with the table
+        print(f"\n{args.prospects} prospects, {args.llm_latency}s per model call, "
+              f"{args.page_latency}s per page, {args.runs} runs")
+        print(f"{'mode':<6} {'median s':>10} {'min s':>8} {'max s':>8} {'calls':>8} {'tokens':>10} {'rows':>6}")
+        for result in results:
+            times, usage = result["times"], result["usage"]
+            print(f"{result['name']:<6} {statistics.median(times):>10.2f} {min(times):>8.2f} {max(times):>8.2f} "
+                  f"{usage['calls']:>8} {usage['total_tokens']:>10} {result['rows']:>6}")
+        crew_time, lean_time = (statistics.median(result["times"]) for result in results)
+        print(f"\nLean mode is {crew_time / lean_time:.1f}x faster end to end")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
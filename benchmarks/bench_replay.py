@@ -0,0 +1,142 @@
+"""Record a crew job once, then replay it offline to time and profile the Python side of a run.
+
+Without ``--archive`` a crew job is recorded against the local corpus used by
+bench_webtools.py (stub model, local web servers), the servers are shut down and
+the job is replayed ``--runs`` times from the recording. Replays must write the
+same CSV as the recorded run. With ``--archive`` a job recorded by the app or
+batch runner (REPLAY_MODE=record) is replayed instead, inside a temporary
+directory so its output files land there.
+
+    python benchmarks/bench_replay.py --runs 5 --llm-latency 1 --profile 25
+    python benchmarks/bench_replay.py --archive recordings/<job id>.jsonl.gz --profile 25
+"""
+import argparse
+import cProfile
+import csv
+import os
+import pstats
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Isolate the benchmark from shared caches and the real model; read at import time
+os.environ.setdefault("LLM_STUB", "true")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("LEAD_STORE_ENABLED", "false")
+os.environ.setdefault("POLITENESS_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from replay import Tape
+from bench_webtools import Harness, load_corpus, serve_corpus
+
+
+def read_rows(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return sorted(tuple(sorted(row.items())) for row in csv.DictReader(f))
+
+
+def replay_corpus_job(args, profiler):
+    """Record a corpus crew job, then replay it with the web servers shut down"""
+    corpus = load_corpus()
+    servers, endpoint, site_urls = serve_corpus(corpus, args.page_latency)
+    with tempfile.TemporaryDirectory() as workdir:
+        harness = Harness(endpoint, site_urls, corpus["query"], workdir)
+        archive = os.path.join(workdir, "job.jsonl.gz")
+        output_file = os.path.join(workdir, f"{'_'.join(corpus['query'].split())}_leads_replay.csv")
+        try:
+            started = time.perf_counter()
+            harness.crew_job("record", output_file, args.llm_latency, tape=Tape.recorder(archive))
+            recorded_time = time.perf_counter() - started
+        finally:
+            for server in servers:
+                server.shutdown()
+        expected = read_rows(output_file)
+
+        times, stats, matches = [], None, True
+        for run in range(args.runs):
+            os.remove(output_file)
+            tape = Tape.player(archive, strict=args.strict)
+            started = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            harness.crew_job(f"replay-{run}", output_file, tape=tape)
+            if profiler:
+                profiler.disable()
+            times.append(time.perf_counter() - started)
+            stats = tape.stats()
+            matches = matches and read_rows(output_file) == expected
+        harness.close()
+        size = os.path.getsize(archive)
+    return recorded_time, times, stats, size, f"{len(expected)} rows, {'identical' if matches else 'DIFFERENT'} on replay"
+
+
+def replay_archive(args, profiler):
+    """Replay a job recorded by the app or batch runner through run_pipeline"""
+    from main import run_pipeline
+    from web_tools import WebTools
+
+    archive = os.path.abspath(args.archive)
+    meta = Tape.player(archive).meta
+    times, stats = [], None
+    cwd = os.getcwd()
+    for run in range(args.runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            # Recorded output paths are relative to the app's directory
+            os.chdir(workdir)
+            tape = Tape.player(archive, strict=args.strict)
+            web_tools = WebTools(job_id=f"replay-{run}", tape=tape)
+            started = time.perf_counter()
+            try:
+                if profiler:
+                    profiler.enable()
+                run_pipeline(web_tools, meta["search_query"], meta["num_prospects"], meta["output_file"],
+                             mode=meta.get("mode"), job_id=f"replay-{run}",
+                             parallel_qualification=meta.get("parallel_qualification"))
+            finally:
+                if profiler:
+                    profiler.disable()
+                web_tools.cleanup()
+                os.chdir(cwd)
+            times.append(time.perf_counter() - started)
+            stats = tape.stats()
+    recorded_time = sum(entry["seconds"] for entry in Tape.player(archive).entries if not entry.get("nested"))
+    return recorded_time, times, stats, os.path.getsize(archive), f"query '{meta['search_query']}'"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", help="Replay this recording instead of recording a corpus job")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="Simulated seconds per model call while recording a corpus job")
+    parser.add_argument("--page-latency", type=float, default=0.05,
+                        help="Simulated seconds per request while recording a corpus job")
+    parser.add_argument("--strict", action="store_true", help="Fail on calls the recording has no exact match for")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="Print the N functions with the most cumulative time across the replays")
+    args = parser.parse_args()
+
+    profiler = cProfile.Profile() if args.profile else None
+    runner = replay_archive if args.archive else replay_corpus_job
+    recorded_time, times, stats, size, outcome = runner(args, profiler)
+
+    print(f"\nRecording: {stats['entries']} calls, {size / 1024:.1f} KB compressed, {outcome}")
+    print(f"Recorded run {recorded_time:.2f}s, replay median {statistics.median(times):.3f}s "
+          f"(min {min(times):.3f}s, max {max(times):.3f}s) over {len(times)} runs")
+    print(f"Last replay: {stats['replayed']} calls replayed, {stats['out_of_order']} served out of order, "
+          f"{stats['missing']} missing, {stats['unused']} recorded calls unused")
+    if profiler:
+        print()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.profile)
+
+
+if __name__ == "__main__":
+    main()
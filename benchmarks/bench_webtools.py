@@ -0,0 +1,381 @@
+"""Benchmark the web tools and a full crew run against a recorded corpus, offline.
+
+Serves the recorded DuckDuckGo results and agency sites listed in
+benchmarks/fixtures/corpus/manifest.json from local HTTP servers. Each site gets
+its own loopback address (127.0.0.2, 127.0.0.3, ...) so sites stay distinct
+domains, and links in the search results are rewritten to those addresses.
+Times search_urls, get_website_content, extract_contact_info and
+save_to_csv_file, then a full crew job driven by the offline stub model, and
+reports latency percentiles, pages per second and Chrome memory. Results are
+compared with a stored baseline; the exit status is 1 when any metric regressed.
+
+    python benchmarks/bench_webtools.py --runs 5
+    python benchmarks/bench_webtools.py --runs 5 --save-baseline   # record a new baseline
+    python benchmarks/bench_webtools.py --browser                  # render every page in Chrome
+"""
+import argparse
+import http.server
+import json
+import math
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Isolate the benchmark from shared caches, the real model and live search; read at import time
+os.environ.setdefault("LLM_STUB", "true")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("LEAD_STORE_ENABLED", "false")
+os.environ.setdefault("POLITENESS_ENABLED", "false")
+os.environ.setdefault("SEARCH_PROVIDERS", "duckduckgo")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Crew, Process
+from web_tools import WebTools, CSV_FIELDNAMES
+from csv_stream import StreamingCsvWriter
+from driver_pool import DriverPool, create_chrome_driver
+from http_fetcher import TieredFetcher
+from search_providers import DuckDuckGoProvider, SearchHarvester
+from qualification import normalize_url, prospect_row
+from metrics import get_default_metrics
+from main import create_tasks
+from bench_pipeline_modes import crew_responder, scorer_responder, count_rows
+from bench_chrome_profile import chrome_rss
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+MANIFEST = os.path.join(FIXTURES_DIR, "corpus", "manifest.json")
+BASELINE = os.path.join(BENCH_DIR, "baselines", "webtools.json")
+
+# Latency and throughput only count as regressed beyond this much noise
+NOISE_FLOOR_MS = 2.0
+
+
+def load_corpus(path=MANIFEST):
+    """The manifest with every page read into memory: {"query", "search": [html], "sites": {host: {path: html}}}"""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    def read(name, base):
+        with open(os.path.join(base, name), encoding="utf-8") as f:
+            return f.read()
+
+    corpus_dir = os.path.dirname(path)
+    return {
+        "query": manifest["query"],
+        "search": [read(name, corpus_dir) for name in manifest["search"]],
+        "sites": {
+            host: {page: read(name, FIXTURES_DIR) for page, name in pages.items()}
+            for host, pages in manifest["sites"].items()
+        },
+    }
+
+
+def start_server(address, route, page_latency):
+    """Serve ``route(path, query) -> html or None`` on a random port of ``address``"""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def _respond(self, send_body):
+            time.sleep(page_latency)
+            parts = urlsplit(self.path)
+            html = route(parts.path, parse_qs(parts.query))
+            body = html.encode("utf-8") if html is not None else b"Not found"
+            self.send_response(200 if html is not None else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(True)
+
+        def do_HEAD(self):
+            self._respond(False)
+
+        def log_message(self, *args):
+            pass
+
+    server = socketserver.ThreadingTCPServer((address, 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_corpus(corpus, page_latency):
+    """Start one server per site plus the search server; returns (servers, search endpoint, site URLs)"""
+    servers, bases = [], {}
+    for index, (host, pages) in enumerate(corpus["sites"].items()):
+        address = f"127.0.0.{index + 2}"
+        try:
+            server = start_server(address, lambda path, query, pages=pages: pages.get(path), page_latency)
+        except OSError:
+            # Only 127.0.0.1 is configured (e.g. macOS): sites share one domain and dedupe to a single prospect
+            address = "127.0.0.1"
+            server = start_server(address, lambda path, query, pages=pages: pages.get(path), page_latency)
+        servers.append(server)
+        bases[host] = f"http://{address}:{server.server_address[1]}"
+
+    def rewrite(html):
+        """Point the recorded result links at the local sites"""
+        for host, base in bases.items():
+            html = html.replace(quote(f"https://{host}", safe=""), quote(base, safe=""))
+            html = html.replace(f"https://{host}", base)
+        return html
+
+    results_pages = [rewrite(html) for html in corpus["search"]]
+    empty_page = '<html><body><div id="links" class="results"></div></body></html>'
+
+    def search(path, query):
+        if path != "/html/":
+            return None
+        index = int(query.get("s", ["0"])[0]) // DuckDuckGoProvider.page_size
+        return results_pages[index] if index < len(results_pages) else empty_page
+
+    search_server = start_server("127.0.0.1", search, page_latency)
+    servers.append(search_server)
+    endpoint = f"http://127.0.0.1:{search_server.server_address[1]}/html/"
+    return servers, endpoint, [f"{base}/" for base in bases.values()]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+class Harness:
+    """Builds WebTools against the local corpus and times calls to them"""
+
+    def __init__(self, endpoint, site_urls, query, workdir, browser=False):
+        self.endpoint = endpoint
+        self.site_urls = site_urls
+        self.query = query
+        self.workdir = workdir
+        self.metrics = get_default_metrics()
+        # One fetcher for the whole run, like the process-wide one the app shares between jobs;
+        # --browser skips the plain HTTP tier so every page is rendered
+        self.fetcher = TieredFetcher(fast_path=not browser)
+        self.drivers = []
+        self.pool = DriverPool(min_size=0, max_size=1, driver_factory=self._start_driver)
+
+    def _start_driver(self):
+        driver = create_chrome_driver()
+        self.drivers.append(driver)
+        return driver
+
+    def browser_rss(self):
+        """Resident memory of every Chrome process started so far, or None before the first one"""
+        if not self.drivers:
+            return None
+        return sum(chrome_rss(driver.service.process.pid) or 0 for driver in self.drivers)
+
+    def tools(self, job_id, csv_writer=None, tape=None):
+        web_tools = WebTools(pool=self.pool, fetcher=self.fetcher, csv_writer=csv_writer, job_id=job_id, tape=tape)
+        web_tools.search = SearchHarvester([DuckDuckGoProvider(self.fetcher.http, endpoint=self.endpoint)])
+        return web_tools
+
+    def pages(self, job_id):
+        """Pages and search result pages the job loaded"""
+        spans = self.metrics.for_job(job_id)["spans"]
+        return sum(summary["count"] for name in ("page_load", "search_page") for summary in spans.get(name, {}).values())
+
+    def measure(self, name, runs, calls):
+        """Time every call ``calls(web_tools)`` yields, with a fresh WebTools per run"""
+        times, pages, rss = [], 0, None
+        for run in range(runs):
+            job_id = f"bench-{name}-{run}"
+            web_tools = self.tools(job_id)
+            try:
+                for call in calls(web_tools, run):
+                    started = time.perf_counter()
+                    call()
+                    times.append(time.perf_counter() - started)
+                    current = self.browser_rss()
+                    if current is not None:
+                        rss = max(rss or 0, current)
+            finally:
+                web_tools.cleanup()
+            pages += self.pages(job_id)
+        return summarize(times, pages, rss)
+
+    def crew_job(self, job_id, output_file, llm_latency=0.0, tape=None):
+        """One crew job with the scripted stub model, searching the local corpus"""
+        writer = StreamingCsvWriter(output_file, CSV_FIELDNAMES, key_func=normalize_url)
+        web_tools = self.tools(job_id, csv_writer=writer, tape=tape)
+        try:
+            tasks = create_tasks(web_tools, self.query, len(self.site_urls), output_file,
+                                 parallel_qualification=True, job_id=job_id)
+            responder = crew_responder(web_tools, self.site_urls, output_file)
+            for task in tasks:
+                task.agent.verbose = False
+                task.agent.llm.inner.responder = responder
+                task.agent.llm.inner.latency = llm_latency
+            web_tools.scoring_llm.inner.responder = scorer_responder
+            web_tools.scoring_llm.inner.latency = llm_latency
+            Crew(agents=[task.agent for task in tasks], tasks=tasks, process=Process.sequential,
+                 verbose=False).kickoff()
+            writer.finalize()
+        finally:
+            web_tools.cleanup()
+
+    def run_crew(self, runs, llm_latency):
+        """Full crew jobs, timed end to end"""
+        times, pages, rss, rows = [], 0, None, 0
+        for run in range(runs):
+            job_id = f"bench-crew-{run}"
+            output_file = os.path.join(self.workdir, f"{'_'.join(self.query.split())}_leads_crew{run}.csv")
+            started = time.perf_counter()
+            self.crew_job(job_id, output_file, llm_latency)
+            times.append(time.perf_counter() - started)
+            current = self.browser_rss()
+            if current is not None:
+                rss = max(rss or 0, current)
+            pages += self.pages(job_id)
+            rows = count_rows(output_file)
+        return {**summarize(times, pages, rss), "rows": rows}
+
+    def run(self, runs, crew_runs, llm_latency):
+        query = json.dumps({"query": self.query, "num_results": len(self.site_urls)})
+        results = {
+            "search_urls": self.measure("search_urls", runs, lambda tools, run: [lambda: tools.search_urls(query)]),
+            "get_website_content": self.measure(
+                "get_website_content", runs,
+                lambda tools, run: [lambda url=url: tools.get_website_content(url) for url in self.site_urls]),
+            "extract_contact_info": self.measure(
+                "extract_contact_info", runs,
+                lambda tools, run: [lambda url=url: tools.extract_contact_info(url) for url in self.site_urls]),
+        }
+
+        # Rows as the qualifier hands them to the Data Manager, extracted once outside the timings
+        extractor = self.tools("bench-rows")
+        try:
+            rows = [prospect_row(url, extractor.extract_page_data(url) or {"url": url}) for url in self.site_urls]
+        finally:
+            extractor.cleanup()
+        results["save_to_csv_file"] = self.measure("save_to_csv_file", runs, lambda tools, run: [
+            lambda: tools.save_to_csv_file(
+                rows, os.path.join(self.workdir, f"{'_'.join(self.query.split())}_leads_tools{run}.csv"))
+        ])
+
+        if crew_runs:
+            results["crew"] = self.run_crew(crew_runs, llm_latency)
+        return results
+
+    def close(self):
+        self.pool.close()
+
+
+def summarize(times, pages, rss):
+    total = sum(times)
+    return {
+        "calls": len(times),
+        "p50_ms": round(percentile(times, 0.5) * 1000, 2),
+        "p90_ms": round(percentile(times, 0.9) * 1000, 2),
+        "p99_ms": round(percentile(times, 0.99) * 1000, 2),
+        "max_ms": round(max(times) * 1000, 2),
+        "pages": pages,
+        "pages_per_sec": round(pages / total, 2) if total and pages else 0.0,
+        "browser_rss_mb": round(rss / 2 ** 20, 1) if rss else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against ``baseline`` as (operation, metric, baseline value, current value)"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        for key in ("p50_ms", "p90_ms"):
+            if current[key] > before[key] * (1 + tolerance) and current[key] - before[key] > NOISE_FLOOR_MS:
+                regressions.append((name, key, before[key], current[key]))
+        if before.get("pages_per_sec") and current["pages_per_sec"] < before["pages_per_sec"] * (1 - tolerance):
+            regressions.append((name, "pages_per_sec", before["pages_per_sec"], current["pages_per_sec"]))
+        if before.get("browser_rss_mb") and current["browser_rss_mb"] \
+                and current["browser_rss_mb"] > before["browser_rss_mb"] * (1 + tolerance):
+            regressions.append((name, "browser_rss_mb", before["browser_rss_mb"], current["browser_rss_mb"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh WebTools per tool, each calling it for every site")
+    parser.add_argument("--crew-runs", type=int, default=1, help="Full crew jobs (0 skips the crew run)")
+    parser.add_argument("--page-latency", type=float, default=0.02, help="Simulated seconds per request")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per model call")
+    parser.add_argument("--browser", action="store_true", help="Render every page in Chrome instead of plain HTTP")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline JSON to compare with (or save to)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a metric regresses")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    servers, endpoint, site_urls = serve_corpus(corpus, args.page_latency)
+    config = {"runs": args.runs, "crew_runs": args.crew_runs, "page_latency": args.page_latency,
+              "llm_latency": args.llm_latency, "browser": args.browser, "sites": len(site_urls)}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            harness = Harness(endpoint, site_urls, corpus["query"], workdir, browser=args.browser)
+            try:
+                results = harness.run(args.runs, args.crew_runs, args.llm_latency)
+            finally:
+                harness.close()
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    report = {"config": config, "results": results}
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    # Printed after the runs so the agents' console output does not interleave with the table
+    print(f"\n{len(site_urls)} sites, {args.runs} runs per tool, {args.crew_runs} crew runs, "
+          f"{args.page_latency}s per request, {'Chrome' if args.browser else 'plain HTTP'} page loads")
+    print(f"{'operation':<22} {'calls':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'pages/s':>8} "
+          f"{'Chrome MB':>10} {'p50 vs base':>12}")
+    for name, result in results.items():
+        before = (baseline or {}).get("results", {}).get(name)
+        change = f"{result['p50_ms'] / before['p50_ms'] - 1:+.0%}" if before and before["p50_ms"] else "-"
+        rss = f"{result['browser_rss_mb']:.0f}" if result["browser_rss_mb"] else "-"
+        print(f"{name:<22} {result['calls']:>6} {result['p50_ms']:>9.1f} {result['p90_ms']:>9.1f} "
+              f"{result['p99_ms']:>9.1f} {result['max_ms']:>9.1f} {result['pages_per_sec']:>8.1f} {rss:>10} "
+              f"{change:>12}")
+    if "crew" in results:
+        print(f"\nCrew run wrote {results['crew']['rows']} of {len(site_urls)} leads")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+        return 0
+    if baseline.get("config") != config:
+        print(f"Baseline was recorded with different settings: {baseline.get('config')}")
+    regressions = compare(results, baseline, args.tolerance)
+    for name, key, before, current in regressions:
+        print(f"REGRESSION {name} {key}: {before} -> {current}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+from logging_setup import get_logger
+import threading
+import os
+
+logger = get_logger(__name__)
+
+# Chrome page load profile (override via environment)
+# "extraction" strips pages down to what text extraction needs; "full" loads pages like a normal browser
+CHROME_PROFILE = os.getenv("CHROME_PROFILE", "extraction").strip().lower()
+# Resource kinds never downloaded in the extraction profile: images, media, fonts
+CHROME_BLOCK_RESOURCES = [r.strip().lower() for r in os.getenv("CHROME_BLOCK_RESOURCES", "images,media,fonts").split(",")
+                          if r.strip()]
+CHROME_BLOCK_TRACKERS = os.getenv("CHROME_BLOCK_TRACKERS", "true").lower() in ("1", "true", "yes")
+# "eager" returns from a navigation at DOMContentLoaded instead of waiting for every subresource
+CHROME_PAGE_LOAD_STRATEGY = os.getenv("CHROME_PAGE_LOAD_STRATEGY", "eager").strip().lower()
+# Subresource bytes a page may download before loading is stopped (0 disables the cap)
+CHROME_MAX_PAGE_BYTES = int(os.getenv("CHROME_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+
+RESOURCE_EXTENSIONS = {
+    "images": ["png", "jpg", "jpeg", "gif", "webp", "avif", "bmp", "ico", "svg", "tif", "tiff"],
+    "media": ["mp4", "webm", "mov", "m4v", "avi", "mp3", "m4a", "ogg", "wav", "m3u8"],
+    "fonts": ["woff", "woff2", "ttf", "otf", "eot"],
+}
+RESOURCE_HOSTS = {
+    "fonts": ["fonts.googleapis.com", "fonts.gstatic.com", "use.typekit.net", "p.typekit.net"],
+}
+
+# Analytics, ad and session-recording hosts that add nothing to a page's text
+TRACKER_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "connect.facebook.net", "hotjar.com", "clarity.ms", "cdn.segment.com",
+    "mixpanel.com", "js.hs-analytics.net", "js.hs-banner.com", "snap.licdn.com", "px.ads.linkedin.com",
+    "analytics.tiktok.com", "bat.bing.com", "static.ads-twitter.com", "quantserve.com", "scorecardresearch.com",
+    "fullstory.com", "crazyegg.com", "adnxs.com", "criteo.com", "taboola.com", "outbrain.com",
+    "amazon-adsystem.com", "js-agent.newrelic.com",
+] + [d.strip().lower() for d in os.getenv("CHROME_TRACKER_DOMAINS", "").split(",") if d.strip()]
+
+# Stops loading once the page's subresources (as reported by Resource Timing) exceed the budget
+PAGE_BUDGET_SCRIPT = """
+(() => {
+  const budget = %d;
+  let used = 0;
+  const count = (entry) => {
+    used += entry.transferSize || entry.encodedBodySize || 0;
+    if (used > budget && !window.__pageBudgetExceeded) {
+      window.__pageBudgetExceeded = used;
+      window.stop();
+    }
+  };
+  try {
+    new PerformanceObserver((list) => list.getEntries().forEach(count)).observe({type: 'resource', buffered: true});
+  } catch (e) {}
+})();
+"""
+
+
+def url_patterns(kinds, trackers=True):
+    """Network.setBlockedURLs patterns for the resource kinds (and tracker hosts) to block"""
+    patterns = []
+    for kind in kinds:
+        for ext in RESOURCE_EXTENSIONS.get(kind, []):
+            patterns += [f"*.{ext}", f"*.{ext}?*"]
+        for host in RESOURCE_HOSTS.get(kind, []):
+            patterns += [f"*://{host}/*"]
+    if trackers:
+        for domain in TRACKER_DOMAINS:
+            patterns += [f"*://{domain}/*", f"*://*.{domain}/*"]
+    return patterns
+
+
+class ChromeProfile:
+    """How drivers load pages: which resources they skip, when navigation returns and a byte cap.
+
+    Launch options are applied before Chrome starts; URL blocking and the byte
+    cap are installed over the DevTools protocol once the driver is running.
+    """
+
+    def __init__(self, name="extraction", block_resources=CHROME_BLOCK_RESOURCES, block_trackers=CHROME_BLOCK_TRACKERS,
+                 page_load_strategy=CHROME_PAGE_LOAD_STRATEGY, max_page_bytes=CHROME_MAX_PAGE_BYTES):
+        self.name = name
+        self.block_resources = list(block_resources)
+        self.block_trackers = block_trackers
+        self.page_load_strategy = page_load_strategy
+        self.max_page_bytes = max_page_bytes
+        self.blocked_urls = url_patterns(self.block_resources, self.block_trackers)
+
+    @classmethod
+    def full(cls):
+        """Load everything, like a normal browser"""
+        return cls("full", block_resources=(), block_trackers=False, page_load_strategy="normal", max_page_bytes=0)
+
+    @property
+    def ready_states(self):
+        """document.readyState values at which a page counts as loaded"""
+        if self.page_load_strategy in ("eager", "none"):
+            return ("interactive", "complete")
+        return ("complete",)
+
+    def apply(self, options):
+        """Add launch arguments and preferences to Chrome ``Options``"""
+        options.page_load_strategy = self.page_load_strategy
+        if not (self.block_resources or self.block_trackers):
+            return options
+        options.add_argument("--mute-audio")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--no-first-run")
+        prefs = {}
+        if "images" in self.block_resources:
+            # Also covers images served without a file extension
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            prefs["profile.managed_default_content_settings.images"] = 2
+        if "media" in self.block_resources:
+            options.add_argument("--autoplay-policy=user-gesture-required")
+        if "fonts" in self.block_resources:
+            options.add_argument("--disable-remote-fonts")
+        if prefs:
+            options.add_experimental_option("prefs", prefs)
+        return options
+
+    def install(self, driver):
+        """Block URLs and install the byte cap in a running driver; returns False when CDP is unavailable"""
+        try:
+            if self.blocked_urls:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+            if self.max_page_bytes:
+                driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                                       {"source": PAGE_BUDGET_SCRIPT % self.max_page_bytes})
+            return True
+        except Exception as e:
+            logger.warning(f"Could not install the {self.name} Chrome profile: {str(e)}")
+            return False
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "block_resources": self.block_resources,
+            "block_trackers": self.block_trackers,
+            "blocked_url_patterns": len(self.blocked_urls),
+            "page_load_strategy": self.page_load_strategy,
+            "max_page_bytes": self.max_page_bytes,
+        }
+
+
+_default_profile = None
+_default_profile_lock = threading.Lock()
+
+
+def get_default_profile():
+    """Return the process-wide Chrome profile selected by CHROME_PROFILE"""
+    global _default_profile
+    with _default_profile_lock:
+        if _default_profile is None:
+            _default_profile = ChromeProfile.full() if CHROME_PROFILE == "full" else ChromeProfile()
+        return _default_profile
@@ -0,0 +1,222 @@
+from concurrent.futures import ThreadPoolExecutor
+from logging_setup import get_logger
+from page_extraction import empty_contact_info, merge_contact_info, rank_contact_links, guess_contact_urls
+from metrics import bind_job
+import threading
+import asyncio
+import os
+
+logger = get_logger(__name__)
+
+# Contact probing settings (override via environment)
+CONTACT_PROBE_WORKERS = int(os.getenv("CONTACT_PROBE_WORKERS", "4"))
+CONTACT_REQUIRED_FIELDS = [
+    field.strip() for field in os.getenv("CONTACT_REQUIRED_FIELDS", "emails,phones").split(",") if field.strip()
+]
+
+# HEAD answers meaning the page does not exist; anything else is worth a GET
+MISSING_STATUSES = {404, 410}
+
+
+class ContactProber:
+    """Finds contact details by probing candidate contact pages concurrently.
+
+    Linked contact pages are tried first; guessed paths (/contact, /about, ...) are
+    only tried if those do not satisfy ``required_fields``, and are checked with a
+    HEAD request so missing pages are skipped without loading or rendering them.
+    Probing stops as soon as every required field has at least one value.
+    ``aprobe`` does the same from a coroutine, with ``async_http`` for the HEAD checks.
+    """
+
+    def __init__(self, http, max_workers=CONTACT_PROBE_WORKERS, required_fields=None, async_http=None):
+        self.http = http
+        self.async_http = async_http
+        self.max_workers = max_workers
+        self.required_fields = required_fields if required_fields is not None else CONTACT_REQUIRED_FIELDS
+        self._lock = threading.Lock()
+        self._stats = {
+            "probes": 0,
+            "head_requests": 0,
+            "head_missing": 0,
+            "pages_loaded": 0,
+            "pages_skipped": 0,
+            "early_exits": 0,
+        }
+
+    def satisfied(self, contact_info):
+        """True once every required field has a value"""
+        return all(contact_info.get(field) for field in self.required_fields)
+
+    def probe(self, url, homepage, visit, contact_info=None):
+        """Collect contact details from the site's contact pages.
+
+        ``visit(page_url)`` loads one candidate and returns its contact details
+        (or None); ``contact_info`` holds what is already known, e.g. from the homepage.
+        """
+        self._count("probes")
+        contact_info = contact_info if contact_info is not None else empty_contact_info()
+        if self.required_fields and self.satisfied(contact_info):
+            self._count("early_exits")
+            return contact_info
+        visited = {homepage.url.rstrip("/"), url.rstrip("/")}
+
+        linked = [u for u in rank_contact_links(homepage) if u.rstrip("/") not in visited]
+        if self._visit_all(linked, visit, contact_info):
+            return contact_info
+        visited.update(u.rstrip("/") for u in linked)
+        if linked and not self.required_fields:
+            return contact_info
+
+        guessed = [u for u in guess_contact_urls(url) if u.rstrip("/") not in visited]
+        self._visit_all(self._existing(guessed), visit, contact_info)
+        return contact_info
+
+    async def aprobe(self, url, homepage, visit, contact_info=None):
+        """``probe`` for coroutines; ``visit(page_url)`` is a coroutine function"""
+        self._count("probes")
+        contact_info = contact_info if contact_info is not None else empty_contact_info()
+        if self.required_fields and self.satisfied(contact_info):
+            self._count("early_exits")
+            return contact_info
+        visited = {homepage.url.rstrip("/"), url.rstrip("/")}
+
+        linked = [u for u in rank_contact_links(homepage) if u.rstrip("/") not in visited]
+        if await self._avisit_all(linked, visit, contact_info):
+            return contact_info
+        visited.update(u.rstrip("/") for u in linked)
+        if linked and not self.required_fields:
+            return contact_info
+
+        guessed = [u for u in guess_contact_urls(url) if u.rstrip("/") not in visited]
+        await self._avisit_all(await self._aexisting(guessed), visit, contact_info)
+        return contact_info
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _existing(self, urls):
+        """Drop candidates that answer HEAD with 404/410, keeping their original order"""
+        if not urls:
+            return []
+
+        def head(candidate):
+            try:
+                response = self.http.head(candidate)
+                return response.status_code if response is not None else None
+            except Exception:
+                return None  # unknown: let the full load decide
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)), thread_name_prefix="contact-head") as executor:
+            statuses = list(executor.map(bind_job(head), urls))
+        return self._keep_existing(urls, statuses)
+
+    async def _aexisting(self, urls):
+        if not urls:
+            return []
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def head(candidate):
+            try:
+                async with limit:
+                    if self.async_http is not None:
+                        response = await self.async_http.head(candidate)
+                    else:
+                        response = await asyncio.to_thread(self.http.head, candidate)
+                return response.status_code if response is not None else None
+            except Exception:
+                return None
+
+        return self._keep_existing(urls, await asyncio.gather(*(head(candidate) for candidate in urls)))
+
+    def _keep_existing(self, urls, statuses):
+        self._count("head_requests", len(urls))
+        existing = []
+        for candidate, status in zip(urls, statuses):
+            if status in MISSING_STATUSES:
+                logger.info(f"Skipping {candidate} (HTTP {status})")
+                self._count("head_missing")
+            else:
+                existing.append(candidate)
+        return existing
+
+    def _visit_all(self, urls, visit, contact_info):
+        """Load candidates concurrently and merge them in rank order; returns True on early exit"""
+        if not urls:
+            return False
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)), thread_name_prefix="contact-probe")
+        early_exit = False
+        try:
+            futures = [executor.submit(bind_job(visit), candidate) for candidate in urls]
+            for i, future in enumerate(futures):
+                try:
+                    found = future.result()
+                except Exception as e:
+                    logger.error(f"Error loading {urls[i]}: {str(e)}")
+                    found = None
+                self._count("pages_loaded")
+                if found:
+                    merge_contact_info(contact_info, found)
+                if self.required_fields and self.satisfied(contact_info):
+                    skipped = sum(1 for pending in futures[i + 1:] if pending.cancel())
+                    self._count("pages_skipped", skipped)
+                    self._count("early_exits")
+                    logger.success(f"Contact details complete after {i + 1} page(s)")
+                    early_exit = True
+                    return True
+        finally:
+            # After an early exit, pages already loading finish in the background instead of holding up the prospect
+            executor.shutdown(wait=not early_exit, cancel_futures=early_exit)
+        return False
+
+    async def _avisit_all(self, urls, visit, contact_info):
+        """Load candidates concurrently and merge them in rank order; returns True on early exit"""
+        if not urls:
+            return False
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def run(candidate):
+            async with limit:
+                return await visit(candidate)
+
+        tasks = [asyncio.ensure_future(run(candidate)) for candidate in urls]
+        try:
+            for i, task in enumerate(tasks):
+                try:
+                    found = await task
+                except Exception as e:
+                    logger.error(f"Error loading {urls[i]}: {str(e)}")
+                    found = None
+                self._count("pages_loaded")
+                if found:
+                    merge_contact_info(contact_info, found)
+                if self.required_fields and self.satisfied(contact_info):
+                    skipped = sum(1 for pending in tasks[i + 1:] if pending.cancel())
+                    self._count("pages_skipped", skipped)
+                    self._count("early_exits")
+                    logger.success(f"Contact details complete after {i + 1} page(s)")
+                    return True
+        finally:
+            for task in tasks:
+                task.cancel()
+        return False
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+
+_default_prober = None
+_default_prober_lock = threading.Lock()
+
+
+def get_default_prober():
+    """Return the process-wide prober, sharing the default fetchers' HTTP clients"""
+    global _default_prober
+    with _default_prober_lock:
+        if _default_prober is None:
+            from http_fetcher import get_default_fetcher
+            from async_fetcher import get_default_async_fetcher
+            _default_prober = ContactProber(get_default_fetcher().http, async_http=get_default_async_fetcher().http)
+        return _default_prober
@@ -0,0 +1,148 @@
+from logging_setup import get_logger
+import threading
+import csv
+import os
+
+logger = get_logger(__name__)
+
+# fsync after every row so a crash or power loss keeps every written prospect
+CSV_FSYNC = os.getenv("CSV_FSYNC", "true").lower() in ("1", "true", "yes")
+
+PART_SUFFIX = ".part"
+
+
+def merge_rows(rows, key_field, fieldnames, key_func=None):
+    """Collapse rows sharing ``key_field``: later non-empty values win, first-seen order is kept"""
+    merged = {}
+    unkeyed = []
+    for row in rows:
+        key = row.get(key_field)
+        if key and key_func:
+            key = key_func(key)
+        if not key:
+            unkeyed.append(row)
+            continue
+        current = merged.setdefault(key, {field: "" for field in fieldnames})
+        for field in fieldnames:
+            value = row.get(field)
+            if value not in (None, ""):
+                current[field] = value
+    return list(merged.values()) + unkeyed
+
+
+class StreamingCsvWriter:
+    """Appends rows to ``<path>.part`` as they arrive and atomically renames it to ``path`` when finished.
+
+    The header is written once, each row is flushed (and fsynced) as soon as it is
+    written, and a row whose key was already written is appended again and merged
+    into the earlier one when the file is finalized or read back.
+    """
+
+    def __init__(self, path, fieldnames, key_field="URL", defaults=None, key_func=None, on_row=None):
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.fieldnames = list(fieldnames)
+        self.key_field = key_field
+        self.defaults = defaults or {}
+        self.key_func = key_func or (lambda value: value)
+        self.on_row = on_row
+        self.rows_written = 0
+        self.finalized = False
+        self._keys = set()
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Append so a resumed run keeps rows already on disk; header only for a new file
+        self._file = open(self.part_path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        if CSV_FSYNC:
+            os.fsync(self._file.fileno())
+
+    def write(self, row):
+        """Append one row and flush it to disk"""
+        row = {**self.defaults, **{k: v for k, v in row.items() if v not in (None, "")}}
+        with self._lock:
+            if self.finalized:
+                raise ValueError(f"{self.path} is already finalized")
+            if self._file is None:
+                self._open()
+            self._writer.writerow(row)
+            self._sync()
+            self.rows_written += 1
+            key = self.key_func(row.get(self.key_field))
+            if key:
+                self._keys.add(key)
+            count = len(self._keys)
+        if self.on_row:
+            try:
+                self.on_row(row, count)
+            except Exception as e:
+                logger.error(f"Error in CSV row callback: {str(e)}")
+        return row
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    @property
+    def prospect_count(self):
+        """Distinct prospects written so far"""
+        with self._lock:
+            return len(self._keys)
+
+    def rows(self):
+        """Rows on disk so far, merged per key; safe to call while rows are still being appended"""
+        with self._lock:
+            source = self.path if self.finalized else self.part_path
+            try:
+                with open(source, newline="", encoding="utf-8") as f:
+                    rows = list(csv.DictReader(f))
+            except FileNotFoundError:
+                return []
+        return merge_rows(rows, self.key_field, self.fieldnames, self.key_func)
+
+    def finalize(self):
+        """Merge rows per key into a temporary file and atomically rename it over ``path``.
+
+        Returns False when nothing was written.
+        """
+        with self._lock:
+            if self.finalized:
+                return True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not os.path.exists(self.part_path):
+                return False
+            with open(self.part_path, newline="", encoding="utf-8") as f:
+                rows = merge_rows(list(csv.DictReader(f)), self.key_field, self.fieldnames, self.key_func)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            os.remove(self.part_path)
+            self.finalized = True
+        logger.success(f"Wrote {len(rows)} rows to {self.path}")
+        return True
+
+    def close(self):
+        """Close the partial file without finalizing it"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
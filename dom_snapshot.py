@@ -0,0 +1,58 @@
+# Reading elements one by one (find_elements, then .text / .get_attribute) costs a
+# WebDriver round trip per call. This script gathers everything the extractors need
+# from the rendered page in a single execute_script call.
+DOM_SNAPSHOT_SCRIPT = """
+var FOOTER = 'footer, .footer, [class*="footer"]';
+var ADDRESS = '[class*="address"], [class*="location"], [class*="contact-details"]';
+var SECTIONS = {
+    about: 'section#about, div#about, section.about, div.about',
+    services: 'section#services, div#services, section.services, div.services',
+    clients: 'section#clients, div#clients, section.clients, div.clients'
+};
+
+function text(el) {
+    return ((el.innerText !== undefined ? el.innerText : el.textContent) || '').trim();
+}
+
+var links = [];
+var anchors = document.querySelectorAll('a[href]');
+for (var i = 0; i < anchors.length; i++) {
+    var a = anchors[i];
+    links.push({href: a.href, text: text(a), in_footer: !!a.closest(FOOTER)});
+}
+
+var paragraphs = [];
+var ps = document.getElementsByTagName('p');
+for (var i = 0; i < ps.length; i++) {
+    var t = text(ps[i]);
+    if (t) { paragraphs.push(t); }
+}
+
+var addresses = [];
+var nodes = document.querySelectorAll(ADDRESS);
+for (var i = 0; i < nodes.length; i++) {
+    var t = text(nodes[i]);
+    if (t) { addresses.push(t); }
+}
+
+var sections = {};
+for (var name in SECTIONS) {
+    var el = document.querySelector(SECTIONS[name]);
+    if (el) { sections[name] = text(el); }
+}
+
+return {
+    url: window.location.href,
+    html: document.documentElement ? document.documentElement.outerHTML : '',
+    text: document.body ? text(document.body) : '',
+    links: links,
+    paragraphs: paragraphs,
+    addresses: addresses,
+    sections: sections
+};
+"""
+
+
+def collect_dom(driver):
+    """Return links, paragraphs, address blocks, sections, body text and HTML as one dict"""
+    return driver.execute_script(DOM_SNAPSHOT_SCRIPT) or {}
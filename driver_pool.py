@@ -0,0 +1,315 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from logging_setup import get_logger
+from chrome_profile import get_default_profile
+from collections import deque
+from contextlib import contextmanager
+import threading
+import atexit
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Pool sizing (override via environment)
+POOL_MIN_SIZE = int(os.getenv("DRIVER_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DRIVER_POOL_MAX_SIZE", "4"))
+POOL_MAX_PAGE_LOADS = int(os.getenv("DRIVER_POOL_MAX_PAGE_LOADS", "200"))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("DRIVER_POOL_ACQUIRE_TIMEOUT", "120"))
+PAGE_LOAD_TIMEOUT = 30
+
+
+def create_chrome_driver(profile=None):
+    """Launch a new headless Chrome WebDriver with the extraction profile (CHROME_PROFILE) applied"""
+    profile = profile or get_default_profile()
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    profile.apply(chrome_options)
+
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    profile.install(driver)
+    return driver
+
+
+class PoolTimeout(Exception):
+    """Raised when no driver becomes available within the acquire timeout"""
+
+
+class PooledDriver:
+    """A WebDriver checked out of a DriverPool.
+
+    Behaves like the underlying WebDriver; page loads made through ``get`` are
+    counted so the pool can recycle the browser once it has served enough pages.
+    """
+
+    def __init__(self, driver, pool):
+        self._driver = driver
+        self._pool = pool
+        self.page_loads = 0
+        self.created_at = time.time()
+
+    def get(self, url):
+        self.page_loads += 1
+        self._pool._record_page_load()
+        return self._driver.get(url)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class DriverPool:
+    """Thread-safe pool of reusable headless Chrome drivers"""
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 max_page_loads=POOL_MAX_PAGE_LOADS, acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+                 driver_factory=create_chrome_driver):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_page_loads = max_page_loads
+        self.acquire_timeout = acquire_timeout
+        self.driver_factory = driver_factory
+
+        self._idle = deque()
+        self._in_use = set()
+        # Drivers being health-checked and reset on their way back to the idle list
+        self._returning = set()
+        self._starting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "acquired": 0,
+            "released": 0,
+            "timeouts": 0,
+            "page_loads": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    # Lifecycle
+    def warm_up(self):
+        """Start drivers until the pool holds at least ``min_size`` of them"""
+        while True:
+            with self._cond:
+                if self._closed or self._size() >= self.min_size:
+                    return
+                self._starting += 1
+            pooled = self._start_driver()
+            with self._cond:
+                if pooled is not None:
+                    self._idle.append(pooled)
+                self._cond.notify()
+            if pooled is None:
+                return
+
+    def close(self):
+        """Quit every idle driver and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
+
+    # Checkout / return
+    def acquire(self, timeout=None):
+        """Check a healthy driver out of the pool, starting one if there is room"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            pooled = None
+            start_new = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        pooled = self._idle.popleft()
+                        self._in_use.add(pooled)
+                        break
+                    if self._size() < self.max_size:
+                        self._starting += 1
+                        start_new = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No Chrome driver available after {timeout:.0f}s")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if start_new:
+                pooled = self._start_driver()
+                with self._cond:
+                    if pooled is None:
+                        self._cond.notify()
+                        raise RuntimeError("Could not start Chrome WebDriver")
+                    self._in_use.add(pooled)
+            elif not self._is_healthy(pooled):
+                logger.warning("Discarding unhealthy Chrome driver")
+                self._discard(pooled)
+                continue
+
+            with self._cond:
+                wait_time = time.monotonic() - started
+                self._stats["acquired"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                self._stats["wait_time_total"] += wait_time
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+            return pooled
+
+    def release(self, pooled, broken=False):
+        """Return a driver to the pool, recycling it if worn out or crashed"""
+        with self._cond:
+            # Claim the checkout under the lock so a second release of the same driver is a no-op
+            if pooled not in self._in_use:
+                return
+            self._in_use.remove(pooled)
+            self._returning.add(pooled)
+        if broken or not self._is_healthy(pooled):
+            self._discard(pooled)
+            return
+        if self.max_page_loads and pooled.page_loads >= self.max_page_loads:
+            with self._cond:
+                self._stats["recycled"] += 1
+            self._discard(pooled, count=False)
+            return
+
+        if not self._reset(pooled):
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            self._returning.discard(pooled)
+            self._stats["released"] += 1
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append(pooled)
+                self._cond.notify()
+        if closed:
+            self._quit(pooled)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Context manager that checks a driver out and always returns it"""
+        pooled = self.acquire(timeout)
+        broken = False
+        try:
+            yield pooled
+        except Exception:
+            broken = not self._is_healthy(pooled)
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    # Metrics
+    def stats(self):
+        """Snapshot of pool size and wait-time metrics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "max_page_loads": self.max_page_loads,
+                "size": self._size(),
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "starting": self._starting,
+                "closed": self._closed,
+            })
+        acquired = stats["acquired"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / acquired if acquired else 0.0
+        return stats
+
+    def _record_page_load(self):
+        with self._cond:
+            self._stats["page_loads"] += 1
+
+    # Internals
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + len(self._returning) + self._starting
+
+    def _start_driver(self):
+        logger.info("Setting up Chrome WebDriver...")
+        try:
+            driver = self.driver_factory()
+        except Exception as e:
+            logger.error(f"Error initializing Chrome WebDriver: {str(e)}")
+            with self._cond:
+                self._starting -= 1
+            return None
+        logger.success("Chrome WebDriver initialized successfully")
+        with self._cond:
+            self._starting -= 1
+            self._stats["created"] += 1
+        return PooledDriver(driver, self)
+
+    def _is_healthy(self, pooled):
+        try:
+            pooled.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, pooled):
+        """Drop cookies, storage and cache so the next job starts clean"""
+        try:
+            try:
+                pooled.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass  # about:blank and some origins have no storage
+            try:
+                pooled.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                pooled.execute_cdp_cmd("Network.clearBrowserCache", {})
+            except Exception:
+                pooled.delete_all_cookies()
+            pooled._driver.get("about:blank")
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting Chrome driver: {str(e)}")
+            return False
+
+    def _discard(self, pooled, count=True):
+        with self._cond:
+            self._in_use.discard(pooled)
+            self._returning.discard(pooled)
+            if count:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        self._quit(pooled)
+
+    def _quit(self, pooled):
+        try:
+            logger.info("Closing Chrome WebDriver...")
+            pooled.quit()
+        except Exception as e:
+            logger.error(f"Error during cleanup: {str(e)}")
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    """Return the process-wide driver pool, creating it on first use"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,155 @@
+from collections import deque
+from datetime import datetime
+import threading
+import asyncio
+import json
+import os
+
+# Event stream limits (override via environment)
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "500"))
+EVENT_SUBSCRIBER_BUFFER = int(os.getenv("EVENT_SUBSCRIBER_BUFFER", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_RETRY_MS = int(os.getenv("EVENT_RETRY_MS", "1000"))
+
+
+class Subscription:
+    """One subscriber's bounded event buffer, filled on the subscriber's event loop.
+
+    A subscriber that falls more than ``max_buffer`` events behind is dropped; it
+    reconnects with the last offset it saw and replays the rest from history.
+    """
+
+    def __init__(self, log, loop, max_buffer):
+        self.log = log
+        self.loop = loop
+        self.max_buffer = max_buffer
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+        self.closed = False
+
+    def push(self, event):
+        """Hand an event (or None for end of stream) over from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # Subscriber's event loop is gone
+            self.log.unsubscribe(self)
+
+    def _deliver(self, event):
+        if self.closed:
+            return
+        if event is not None and self.queue.qsize() >= self.max_buffer:
+            self.overflowed = True
+            event = None
+        if event is None:
+            self.closed = True
+            self.log.unsubscribe(self)
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        """Next event, or None once the stream has ended or this subscriber was dropped"""
+        return await self.queue.get()
+
+    def close(self):
+        self.closed = True
+        self.log.unsubscribe(self)
+
+
+class EventLog:
+    """Append-only, offset-addressed event history for one job with live subscribers"""
+
+    def __init__(self, history_size=EVENT_HISTORY_SIZE, subscriber_buffer=EVENT_SUBSCRIBER_BUFFER):
+        self.subscriber_buffer = subscriber_buffer
+        self._events = deque(maxlen=history_size)
+        self._next_offset = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.closed = False
+        self.dropped_subscribers = 0
+
+    def publish(self, event_type, data):
+        """Append an event and push it to every subscriber"""
+        with self._lock:
+            if self.closed:
+                return None
+            event = {
+                "offset": self._next_offset,
+                "type": event_type,
+                "data": data,
+                "time": datetime.now().isoformat(),
+            }
+            self._next_offset += 1
+            self._events.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(event)
+        return event
+
+    def close(self):
+        """End the stream; subscribers receive the remaining events, then end of stream"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(None)
+
+    def events(self, after=-1):
+        """Retained events with an offset greater than ``after``"""
+        with self._lock:
+            return [event for event in self._events if event["offset"] > after]
+
+    def subscribe(self, after=-1, loop=None):
+        """Subscribe from the running event loop, replaying retained events after ``after``"""
+        subscriber = Subscription(self, loop or asyncio.get_running_loop(), self.subscriber_buffer)
+        with self._lock:
+            backlog = [event for event in self._events if event["offset"] > after]
+            closed = self.closed
+            if not closed:
+                self._subscribers.add(subscriber)
+        for event in backlog:
+            subscriber.queue.put_nowait(event)
+        if closed:
+            subscriber.queue.put_nowait(None)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.discard(subscriber)
+                if subscriber.overflowed:
+                    self.dropped_subscribers += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": self._next_offset,
+                "retained": len(self._events),
+                "subscribers": len(self._subscribers),
+                "dropped_subscribers": self.dropped_subscribers,
+                "closed": self.closed,
+            }
+
+
+def format_sse(event):
+    """Encode an event in the text/event-stream wire format"""
+    return f"id: {event['offset']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+async def sse_stream(log, after=-1, heartbeat=EVENT_HEARTBEAT_SECONDS):
+    """Yield Server-Sent Events for ``log`` until it closes, with keep-alive comments while idle"""
+    subscriber = log.subscribe(after)
+    try:
+        yield f"retry: {EVENT_RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            yield format_sse(event)
+    finally:
+        subscriber.close()
@@ -0,0 +1,234 @@
+import threading
+import re
+import os
+
+try:
+    import ahocorasick
+except ImportError:  # optional C accelerator (pip install pyahocorasick)
+    ahocorasick = None
+
+# Countries whose phone/postcode rules are applied (comma-separated, override via environment)
+CONTACT_COUNTRIES = [
+    country.strip().lower() for country in os.getenv("CONTACT_COUNTRIES", "uk").split(",") if country.strip()
+]
+
+EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+EMAIL_PLACEHOLDERS = ["example", "domain", "email"]
+EMAIL_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+# Emails are only matched in a window around each "@" (RFC 5321 length limits)
+EMAIL_LOCAL_MAX = 64
+EMAIL_DOMAIN_MAX = 255
+
+# "name [at] agency [dot] com", "name (at) agency.co.uk", "name at agency dot com".
+# Markers are located with str.find and the patterns are only matched next to them.
+BRACKETED_AT_MARKERS = ("[at]", "(at)", "{at}")
+SPELLED_DOT_MARKER = "dot"
+SPELLED_WINDOW = (EMAIL_LOCAL_MAX + 16, 160)
+BRACKETED_DOMAIN = re.compile(
+    r'\s*([a-zA-Z0-9-]+(?:(?:\.|\s*(?:\[dot\]|\(dot\)|\{dot\})\s*)[a-zA-Z0-9-]+)+)', re.IGNORECASE
+)
+SPELLED_EMAIL = re.compile(
+    r'([a-zA-Z0-9._%+-]+)\s+at\s+([a-zA-Z0-9-]+(?:\s+dot\s+[a-zA-Z0-9-]+)+)', re.IGNORECASE
+)
+OBFUSCATED_DOT = re.compile(r'\s*(?:\[dot\]|\(dot\)|\{dot\}|\s+dot\s+)\s*', re.IGNORECASE)
+VALID_DOMAIN = re.compile(r'[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+
+class CountryRules:
+    """Phone and postcode patterns for one country"""
+
+    def __init__(self, code, phone_pattern, postcode_pattern):
+        self.code = code
+        self.phone_pattern = phone_pattern
+        self.postcode_pattern = postcode_pattern
+
+
+COUNTRY_RULES = {}
+
+
+def register_country(rules):
+    """Add or replace the phone/postcode rules for a country"""
+    COUNTRY_RULES[rules.code] = rules
+    return rules
+
+
+register_country(CountryRules(
+    "uk",
+    phone_pattern=r'(?:\+44|0)(?:[\s-]*\d){9,10}',
+    postcode_pattern=r'[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}',
+))
+register_country(CountryRules(
+    "us",
+    phone_pattern=r'(?:\+1[\s.-]?)?\(?[2-9]\d{2}\)?[\s.-]?\d{3}[\s.-]?\d{4}',
+    postcode_pattern=r'\b[A-Z]{2}\s+\d{5}(?:-\d{4})?\b',
+))
+register_country(CountryRules(
+    "ie",
+    phone_pattern=r'(?:\+353|0)(?:[\s-]*\d){8,9}',
+    postcode_pattern=r'\b[AC-FHKNPRTV-Y][0-9]{2}\s?[0-9AC-FHKNPRTV-Y]{4}\b',
+))
+register_country(CountryRules(
+    "de",
+    phone_pattern=r'(?:\+49|0)(?:[\s/-]*\d){9,11}',
+    postcode_pattern=r'\b\d{5}\s+[A-ZÄÖÜ][a-zäöüß]+',
+))
+
+
+class KeywordMatcher:
+    """Matches many keywords in one pass over the text.
+
+    Keywords are grouped under labels (e.g. ``ai`` and ``enterprise``); ``scan``
+    returns the keywords found per label and can stop as soon as every label
+    has matched. Matching is case-insensitive substring matching. Uses a C
+    Aho–Corasick automaton when pyahocorasick is installed, otherwise one
+    substring search per keyword over the text lowercased once.
+    """
+
+    def __init__(self, groups):
+        self.labels = list(groups)
+        self._labels_for = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                self._labels_for.setdefault(keyword.lower(), []).append(label)
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._labels_for:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+
+    def _iter_keywords(self, text, remaining):
+        if self._automaton is not None:
+            for _, keyword in self._automaton.iter(text):
+                yield keyword
+        else:
+            # str.find runs in C; keywords whose labels are all matched are skipped
+            for keyword, labels in self._labels_for.items():
+                if not remaining.isdisjoint(labels) and keyword in text:
+                    yield keyword
+
+    def scan(self, text, stop_when_all_found=True):
+        """Return {label: set of matched keywords}"""
+        found = {label: set() for label in self.labels}
+        remaining = set(self.labels)
+        # With stop_when_all_found off every keyword is checked, so keep the label set full
+        wanted = remaining if stop_when_all_found else set(self.labels)
+        for keyword in self._iter_keywords(text.lower(), wanted):
+            for label in self._labels_for[keyword]:
+                found[label].add(keyword)
+                remaining.discard(label)
+            if stop_when_all_found and not remaining:
+                break
+        return found
+
+    def matches(self, text):
+        """Labels with at least one keyword in ``text``"""
+        return {label for label, keywords in self.scan(text).items() if keywords}
+
+
+class ContactExtractor:
+    """Precompiled scanner for emails and phone numbers of the configured countries.
+
+    Cheap C-level substring checks ("@", obfuscation markers) decide where the
+    email patterns run, so most of the page text is never fed to a regex.
+    """
+
+    def __init__(self, countries=None):
+        countries = countries or CONTACT_COUNTRIES
+        unknown = [code for code in countries if code not in COUNTRY_RULES]
+        if unknown:
+            raise ValueError(f"No contact rules for countries: {', '.join(unknown)}")
+        self.countries = [COUNTRY_RULES[code] for code in countries]
+
+        self.email = re.compile(EMAIL_PATTERN)
+        self.phones = [re.compile(rules.phone_pattern) for rules in self.countries]
+        self.postcode = re.compile("|".join(f"(?:{rules.postcode_pattern})" for rules in self.countries))
+
+    def scan(self, text):
+        """Return (emails, phones) found in ``text`` in order of appearance"""
+        emails = self._find_emails(text) + self._deobfuscate(text)
+        emails = [e for e in emails if not any(x in e.lower() for x in EMAIL_PLACEHOLDERS)]
+        return emails, self._find_phones(text)
+
+    def has_postcode(self, text):
+        return bool(self.postcode.search(text))
+
+    def _find_emails(self, text):
+        emails = []
+        scanned_to = 0
+        at = text.find("@")
+        while at != -1:
+            start = max(scanned_to, at - EMAIL_LOCAL_MAX)
+            end = at + EMAIL_DOMAIN_MAX
+            for match in self.email.finditer(text, start, end):
+                # A match cut off by the local-part limit is the tail of an over-long token; one starting
+                # where the previous match ended is not
+                if match.start() == start and start > scanned_to and text[start - 1] in EMAIL_LOCAL_CHARS:
+                    continue
+                if end < len(text):
+                    # The window end (set by an earlier "@") may cut the address short, so match it again in full
+                    match = self.email.match(text, match.start())
+                emails.append(match.group())
+                scanned_to = match.end()
+            at = text.find("@", max(at + 1, scanned_to))
+        return emails
+
+    def _find_phones(self, text):
+        if len(self.phones) == 1:
+            return self.phones[0].findall(text)
+        found = sorted((m.start(), m.group()) for pattern in self.phones for m in pattern.finditer(text))
+        return [phone for _, phone in found]
+
+    def _deobfuscate(self, text):
+        lowered = text.lower()
+        found = []
+        for marker in BRACKETED_AT_MARKERS:
+            at = lowered.find(marker)
+            while at != -1:
+                user_end = at
+                while user_end > 0 and text[user_end - 1].isspace():
+                    user_end -= 1
+                user_start = user_end
+                while user_start > 0 and user_end - user_start < EMAIL_LOCAL_MAX and text[user_start - 1] in EMAIL_LOCAL_CHARS:
+                    user_start -= 1
+                match = BRACKETED_DOMAIN.match(text, at + len(marker))
+                if user_start < user_end and match:
+                    found.append((user_start, text[user_start:user_end], match.group(1)))
+                at = lowered.find(marker, at + len(marker))
+
+        scanned_to = 0
+        before, after = SPELLED_WINDOW
+        dot = lowered.find(SPELLED_DOT_MARKER)
+        while dot != -1:
+            end = dot + len(SPELLED_DOT_MARKER)
+            if dot >= scanned_to and 0 < dot and end < len(text) and text[dot - 1].isspace() and text[end].isspace():
+                for match in SPELLED_EMAIL.finditer(text, max(scanned_to, dot - before), end + after):
+                    if match.start() <= dot < match.end():
+                        if end + after < len(text):
+                            match = SPELLED_EMAIL.match(text, match.start())
+                        found.append((match.start(), match.group(1), match.group(2)))
+                        scanned_to = match.end()
+                        break
+            dot = lowered.find(SPELLED_DOT_MARKER, end)
+
+        emails = []
+        for _, user, domain in sorted(found):
+            domain = OBFUSCATED_DOT.sub(".", domain)
+            if VALID_DOMAIN.fullmatch(domain):
+                emails.append(f"{user}@{domain}")
+        return emails
+
+
+_default_extractor = None
+_default_extractor_lock = threading.Lock()
+
+
+def get_default_extractor():
+    """Return the process-wide contact extractor for CONTACT_COUNTRIES"""
+    global _default_extractor
+    with _default_extractor_lock:
+        if _default_extractor is None:
+            _default_extractor = ContactExtractor()
+        return _default_extractor
@@ -0,0 +1,443 @@
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from contextlib import nullcontext
+from logging_setup import get_logger
+from page_cache import get_default_cache
+from politeness import BACKOFF_STATUSES, get_default_scheduler
+from dom_snapshot import collect_dom
+from metrics import get_default_metrics
+import threading
+import requests
+import time
+import re
+import os
+
+logger = get_logger(__name__)
+
+# HTTP client settings (override via environment)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "true").lower() in ("1", "true", "yes")
+# Requests answered with 429/5xx are retried this many times once the host's backoff has passed
+HTTP_BACKOFF_RETRIES = int(os.getenv("HTTP_BACKOFF_RETRIES", "1"))
+USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+# Statuses that usually mean "blocked for non-browsers" rather than "page missing"
+ESCALATE_STATUSES = {401, 403, 429, 503}
+
+# Pages with less visible text than this are assumed to need JavaScript
+MIN_STATIC_TEXT_LENGTH = 200
+JS_APP_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|___gatsby)["\'][^>]*>\s*</div>'
+    r'|enable javascript|javascript is required|you need to enable javascript',
+    re.IGNORECASE
+)
+
+SECTION_NAMES = ("about", "services", "clients")
+ADDRESS_CLASS_HINTS = ("address", "location", "contact-details")
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head", "iframe"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "nav", "main", "aside", "li", "ul", "ol",
+    "h1", "h2", "h3", "h4", "h5", "h6", "br", "tr", "td", "th", "table", "address", "form", "blockquote"
+}
+
+
+class PageSnapshot:
+    """Everything the extractors need from a loaded page.
+
+    ``text`` is the visible body text; ``links`` are dicts with absolute ``href``,
+    link ``text`` and whether the link sits in a footer; ``sections`` maps about /
+    services / clients to the text of the first matching section or div.
+    """
+
+    def __init__(self, url, html="", text="", links=None, paragraphs=None, addresses=None,
+                 sections=None, status=200, tier=None, headers=None):
+        self.url = url
+        self.html = html
+        self.text = text
+        self.links = links or []
+        self.paragraphs = paragraphs or []
+        self.addresses = addresses or []
+        self.sections = sections or {}
+        self.status = status
+        self.tier = tier
+        self.headers = headers or {}
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+
+class _Capture:
+    def __init__(self, kind, name=None, attrs=None):
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs or {}
+        self.parts = []
+
+    def text(self):
+        return _clean_text("".join(self.parts))
+
+
+def _clean_text(text):
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class _SnapshotParser(HTMLParser):
+    """Single pass over the HTML collecting text, links, paragraphs, sections and address blocks"""
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.stack = []          # (tag, [captures])
+        self.skip_depth = 0
+        self.footer_depth = 0
+        self.text_parts = []
+        self.links = []
+        self.paragraphs = []
+        self.addresses = []
+        self.sections = {}
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth:
+            if tag in SKIP_TAGS:
+                self.skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self.skip_depth = 1
+            return
+        if tag in BLOCK_TAGS:
+            self._add_text("\n")
+        if tag in VOID_TAGS:
+            return
+        if tag == "p" and self.stack and self.stack[-1][0] == "p":
+            self._close_top()
+
+        attrs = dict(attrs)
+        element_id = (attrs.get("id") or "").lower()
+        element_class = (attrs.get("class") or "").lower()
+        class_tokens = element_class.split()
+        captures = []
+
+        if tag == "a" and attrs.get("href"):
+            captures.append(_Capture("link", attrs={"href": urljoin(self.base_url, attrs["href"].strip())}))
+        if tag == "p":
+            captures.append(_Capture("paragraph"))
+        if tag in ("section", "div"):
+            for name in SECTION_NAMES:
+                if name not in self.sections and (element_id == name or name in class_tokens):
+                    self.sections[name] = None  # reserve so only the first match counts
+                    captures.append(_Capture("section", name=name))
+                    break
+        if any(hint in element_class for hint in ADDRESS_CLASS_HINTS):
+            captures.append(_Capture("address"))
+
+        is_footer = tag == "footer" or "footer" in element_class
+        if is_footer:
+            self.footer_depth += 1
+            captures.append(_Capture("footer"))
+        self.stack.append((tag, captures))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and not self.skip_depth and self.stack and self.stack[-1][0] == tag:
+            self._close_top()
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag in SKIP_TAGS:
+                self.skip_depth -= 1
+            return
+        if tag in BLOCK_TAGS:
+            self._add_text("\n")
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+        while self.stack:
+            open_tag = self.stack[-1][0]
+            self._close_top()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self._add_text(data)
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self._close_top()
+
+    def _add_text(self, data):
+        self.text_parts.append(data)
+        for _, captures in self.stack:
+            for capture in captures:
+                capture.parts.append(data)
+
+    def _close_top(self):
+        _, captures = self.stack.pop()
+        for capture in captures:
+            if capture.kind == "link":
+                self.links.append({
+                    "href": capture.attrs["href"],
+                    "text": capture.text(),
+                    "in_footer": self.footer_depth > 0,
+                })
+            elif capture.kind == "paragraph":
+                self.paragraphs.append(capture.text())
+            elif capture.kind == "section":
+                self.sections[capture.name] = capture.text()
+            elif capture.kind == "address":
+                self.addresses.append(capture.text())
+            elif capture.kind == "footer":
+                self.footer_depth -= 1
+
+
+def parse_html(html, url, status=200, tier=None):
+    """Parse raw HTML into a PageSnapshot"""
+    parser = _SnapshotParser(url)
+    try:
+        parser.feed(html or "")
+        parser.close()
+    except Exception as e:
+        logger.error(f"Error parsing HTML from {url}: {str(e)}")
+    return PageSnapshot(
+        url=url,
+        html=html or "",
+        text=_clean_text("".join(parser.text_parts)),
+        links=parser.links,
+        paragraphs=[p for p in parser.paragraphs if p],
+        addresses=[a for a in parser.addresses if a],
+        sections={name: text for name, text in parser.sections.items() if text is not None},
+        status=status,
+        tier=tier,
+    )
+
+
+def looks_js_rendered(snapshot):
+    """Heuristic: the static HTML is an app shell whose content only appears after JavaScript runs"""
+    if len(snapshot.text) < MIN_STATIC_TEXT_LENGTH:
+        return True
+    return bool(JS_APP_MARKERS.search(snapshot.html)) and len(snapshot.text) < MIN_STATIC_TEXT_LENGTH * 5
+
+
+def snapshot_from_driver(driver, url):
+    """Build a PageSnapshot from the page currently loaded in a WebDriver with one script call"""
+    dom = collect_dom(driver)
+    return PageSnapshot(
+        url=dom.get("url") or url,
+        html=dom.get("html", ""),
+        text=dom.get("text", ""),
+        links=dom.get("links", []),
+        paragraphs=dom.get("paragraphs", []),
+        addresses=dom.get("addresses", []),
+        sections=dom.get("sections", {}),
+        tier="browser",
+    )
+
+
+def snapshot_from_response(url, response):
+    """PageSnapshot for an HTTP response (requests or httpx), or None when it is missing or not HTML"""
+    if response is None:
+        return None
+    if response.status_code == 304:
+        return PageSnapshot(url, status=304, tier="http", headers=CaseInsensitiveDict(response.headers))
+    content_type = response.headers.get("Content-Type", "")
+    if "html" not in content_type.lower() and content_type:
+        return None
+    snapshot = parse_html(response.text, str(response.url), status=response.status_code, tier="http")
+    # httpx lower-cases header names
+    snapshot.headers = CaseInsensitiveDict(response.headers)
+    return snapshot
+
+
+class HttpFetcher:
+    """Pooled keep-alive HTTP client for static pages"""
+
+    def __init__(self, timeout=HTTP_TIMEOUT, pool_size=HTTP_POOL_SIZE, scheduler=None, retries=HTTP_BACKOFF_RETRIES):
+        self.timeout = timeout
+        # Per-host throttle shared with the browser loads
+        self.scheduler = scheduler if scheduler is not None else get_default_scheduler()
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-GB,en;q=0.9",
+        })
+
+    def get(self, url, headers=None):
+        """GET a URL, returning the response or None on network errors"""
+        return self.request("GET", url, headers=headers)
+
+    def head(self, url):
+        """HEAD a URL, returning the response or None on network errors"""
+        return self.request("HEAD", url)
+
+    def request(self, method, url, headers=None):
+        """Send a request through the host's politeness slot, retrying after backoff on 429/5xx"""
+        with get_default_metrics().span("http_request", method=method):
+            return self._request(method, url, headers)
+
+    def _request(self, method, url, headers=None):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.scheduler.slot(url) if self.scheduler else nullcontext():
+                    response = self.session.request(method, url, timeout=self.timeout, headers=headers,
+                                                    allow_redirects=True)
+            except requests.RequestException as e:
+                logger.warning(f"HTTP fetch failed for {url}: {str(e)}")
+                return None
+            if self.scheduler:
+                self.scheduler.record(url, response.status_code, response.headers)
+            if response.status_code not in BACKOFF_STATUSES or attempt == self.retries:
+                return response
+
+    def fetch(self, url, headers=None):
+        """Fetch and parse an HTML page; returns None when the page is not usable HTML.
+
+        A 304 answer to a conditional request comes back as an empty snapshot with status 304.
+        """
+        return snapshot_from_response(url, self.get(url, headers=headers))
+
+    def close(self):
+        self.session.close()
+
+
+class TieredFetcher:
+    """Serve pages from the page cache, then plain HTTP, escalating to Chrome only when needed"""
+
+    def __init__(self, http=None, fast_path=HTTP_FAST_PATH, cache=None):
+        self.http = http or HttpFetcher()
+        self.fast_path = fast_path
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._stats = {
+            "cache_served": 0,
+            "http_served": 0,
+            "browser_served": 0,
+            "escalated_js": 0,
+            "escalated_status": 0,
+            "escalated_error": 0,
+            "escalated_empty": 0,
+        }
+
+    def load(self, url, get_driver, readiness, selector=None, force_browser=False, browser_lock=None):
+        """Return a PageSnapshot for ``url`` from the cheapest tier that can serve it.
+
+        ``get_driver`` is only called when the page has to be rendered, so callers
+        that are served from the cache or over HTTP never check a browser out of the pool.
+        ``browser_lock`` serialises renders when several threads share one driver.
+        """
+        started = time.perf_counter()
+        cached, snapshot = self.lookup(url, started, force_browser)
+        if snapshot is not None:
+            return snapshot
+
+        if self.fast_path and not force_browser:
+            snapshot = self.from_http(url, self.http.fetch(url, headers=self.validators(cached)), cached, started)
+            if snapshot is not None:
+                return snapshot
+        return self.render(url, get_driver, readiness, selector, browser_lock, started)
+
+    def lookup(self, url, started, force_browser=False):
+        """The usable cache entry for ``url`` (or None), and a snapshot when that entry is fresh enough to serve"""
+        cached = self.cache.get(url) if self.cache else None
+        usable = cached is not None and (cached.tier == "browser" or not force_browser)
+        if not usable:
+            return None, None
+        if cached.is_fresh(self.cache.ttl):
+            self._served("cache", started)
+            return cached, parse_html(cached.html, cached.url, status=cached.status, tier=cached.tier)
+        return cached, None
+
+    @staticmethod
+    def validators(cached):
+        """Conditional request headers for revalidating a stale HTTP-tier entry"""
+        return cached.validators if cached is not None and cached.tier == "http" else None
+
+    def from_http(self, url, snapshot, cached, started):
+        """The snapshot to serve for a plain HTTP answer, or None when the page has to be rendered"""
+        if snapshot is not None and snapshot.status == 304:
+            self.cache.touch(url)
+            self._served("cache", started)
+            return parse_html(cached.html, cached.url, status=cached.status, tier=cached.tier)
+        if snapshot is None:
+            self._count("escalated_error")
+        elif snapshot.status in ESCALATE_STATUSES:
+            self._count("escalated_status")
+        elif not snapshot.ok or not looks_js_rendered(snapshot):
+            self._served("http", started)
+            self._store(url, snapshot)
+            return snapshot
+        else:
+            self._count("escalated_js")
+        return None
+
+    def render(self, url, get_driver, readiness, selector=None, browser_lock=None, started=None):
+        """Render ``url`` in Chrome (blocking) and cache the result"""
+        started = started if started is not None else time.perf_counter()
+        logger.info(f"Rendering in Chrome: {url}")
+        with browser_lock or nullcontext():
+            driver = get_driver()
+            readiness.load(driver, url, selector=selector)
+            snapshot = snapshot_from_driver(driver, url)
+        self._served("browser", started)
+        self._store(url, snapshot)
+        return snapshot
+
+    def _store(self, url, snapshot):
+        if self.cache is None:
+            return
+        self.cache.put(
+            url,
+            snapshot.html,
+            status=snapshot.status,
+            tier=snapshot.tier,
+            etag=snapshot.headers.get("ETag"),
+            last_modified=snapshot.headers.get("Last-Modified"),
+            final_url=snapshot.url
+        )
+
+    def _served(self, tier, started):
+        self._count(f"{tier}_served")
+        get_default_metrics().observe("page_load", time.perf_counter() - started, tier=tier)
+
+    def record_empty_escalation(self):
+        """Count a page re-rendered in Chrome because the static HTML yielded nothing"""
+        self._count("escalated_empty")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats["cache_served"] + stats["http_served"] + stats["browser_served"]
+        stats["cache_ratio"] = stats["cache_served"] / served if served else 0.0
+        stats["http_ratio"] = stats["http_served"] / served if served else 0.0
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_default_fetcher():
+    """Return the process-wide tiered fetcher so connections and counters are shared"""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = TieredFetcher(cache=get_default_cache())
+        return _default_fetcher
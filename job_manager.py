@@ -0,0 +1,303 @@
+from logging_setup import get_logger
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import asyncio
+import queue
+import uuid
+import os
+
+from event_stream import EventLog
+
+logger = get_logger(__name__)
+
+# Job execution limits (override via environment)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+# "async" runs lead generation jobs as tasks on the app's event loop, "thread" on worker threads
+JOB_RUNNER = os.getenv("JOB_RUNNER", "async").strip().lower()
+# Jobs the async runner works on at once; a waiting job costs a task, not a thread
+JOB_ASYNC_WORKERS = int(os.getenv("JOB_ASYNC_WORKERS", "8"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested"""
+
+
+class Job:
+    """A single lead generation run and its live status"""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.cancel_event = threading.Event()
+        self.events = EventLog()
+        # Streaming CSV writer attached by the runner, read by the partial results endpoint
+        self.results = None
+        self._lock = threading.Lock()
+        self.status = {
+            "job_id": self.id,
+            "state": QUEUED,
+            "query": getattr(params, "query", None),
+            "num_prospects": getattr(params, "num_prospects", None),
+            "is_running": False,
+            "current_agent": "Queued",
+            "current_task": "Waiting for a free worker",
+            "error": None,
+            "csv_path": None,
+            "prospects_written": 0,
+            "partial_results": False,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self.events.publish("status", dict(self.status))
+
+    @property
+    def state(self):
+        return self.status["state"]
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def update(self, **fields):
+        """Update status fields atomically and publish the new status to event subscribers"""
+        with self._lock:
+            self.status.update(fields)
+            self.events.publish("status", dict(self.status))
+            finished = self.status["state"] in FINISHED_STATES and not self.status["is_running"]
+        if finished:
+            self.events.close()
+
+    def publish(self, event_type, **data):
+        """Publish a non-status event (e.g. a crew step) to event subscribers"""
+        self.events.publish(event_type, data)
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def to_dict(self):
+        with self._lock:
+            return dict(self.status)
+
+
+class JobManager:
+    """Runs jobs from a bounded queue on a fixed number of worker threads"""
+
+    def __init__(self, runner, max_workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE,
+                 history_size=JOB_HISTORY_SIZE):
+        self.runner = runner
+        self.max_workers = max_workers
+        self.history_size = history_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._stopping = False
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping = False
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Job manager started with {self.max_workers} workers")
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the workers"""
+        with self._lock:
+            self._stopping = True
+            jobs = list(self._jobs.values())
+            workers, self._workers = self._workers, []
+        for job in jobs:
+            if job.state not in FINISHED_STATES:
+                self.cancel(job.id)
+        for _ in workers:
+            self._queue.put(None)
+
+    def submit(self, params):
+        """Queue a new job and return it"""
+        job = Job(params)
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("Job manager is shutting down")
+            try:
+                self._queue.put_nowait(job)
+            except (queue.Full, asyncio.QueueFull):
+                raise QueueFull("Job queue is full, try again later")
+            self._jobs[job.id] = job
+            self._trim_history()
+        logger.info(f"Queued job {job.id}: {job.status['query']}")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self):
+        """Return the most recently submitted job, if any"""
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are cancelled immediately"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.state == QUEUED:
+            job.update(
+                state=CANCELLED,
+                current_agent="Cancelled",
+                current_task="Job cancelled before it started",
+                finished_at=datetime.now().isoformat(),
+            )
+        elif job.state == RUNNING:
+            job.update(current_task="Cancellation requested")
+        return job
+
+    def list_jobs(self):
+        """Group job statuses into queued, running and finished lists"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        grouped = {"queued": [], "running": [], "finished": []}
+        for job in jobs:
+            status = job.to_dict()
+            if status["state"] == QUEUED:
+                grouped["queued"].append(status)
+            elif status["state"] == RUNNING:
+                grouped["running"].append(status)
+            else:
+                grouped["finished"].append(status)
+        return grouped
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if job.cancelled:
+                    continue
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        self._begin(job)
+        try:
+            self.runner(job)
+            job.check_cancelled()
+            job.update(state=COMPLETED)
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            job.update(is_running=False, finished_at=datetime.now().isoformat())
+
+    def _begin(self, job):
+        job.update(
+            state=RUNNING,
+            is_running=True,
+            current_agent="Initializing",
+            current_task="Setting up environment",
+            started_at=datetime.now().isoformat(),
+        )
+
+    def _fail(self, job, e):
+        if isinstance(e, JobCancelled):
+            job.update(state=CANCELLED, current_agent="Cancelled", current_task="Job cancelled")
+            logger.warning(f"Job {job.id} cancelled")
+            return
+        if job.cancelled:
+            job.update(state=CANCELLED, current_agent="Cancelled", current_task="Job cancelled")
+        else:
+            job.update(
+                state=FAILED,
+                error=str(e),
+                current_agent="Error",
+                current_task=f"Error: {str(e)}",
+            )
+        logger.error(f"Job {job.id} failed: {str(e)}")
+
+
+class AsyncJobManager(JobManager):
+    """Runs coroutine jobs from a bounded queue as tasks on the event loop.
+
+    ``start``, ``submit`` and ``shutdown`` are called from the loop (e.g. FastAPI
+    handlers). Cancellation works as with threads: the job stops at its next
+    stage or step, so render threads it started finish before it cleans up.
+    """
+
+    def __init__(self, runner, max_workers=JOB_ASYNC_WORKERS, max_queue=JOB_QUEUE_SIZE,
+                 history_size=JOB_HISTORY_SIZE):
+        super().__init__(runner, max_workers=max_workers, max_queue=max_queue, history_size=history_size)
+        self._queue = asyncio.Queue(maxsize=max_queue)
+
+    def start(self):
+        """Start the worker tasks on the running loop"""
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping = False
+            self._workers = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.max_workers)]
+        logger.info(f"Async job manager started with {self.max_workers} workers")
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the workers"""
+        with self._lock:
+            self._stopping = True
+            jobs = list(self._jobs.values())
+            workers, self._workers = self._workers, []
+        for job in jobs:
+            if job.state not in FINISHED_STATES:
+                self.cancel(job.id)
+        for worker in workers:
+            worker.cancel()
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.cancelled:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        self._begin(job)
+        try:
+            await self.runner(job)
+            job.check_cancelled()
+            job.update(state=COMPLETED)
+        except asyncio.CancelledError:
+            # The app is shutting down
+            self._fail(job, JobCancelled(f"Job {job.id} was cancelled"))
+            raise
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            job.update(is_running=False, finished_at=datetime.now().isoformat())
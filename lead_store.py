@@ -0,0 +1,270 @@
+from urllib.parse import urlsplit
+from logging_setup import get_logger
+import threading
+import sqlite3
+import json
+import time
+import re
+import os
+
+logger = get_logger(__name__)
+
+# Lead store settings (override via environment)
+LEAD_STORE_ENABLED = os.getenv("LEAD_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+LEAD_STORE_PATH = os.getenv("LEAD_STORE_PATH", os.path.join("cache", "leads.sqlite3"))
+# Leads researched within this window are reused as they are
+LEAD_FRESH_DAYS = float(os.getenv("LEAD_FRESH_DAYS", "30"))
+# Older leads are re-researched and merged into the stored record; past this age they count as new
+LEAD_MAX_AGE_DAYS = float(os.getenv("LEAD_MAX_AGE_DAYS", "365"))
+
+NEW = "new"
+FRESH = "fresh"
+STALE = "stale"
+
+DAY = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    domain TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    row TEXT NOT NULL,
+    page_data TEXT,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    times_seen INTEGER NOT NULL DEFAULT 1,  -- jobs that researched the lead
+    last_job TEXT
+);
+CREATE TABLE IF NOT EXISTS lead_contacts (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    PRIMARY KEY (kind, value, domain)
+);
+CREATE INDEX IF NOT EXISTS lead_contacts_domain ON lead_contacts (domain);
+"""
+
+
+def normalize_domain(url):
+    """Registrable host of a URL: lower-case, no scheme, port or www"""
+    if not url:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def normalize_phone(phone):
+    """Digits only, so formatting differences compare equal"""
+    return re.sub(r"\D", "", phone)
+
+
+def split_values(value):
+    """Split a CSV cell holding several comma-separated values"""
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if v]
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+class Lead:
+    """A prospect already researched by an earlier job"""
+
+    def __init__(self, domain, url, row, page_data, first_seen, updated_at, times_seen, last_job):
+        self.domain = domain
+        self.url = url
+        self.row = row
+        self.page_data = page_data
+        self.first_seen = first_seen
+        self.updated_at = updated_at
+        self.times_seen = times_seen
+        self.last_job = last_job
+
+    @property
+    def age_days(self):
+        return (time.time() - self.updated_at) / DAY
+
+    def freshness(self, fresh_days=LEAD_FRESH_DAYS, max_age_days=LEAD_MAX_AGE_DAYS):
+        """FRESH (reuse), STALE (refresh) or NEW (too old to trust)"""
+        age = self.age_days
+        if age < fresh_days:
+            return FRESH
+        if age < max_age_days:
+            return STALE
+        return NEW
+
+
+class LeadStore:
+    """Persistent index of researched prospects shared across jobs.
+
+    Leads are keyed by normalized domain, with their emails and phone numbers
+    indexed as well so the same company found under another domain is recognised.
+    """
+
+    def __init__(self, path=LEAD_STORE_PATH, fresh_days=LEAD_FRESH_DAYS, max_age_days=LEAD_MAX_AGE_DAYS):
+        self.path = path
+        self.fresh_days = fresh_days
+        self.max_age_days = max_age_days
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "fresh": 0, "stale": 0, "new": 0, "upserts": 0, "contact_matches": 0, "errors": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def get(self, url):
+        """Stored lead for the domain of ``url``, or None"""
+        domain = normalize_domain(url)
+        if not domain:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT domain, url, row, page_data, first_seen, updated_at, times_seen, last_job "
+                "FROM leads WHERE domain = ?",
+                (domain,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._error("reading", e)
+            return None
+        return self._lead(row) if row else None
+
+    def classify(self, url):
+        """Return (FRESH | STALE | NEW, lead or None) for a prospect URL"""
+        lead = self.get(url)
+        state = lead.freshness(self.fresh_days, self.max_age_days) if lead else NEW
+        self._count("lookups")
+        self._count(state)
+        return state, lead
+
+    def find_by_contacts(self, emails=(), phones=(), exclude_domain=None):
+        """A stored lead sharing any of these emails or phone numbers, or None"""
+        keys = [("email", normalize_email(e)) for e in emails] + [("phone", normalize_phone(p)) for p in phones]
+        keys = [(kind, value) for kind, value in keys if value]
+        if not keys:
+            return None
+        try:
+            conn = self._connect()
+            for kind, value in keys:
+                match = conn.execute(
+                    "SELECT domain FROM lead_contacts WHERE kind = ? AND value = ? AND domain != ? LIMIT 1",
+                    (kind, value, exclude_domain or "")
+                ).fetchone()
+                if match:
+                    self._count("contact_matches")
+                    return self.get(match[0])
+        except sqlite3.Error as e:
+            self._error("reading", e)
+        return None
+
+    def upsert(self, url, row=None, page_data=None, job_id=None):
+        """Record a researched prospect, merging non-empty fields into any stored record"""
+        domain = normalize_domain(url)
+        if not domain:
+            return None
+        now = time.time()
+        existing = self.get(url)
+        merged = dict(existing.row) if existing and existing.freshness(self.fresh_days, self.max_age_days) != NEW else {}
+        merged.update({k: v for k, v in (row or {}).items() if v not in (None, "")})
+        if page_data is None and existing:
+            page_data = existing.page_data
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO leads (domain, url, row, page_data, first_seen, updated_at, times_seen, last_job) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET url = excluded.url, row = excluded.row, "
+                "page_data = excluded.page_data, updated_at = excluded.updated_at, "
+                "times_seen = leads.times_seen + (CASE WHEN excluded.last_job = leads.last_job THEN 0 ELSE 1 END), "
+                "last_job = COALESCE(excluded.last_job, leads.last_job)",
+                (domain, url, json.dumps(merged), json.dumps(page_data) if page_data else None, now, now, job_id)
+            )
+            contacts = [("email", normalize_email(e)) for e in split_values(merged.get("Email"))]
+            contacts += [("phone", normalize_phone(p)) for p in split_values(merged.get("Phone"))]
+            conn.executemany(
+                "INSERT OR IGNORE INTO lead_contacts (kind, value, domain) VALUES (?, ?, ?)",
+                [(kind, value, domain) for kind, value in contacts if value]
+            )
+            conn.commit()
+            self._count("upserts")
+        except sqlite3.Error as e:
+            self._error("writing", e)
+        return self.get(url)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            conn = self._connect()
+            stats["leads"] = conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+            stats["fresh_leads"] = conn.execute(
+                "SELECT COUNT(*) FROM leads WHERE updated_at > ?", (time.time() - self.fresh_days * DAY,)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            stats["leads"] = stats["fresh_leads"] = None
+        stats.update({"path": self.path, "fresh_days": self.fresh_days, "max_age_days": self.max_age_days})
+        return stats
+
+    def _lead(self, row):
+        return Lead(row[0], row[1], json.loads(row[2]), json.loads(row[3]) if row[3] else None, *row[4:])
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _error(self, action, error):
+        self._count("errors")
+        logger.error(f"Lead store error {action}: {str(error)}")
+
+
+class DomainClaims:
+    """Domains being researched by the jobs of one batch, so concurrent jobs do not research the same agency twice"""
+
+    def __init__(self):
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def claim(self, url, job_id):
+        """Claim a prospect's domain for ``job_id``; False when another job already claimed it"""
+        domain = normalize_domain(url)
+        if not domain:
+            return True
+        with self._lock:
+            return self._owners.setdefault(domain, job_id) == job_id
+
+    def claimed_by_other(self, url, job_id):
+        with self._lock:
+            owner = self._owners.get(normalize_domain(url))
+        return owner is not None and owner != job_id
+
+    def __len__(self):
+        with self._lock:
+            return len(self._owners)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_lead_store():
+    """Return the process-wide lead store, or None when it is disabled"""
+    global _default_store
+    if not LEAD_STORE_ENABLED:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = LeadStore()
+        return _default_store
@@ -0,0 +1,158 @@
+from logging_setup import get_logger
+from llm_cache import build_llm
+from qualification import normalize_url
+from scoring import BatchScorer
+from web_tools import CSV_FIELDNAMES
+from metrics import get_default_metrics
+from contextlib import contextmanager
+import asyncio
+import re
+import os
+
+logger = get_logger(__name__)
+
+# Extra search queries tried when the first one returns too few agencies
+MAX_SEARCH_QUERIES = int(os.getenv("LEAN_MAX_SEARCH_QUERIES", "4"))
+
+LOCATIONS = [
+    "united kingdom", "uk", "england", "scotland", "wales", "northern ireland", "ireland",
+    "london", "manchester", "birmingham", "leeds", "bristol", "glasgow", "edinburgh", "liverpool",
+    "united states", "usa", "us", "new york", "los angeles", "san francisco", "chicago",
+    "canada", "australia", "germany", "france", "spain", "netherlands", "europe",
+]
+BUSINESS_TYPES = ["agency", "agencies", "consultancy", "consultancies", "studio", "studios", "firm", "firms", "company", "companies"]
+INDUSTRIES = [
+    "influencer", "talent", "marketing", "advertising", "pr", "public relations", "digital", "creative",
+    "branding", "design", "social media", "content", "seo", "media", "events", "recruitment", "software",
+]
+STOP_WORDS = {"a", "an", "the", "in", "of", "for", "and", "based", "top", "best", "near", "me"}
+
+
+def _find_terms(text, terms):
+    """Terms present in ``text`` as whole words, longest first so "new york" beats "york\""""
+    found = []
+    for term in sorted(terms, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(term)}\b", text) and not any(term in f for f in found):
+            found.append(term)
+    return found
+
+
+def parse_query(search_query):
+    """Split a search query into location, industry, service focus and other criteria without an LLM"""
+    text = search_query.lower()
+    locations = _find_terms(text, LOCATIONS)
+    industries = _find_terms(text, INDUSTRIES)
+    business_types = _find_terms(text, BUSINESS_TYPES)
+    used = set(" ".join(locations + industries + business_types).split())
+    remaining = [w for w in re.findall(r"[\w'&-]+", text) if w not in used and w not in STOP_WORDS]
+    return {
+        "location": ", ".join(loc.upper() if len(loc) <= 3 else loc.title() for loc in locations),
+        "industry": " ".join(industries + (business_types[:1] or ["agency"])),
+        "service_focus": " ".join(industries) or " ".join(remaining),
+        "additional_criteria": remaining,
+    }
+
+
+def search_queries(search_query, components):
+    """The original query first, then variants built from its components"""
+    location = components["location"]
+    focus = components["service_focus"]
+    queries = [search_query, f"{components['industry']} {location}", f"{focus} agencies {location}",
+               f"top {focus} agencies {location}"]
+    return list(dict.fromkeys(" ".join(q.split()) for q in queries if q.strip()))[:MAX_SEARCH_QUERIES]
+
+
+class LeanPipeline:
+    """Lead generation as plain Python stages, with the LLM used only for scoring.
+
+    Query parsing, search, contact extraction and saving are deterministic and run
+    directly against WebTools; AI interest scores and notes come from batched
+    model calls. ``arun`` runs the same stages on the event loop with the async tools.
+    """
+
+    STAGES = ["Query Parser", "Lead Researcher", "Contact Extractor", "Lead Scorer", "Data Manager"]
+
+    def __init__(self, web_tools, search_query, num_prospects, output_file, model, job_id=None,
+                 llm=None, on_stage=None):
+        self.web_tools = web_tools
+        self.search_query = search_query
+        self.num_prospects = num_prospects
+        self.output_file = output_file
+        self.llm = llm or build_llm(model, job_id=job_id, agent="Lead Scorer", tape=web_tools.tape)
+        self.on_stage = on_stage
+        self.job_id = job_id
+        self.scorer = None
+
+    def run(self):
+        """Run every stage and return the saved rows"""
+        with self._stage("Query Parser", f"Parsing query: {self.search_query}"):
+            components = parse_query(self.search_query)
+
+        with self._stage("Lead Researcher", f"Searching for {self.num_prospects} agencies"):
+            urls = self.find_prospects(components)
+        if not urls:
+            raise Exception(f"No agencies found for query: {self.search_query}")
+
+        with self._stage("Contact Extractor", f"Extracting contact details from {len(urls)} websites"):
+            prospects = [p for p in self.web_tools.qualify_prospects(urls) if not p.get("Error")]
+
+        with self._stage("Lead Scorer", f"Scoring AI interest for {len(prospects)} prospects"):
+            rows = self.score_prospects(prospects, components)
+
+        with self._stage("Data Manager", f"Saving {len(rows)} leads"):
+            self.web_tools.save_to_csv_file(rows, self.output_file)
+        return rows
+
+    async def arun(self):
+        """``run`` for coroutines: search, page loads and contact probing are awaited instead of holding threads"""
+        with self._stage("Query Parser", f"Parsing query: {self.search_query}"):
+            components = parse_query(self.search_query)
+
+        with self._stage("Lead Researcher", f"Searching for {self.num_prospects} agencies"):
+            urls = await self.afind_prospects(components)
+        if not urls:
+            raise Exception(f"No agencies found for query: {self.search_query}")
+
+        with self._stage("Contact Extractor", f"Extracting contact details from {len(urls)} websites"):
+            prospects = [p for p in await self.web_tools.aqualify_prospects(urls) if not p.get("Error")]
+
+        with self._stage("Lead Scorer", f"Scoring AI interest for {len(prospects)} prospects"):
+            # The model client blocks
+            rows = await asyncio.to_thread(self.score_prospects, prospects, components)
+
+        with self._stage("Data Manager", f"Saving {len(rows)} leads"):
+            await self.web_tools.asave_to_csv_file(rows, self.output_file)
+        return rows
+
+    def find_prospects(self, components):
+        """Search until ``num_prospects`` distinct agency URLs are found"""
+        urls = {}
+        for query in search_queries(self.search_query, components):
+            for result in self.web_tools.search_urls(query, num_results=self.num_prospects - len(urls)):
+                urls.setdefault(normalize_url(result["url"]), result["url"])
+            if len(urls) >= self.num_prospects:
+                break
+        return list(urls.values())[:self.num_prospects]
+
+    async def afind_prospects(self, components):
+        """``find_prospects`` for coroutines"""
+        urls = {}
+        for query in search_queries(self.search_query, components):
+            for result in await self.web_tools.asearch_urls(query, num_results=self.num_prospects - len(urls)):
+                urls.setdefault(normalize_url(result["url"]), result["url"])
+            if len(urls) >= self.num_prospects:
+                break
+        return list(urls.values())[:self.num_prospects]
+
+    def score_prospects(self, prospects, components):
+        self.scorer = BatchScorer(self.llm, self.search_query, components, fieldnames=CSV_FIELDNAMES)
+        return self.scorer.score(prospects)
+
+    @contextmanager
+    def _stage(self, name, description):
+        """Announce a stage and time the work done inside it"""
+        logger.info(f"# Stage: {name} - {description}")
+        if self.on_stage:
+            self.on_stage(name, description)
+        with get_default_metrics().span("stage", job_id=self.job_id, stage=name):
+            yield
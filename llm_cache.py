@@ -0,0 +1,519 @@
+from collections import OrderedDict
+from typing import Any, Optional
+from logging_setup import get_logger
+from crewai import BaseLLM, LLM
+from pydantic import BaseModel, Field
+from metrics import get_default_metrics
+import threading
+import hashlib
+import sqlite3
+import json
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Response cache settings (override via environment)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Answer every prompt with the offline stub instead of calling the model API
+LLM_STUB = os.getenv("LLM_STUB", "false").lower() in ("1", "true", "yes")
+
+# USD per million (input, output) tokens; LLM_PRICE_INPUT / LLM_PRICE_OUTPUT override for any model
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+}
+LLM_PRICE_INPUT = os.getenv("LLM_PRICE_INPUT")
+LLM_PRICE_OUTPUT = os.getenv("LLM_PRICE_OUTPUT")
+
+# Rough characters-per-token ratio used when a model does not report usage
+CHARS_PER_TOKEN = 4
+
+USAGE_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+
+EVICT_TARGET_RATIO = 0.9
+
+# Cached responses are plain text or a JSON list of tool calls; recorded ones can also be a response model
+TEXT = "text"
+TOOL_CALLS = "tool_calls"
+RESPONSE_MODEL = "response_model"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'text',
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def cache_key(model, messages, stop=None, temperature=None, tools=None):
+    """Deterministic key for a prompt: model, messages, stop words, temperature and the tool schemas offered"""
+    prompt = {"model": model, "messages": messages, "stop": list(stop or []), "temperature": temperature}
+    if tools:
+        prompt["tools"] = tools
+    payload = json.dumps(prompt, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _tool_call_parts(call):
+    """(id, name, arguments) of one native tool call in any provider's shape, or None"""
+    if isinstance(call, dict):
+        function = call.get("function") or {}
+        name = function.get("name") or call.get("name")
+        arguments = function.get("arguments") if "function" in call else call.get("input")
+        return (call.get("id"), name, arguments) if name else None
+    if getattr(call, "function", None) is not None:
+        return getattr(call, "id", None), call.function.name, call.function.arguments
+    if getattr(call, "function_call", None):
+        return None, call.function_call.name, dict(call.function_call.args or {})
+    if hasattr(call, "name") and hasattr(call, "input"):
+        return getattr(call, "id", None), call.name, call.input
+    return None
+
+
+def encode_tool_calls(response):
+    """A native tool-calling response as OpenAI-style dicts, or None when ``response`` is not a list of tool calls.
+
+    The agent executor accepts these dicts in place of the provider's objects, so
+    they can be stored as JSON and handed back unchanged.
+    """
+    if not isinstance(response, list) or not response:
+        return None
+    calls = []
+    for index, call in enumerate(response):
+        parts = _tool_call_parts(call)
+        if parts is None:
+            return None
+        call_id, name, arguments = parts
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments or {})
+        calls.append({"id": call_id or f"call_{index}", "type": "function",
+                      "function": {"name": name, "arguments": arguments}})
+    return calls
+
+
+def estimate_tokens(value):
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def token_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of a call"""
+    input_price, output_price = MODEL_PRICES.get(model.split("/")[-1], (0.0, 0.0))
+    if LLM_PRICE_INPUT is not None:
+        input_price = float(LLM_PRICE_INPUT)
+    if LLM_PRICE_OUTPUT is not None:
+        output_price = float(LLM_PRICE_OUTPUT)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class CachedResponse:
+    """A model response read back from the cache"""
+
+    def __init__(self, response, prompt_tokens, completion_tokens, created_at, kind=TEXT):
+        self.response = json.loads(response) if kind == TOOL_CALLS else response
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.created_at = created_at
+
+
+class ResponseCache:
+    """On-disk cache of model responses keyed by prompt, with a TTL and LRU size cap"""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0, "errors": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        # Caches written before tool-call responses were stored have no kind column
+        if "kind" not in [column[1] for column in conn.execute("PRAGMA table_info(responses)")]:
+            conn.execute("ALTER TABLE responses ADD COLUMN kind TEXT NOT NULL DEFAULT 'text'")
+            conn.commit()
+
+    def get(self, key):
+        """Return the cached response for ``key`` if it has not expired, else None"""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, prompt_tokens, completion_tokens, created_at, kind FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            if time.time() - row[3] >= self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._count("expired")
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        except sqlite3.Error as e:
+            self._error("reading", e)
+            return None
+        self._count("hits")
+        return CachedResponse(*row)
+
+    def put(self, key, model, response, prompt_tokens, completion_tokens, kind=TEXT):
+        """Store a text response, or with ``kind=TOOL_CALLS`` a list of tool calls from encode_tool_calls"""
+        if kind == TOOL_CALLS:
+            response = json.dumps(response)
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, kind, prompt_tokens, completion_tokens, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, kind, prompt_tokens, completion_tokens, len(response.encode("utf-8")), now,
+                 now)
+            )
+            conn.commit()
+            self._count("stores")
+            self._evict(conn)
+        except sqlite3.Error as e:
+            self._error("writing", e)
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            conn = self._connect()
+            stats["entries"], stats["bytes"] = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        except sqlite3.Error:
+            stats["entries"] = stats["bytes"] = None
+        lookups = stats["hits"] + stats["misses"] + stats["expired"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats.update({"path": self.path, "ttl": self.ttl, "max_bytes": self.max_bytes})
+        return stats
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _evict(self, conn):
+        """Drop least recently used responses until the cache fits under the size limit"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        conn.commit()
+        with self._lock:
+            self._stats["evictions"] += evicted
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _error(self, action, error):
+        self._count("errors")
+        logger.error(f"LLM cache error {action}: {str(error)}")
+
+
+def empty_usage():
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "latency_seconds": 0.0,
+        "cost_usd": 0.0,
+        "saved_cost_usd": 0.0,
+    }
+
+
+class UsageTracker:
+    """Token, latency and cost counters per job and per agent"""
+
+    def __init__(self, history_size=USAGE_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs = OrderedDict()
+        self._totals = empty_usage()
+        self._lock = threading.Lock()
+
+    def record(self, job_id, agent, model, prompt_tokens, completion_tokens, latency, cached=False):
+        cost = token_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._jobs[job_id] = {"total": empty_usage(), "agents": {}}
+                while len(self._jobs) > self.history_size:
+                    self._jobs.popitem(last=False)
+            for usage in (self._totals, job["total"], job["agents"].setdefault(agent, empty_usage())):
+                usage["calls"] += 1
+                usage["latency_seconds"] += latency
+                if cached:
+                    # Tokens a cache hit would have cost are counted as savings, not usage
+                    usage["cache_hits"] += 1
+                    usage["saved_cost_usd"] += cost
+                else:
+                    usage["prompt_tokens"] += prompt_tokens
+                    usage["completion_tokens"] += completion_tokens
+                    usage["total_tokens"] += prompt_tokens + completion_tokens
+                    usage["cost_usd"] += cost
+
+    def for_job(self, job_id):
+        """{"total": usage, "agents": {role: usage}} for one job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {"total": empty_usage(), "agents": {}}
+            return {"total": dict(job["total"]), "agents": {a: dict(u) for a, u in job["agents"].items()}}
+
+    def totals(self):
+        with self._lock:
+            return dict(self._totals)
+
+
+class CachedLLM(BaseLLM):
+    """Wraps a chat model: repeated prompts are answered from the response cache and
+    every call's tokens, latency and cost are recorded per job and agent.
+
+    Prompts offering tools are keyed on the tool schemas as well, and both text
+    answers and tool-call requests are cached; calls that let the model run
+    functions itself (``available_functions``) or parse into a response model are
+    not. Each call goes to its own copy of the wrapped model, so calls made at
+    once from several threads keep their stop words and token counts apart. With
+    a recording ``tape`` every exchange is captured; a replaying tape answers
+    calls instead of the model (counted like cache hits).
+    """
+
+    inner: Any = None
+    cache: Any = None
+    tracker: Any = None
+    tape: Any = None
+    job_id: Optional[str] = None
+    # Usage is attributed to the calling agent's role, or this label for direct calls
+    agent_label: Optional[str] = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None, **kwargs):
+        agent = getattr(from_agent, "role", None) or self.agent_label or "unknown"
+        if self.tape is None:
+            return self._call(agent, messages, tools, callbacks, available_functions, from_task, from_agent,
+                              response_model, **kwargs)[0]
+
+        key = cache_key(self.model, messages, self.stop_sequences, self.temperature, tools)
+        started = time.perf_counter()
+        if self.tape.replaying:
+            entry = self.tape.replay("llm", agent, key)
+            self._record(agent, entry["prompt_tokens"], entry["completion_tokens"], time.perf_counter() - started,
+                         True)
+            if entry.get("response_type") == RESPONSE_MODEL and response_model is not None:
+                return response_model.model_validate(entry["output"])
+            # Recorded tool calls are OpenAI-style dicts, which the agent executor accepts as they are
+            return entry["output"]
+        response, prompt_tokens, completion_tokens = self._call(
+            agent, messages, tools, callbacks, available_functions, from_task, from_agent, response_model, **kwargs)
+        if self.tape.recording:
+            self._record_exchange(agent, key, response, time.perf_counter() - started, prompt_tokens,
+                                  completion_tokens)
+        return response
+
+    def _record_exchange(self, agent, key, response, seconds, prompt_tokens, completion_tokens):
+        """Record a model exchange on the tape in a form replay can hand back to the caller"""
+        fields = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        tool_calls = encode_tool_calls(response)
+        if tool_calls is not None:
+            output = tool_calls
+            fields["response_type"] = TOOL_CALLS
+        elif isinstance(response, BaseModel):
+            output = response.model_dump(mode="json")
+            fields["response_type"] = RESPONSE_MODEL
+        elif isinstance(response, str):
+            output = response
+        else:
+            logger.warning(f"Not recording {type(response).__name__} response for {agent}: replay could not rebuild it")
+            return
+        self.tape.record("llm", agent, key, output, seconds, **fields)
+
+    def _call(self, agent, messages, tools, callbacks, available_functions, from_task, from_agent, response_model,
+              **kwargs):
+        """The response and its (prompt, completion) tokens, from the cache or the wrapped model"""
+        cacheable = self.cache is not None and not available_functions and response_model is None
+        key = cache_key(self.model, messages, self.stop_sequences, self.temperature, tools) if cacheable else None
+        started = time.perf_counter()
+
+        if key is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                self._record(agent, hit.prompt_tokens, hit.completion_tokens, time.perf_counter() - started, True)
+                return hit.response, hit.prompt_tokens, hit.completion_tokens
+
+        inner = self._call_model()
+        extra = {"from_task": from_task, "from_agent": from_agent, "response_model": response_model}
+        response = inner.call(
+            messages,
+            tools=tools,
+            callbacks=callbacks,
+            available_functions=available_functions,
+            **{k: v for k, v in extra.items() if v is not None},
+            **kwargs
+        )
+        latency = time.perf_counter() - started
+
+        prompt_tokens, completion_tokens = self._inner_usage(inner)
+        prompt_tokens = prompt_tokens or estimate_tokens(messages)
+        completion_tokens = completion_tokens or estimate_tokens(response)
+        self._track_token_usage_internal({"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+        self._record(agent, prompt_tokens, completion_tokens, latency, False)
+
+        if key is not None:
+            tool_calls = encode_tool_calls(response)
+            if tool_calls is not None:
+                self.cache.put(key, self.model, tool_calls, prompt_tokens, completion_tokens, kind=TOOL_CALLS)
+            elif isinstance(response, str) and response.strip():
+                self.cache.put(key, self.model, response, prompt_tokens, completion_tokens)
+        return response, prompt_tokens, completion_tokens
+
+    def _call_model(self):
+        """A copy of the wrapped model for one call, with this call's stop words and its own token counters.
+
+        The copy shares the wrapped model's client, so it costs no new connections.
+        """
+        # Stop words are set on this wrapper by the agent executor; the wrapped model needs them too
+        inner = self.inner.model_copy(update={"stop": list(self.stop_sequences)})
+        inner._token_usage = {name: 0 for name in self.inner._token_usage}
+        return inner
+
+    def supports_function_calling(self):
+        supports = getattr(self.inner, "supports_function_calling", None)
+        return bool(supports and supports())
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return self.inner.get_context_window_size()
+
+    @staticmethod
+    def _inner_usage(inner):
+        summary = getattr(inner, "get_token_usage_summary", None)
+        if summary is None:
+            return 0, 0
+        usage = summary()
+        return usage.prompt_tokens, usage.completion_tokens
+
+    def _record(self, agent, prompt_tokens, completion_tokens, latency, cached):
+        if self.tracker is not None:
+            self.tracker.record(self.job_id, agent, self.model, prompt_tokens, completion_tokens, latency, cached)
+        get_default_metrics().observe("llm_call", latency, self.job_id, agent=agent, cached=str(cached).lower())
+
+
+class StubLLM(BaseLLM):
+    """Offline stand-in for the chat model: deterministic answers, no network.
+
+    Answers come from ``responder(messages)`` when given, then from ``responses``
+    in order, and otherwise a ReAct-style final answer echoing the prompt.
+    """
+
+    responses: list = Field(default_factory=list)
+    responder: Any = None
+    latency: float = 0.0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.responder is not None:
+            response = self.responder(messages)
+        elif self.responses:
+            response = self.responses.pop(0)
+        else:
+            prompt = messages if isinstance(messages, str) else messages[-1].get("content", "")
+            first_line = next((line.strip() for line in str(prompt).splitlines() if line.strip()), "")
+            response = f"Thought: I now know the final answer\nFinal Answer: Stub answer for: {first_line[:200]}"
+        self._track_token_usage_internal({
+            "prompt_tokens": estimate_tokens(messages),
+            "completion_tokens": estimate_tokens(response),
+        })
+        return response
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return False
+
+    def get_context_window_size(self):
+        return 128000
+
+
+_default_cache = None
+_default_tracker = None
+_defaults_lock = threading.Lock()
+
+
+def get_default_llm_cache():
+    """Return the process-wide response cache, or None when caching is disabled"""
+    global _default_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _defaults_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def get_default_usage_tracker():
+    """Return the process-wide token usage tracker"""
+    global _default_tracker
+    with _defaults_lock:
+        if _default_tracker is None:
+            _default_tracker = UsageTracker()
+        return _default_tracker
+
+
+def build_llm(model, job_id=None, stub=None, cache=None, tracker=None, agent=None, tape=None):
+    """Chat model for an agent: the real model (or the offline stub) behind the response cache and job tape"""
+    stub = LLM_STUB if stub is None else stub
+    inner = StubLLM(model=model) if stub else LLM(model=model)
+    return CachedLLM(
+        model=model,
+        inner=inner,
+        temperature=getattr(inner, "temperature", None),
+        cache=cache if cache is not None else get_default_llm_cache(),
+        tracker=tracker if tracker is not None else get_default_usage_tracker(),
+        tape=tape,
+        job_id=job_id,
+        agent_label=agent,
+    )
@@ -0,0 +1,207 @@
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+from termcolor import colored
+from metrics import current_job, get_default_metrics
+import threading
+import logging
+import random
+import atexit
+import queue
+import json
+import sys
+import os
+
+# Logging settings (override via environment)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "color" for people at a terminal, "json" (one object per line) for log pipelines, "plain" for neither
+LOG_FORMAT = os.getenv("LOG_FORMAT", "color").lower()
+# Also write JSON lines to this file
+LOG_FILE = os.getenv("LOG_FILE", "")
+# Messages and structured fields longer than this are truncated when written
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+# Fraction of payload records (crew step inputs and outputs) that are kept
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+# Records waiting for the writer thread; further records are dropped while it is full
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+ROOT_LOGGER = "prospects"
+
+LEVEL_COLORS = {
+    logging.DEBUG: "blue",
+    logging.INFO: "cyan",
+    logging.WARNING: "yellow",
+    logging.ERROR: "red",
+    logging.CRITICAL: "red",
+}
+
+# Attributes every LogRecord has; anything else arrived as a structured field
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName", "job_id", "color", "payload",
+}
+
+
+def truncate(value, limit=LOG_MAX_FIELD_CHARS):
+    text = value if isinstance(value, str) else str(value)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+
+def record_fields(record, limit=LOG_MAX_FIELD_CHARS):
+    """Structured fields of a record, stringified and truncated"""
+    return {
+        key: value if isinstance(value, (int, float, bool)) or value is None else truncate(value, limit)
+        for key, value in vars(record).items() if key not in RESERVED_ATTRS
+    }
+
+
+class ContextFilter(logging.Filter):
+    """Tags records with the job they were logged for and samples payload records.
+
+    Runs on the thread that logs, so the job comes from its active metrics span.
+    """
+
+    def __init__(self, sample_rate=LOG_PAYLOAD_SAMPLE_RATE):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        if getattr(record, "job_id", None) is None:
+            record.job_id = current_job()
+        if getattr(record, "payload", False) and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        return True
+
+
+class ColorFormatter(logging.Formatter):
+    """Console output in the colours the app has always used, with fields on indented lines"""
+
+    def __init__(self, use_color=True, max_message_chars=LOG_MAX_MESSAGE_CHARS, max_field_chars=LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.use_color = use_color
+        self.max_message_chars = max_message_chars
+        self.max_field_chars = max_field_chars
+
+    def format(self, record):
+        message = truncate(record.getMessage(), self.max_message_chars)
+        job_id = getattr(record, "job_id", None)
+        if job_id:
+            message = f"[{str(job_id)[:8]}] {message}"
+        lines = [message] + [f"  {key}: {value}" for key, value in record_fields(record, self.max_field_chars).items()]
+        if record.exc_info:
+            lines.append(self.formatException(record.exc_info))
+        text = "\n".join(lines)
+        if self.use_color:
+            text = colored(text, getattr(record, "color", None) or LEVEL_COLORS.get(record.levelno, "white"))
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def __init__(self, max_message_chars=LOG_MAX_MESSAGE_CHARS, max_field_chars=LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.max_message_chars = max_message_chars
+        self.max_field_chars = max_field_chars
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "thread": record.threadName,
+            "job_id": getattr(record, "job_id", None),
+            "message": truncate(record.getMessage(), self.max_message_chars),
+            **record_fields(record, self.max_field_chars),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without waiting; records are dropped while the queue is full.
+
+    Formatting and truncation happen on the writer thread, so the calling
+    worker only pays for creating the record.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            get_default_metrics().inc("log_records_dropped", level=record.levelname.lower())
+
+
+class Logger(logging.LoggerAdapter):
+    """Logger taking structured fields as keyword arguments.
+
+    ``logger.debug("Tool output", tool=name, output=text, payload=True)`` logs
+    ``tool`` and ``output`` as fields; ``payload=True`` marks the record for
+    sampling. ``success`` logs at INFO in green.
+    """
+
+    PASSTHROUGH = ("exc_info", "stack_info", "stacklevel", "extra")
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in self.PASSTHROUGH}
+        kwargs["extra"] = {**(kwargs.get("extra") or {}), **fields}
+        return msg, kwargs
+
+    def success(self, msg, *args, **kwargs):
+        self.info(msg, *args, color="green", **kwargs)
+
+
+_handler = None
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, log_file=LOG_FILE):
+    """Route the app's loggers through a bounded queue to a writer thread; safe to call repeatedly"""
+    global _handler, _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        root.propagate = False
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(JsonFormatter() if fmt == "json" else ColorFormatter(use_color=fmt == "color"))
+        handlers = [console]
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            file_handler = logging.FileHandler(log_file, encoding="utf-8")
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        _handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(ContextFilter())
+        root.addHandler(_handler)
+        _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Records still queued at exit are written before the process ends
+        atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    """Logger for a module, e.g. ``get_logger(__name__)``"""
+    configure_logging()
+    return Logger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), {})
+
+
+def log_stats():
+    """Records waiting to be written and records dropped because the queue was full"""
+    if _handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
@@ -1,16 +1,28 @@
 from crewai import Agent, Task, Crew, Process
 from web_tools import WebTools
+from llm_cache import LLM_STUB, build_llm
+from lean_pipeline import LeanPipeline
+from metrics import CrewTimer, get_default_metrics
+from replay import open_tape
+from driver_pool import POOL_MAX_SIZE
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+import threading
+import asyncio
 import os
 from datetime import datetime
-from termcolor import colored
+from logging_setup import get_logger
 from dotenv import load_dotenv
 import csv
 
+logger = get_logger(__name__)
+
 # Load environment variables
 load_dotenv()
 
-# Ensure OpenAI API key is set
-if not os.getenv("OPENAI_API_KEY"):
+# Ensure OpenAI API key is set (not needed when the offline stub model answers)
+if not os.getenv("OPENAI_API_KEY") and not LLM_STUB:
     raise ValueError("OPENAI_API_KEY environment variable is not set")
 
 # Constants
@@ -18,12 +30,33 @@ OUTPUT_DIR = "static/downloads"
 MODEL = "gpt-4o-mini"
 DEFAULT_SEARCH_QUERY = "UK influencer talent marketing agency"
 DEFAULT_NUM_PROSPECTS = 3  # Number of agencies to find
+PARALLEL_QUALIFICATION = os.getenv("PARALLEL_QUALIFICATION", "false").lower() in ("1", "true", "yes")
+# "crew" runs every step as an agent task; "lean" runs deterministic steps in Python and only scores with the LLM
+CREW_MODE = "crew"
+LEAN_MODE = "lean"
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", CREW_MODE).lower()
+# Crews run from async code at once; each keeps a pooled driver until it finishes, so this follows the pool size
+CREW_JOB_CONCURRENCY = int(os.getenv("CREW_JOB_CONCURRENCY", str(POOL_MAX_SIZE)))
+
+_crew_executor = None
+_crew_executor_lock = threading.Lock()
+
+def get_crew_executor():
+    """Return the threads crews run on from async code, kept apart from the loop's default executor"""
+    global _crew_executor
+    with _crew_executor_lock:
+        if _crew_executor is None:
+            _crew_executor = ThreadPoolExecutor(max_workers=max(1, CREW_JOB_CONCURRENCY), thread_name_prefix="crew-job")
+        return _crew_executor
 
-def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=None):
+def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=None, parallel_qualification=None,
+                 job_id=None):
     """Create tasks for the crew"""
     # Use default values if not provided
     search_query = search_query or DEFAULT_SEARCH_QUERY
     num_prospects = num_prospects or DEFAULT_NUM_PROSPECTS
+    if parallel_qualification is None:
+        parallel_qualification = PARALLEL_QUALIFICATION
     
     # Create output directory if it doesn't exist
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -37,6 +70,9 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
     
     tasks = []
     
+    # Prospects are scored in batches by the score_prospects tool rather than one per agent turn
+    web_tools.configure_scoring(build_llm(MODEL, job_id=job_id, agent="Lead Scorer", tape=web_tools.tape), search_query)
+    
     # Create agents
     query_analyzer = Agent(
         role="Query Analyzer",
@@ -48,7 +84,7 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
         allow_delegation=False,
         verbose=True,
         memory=True,
-        llm_model=MODEL
+        llm=build_llm(MODEL, job_id=job_id, tape=web_tools.tape)
     )
     
     researcher = Agent(
@@ -62,7 +98,7 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
         allow_delegation=True,
         verbose=True,
         memory=True,
-        llm_model=MODEL
+        llm=build_llm(MODEL, job_id=job_id, tape=web_tools.tape)
     )
     
     qualifier = Agent(
@@ -79,7 +115,7 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
         allow_delegation=True,
         verbose=True,
         memory=True,
-        llm_model=MODEL
+        llm=build_llm(MODEL, job_id=job_id, tape=web_tools.tape)
     )
     
     data_manager = Agent(
@@ -92,7 +128,7 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
         allow_delegation=False,
         verbose=True,
         memory=True,
-        llm_model=MODEL
+        llm=build_llm(MODEL, job_id=job_id, tape=web_tools.tape)
     )
     
     # Task 1: Analyze search query
@@ -127,6 +163,10 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
         
         Search query: "{search_query}"
         
+        Call search_urls with a JSON object such as {{"query": "{search_query}", "num_results": {num_prospects}}}.
+        It pages through the search results until that many new agency websites are found, skipping social
+        networks and directories, so there is no need to repeat the search to get more results.
+        
         Avoid:
         - Individual practitioners/freelancers
         - Generic business listings
@@ -147,24 +187,42 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
     tasks.append(search_task)
     
     # Task 3: Qualify the leads
-    qualify_task = Task(
-        description=f"""For EACH URL provided in the previous task:
+    if parallel_qualification:
+        research_steps = """Call the qualify_prospects tool ONCE with a JSON list of ALL the URLs from the previous task.
+        It researches every prospect in parallel and returns, for each URL, the contact details, primary services,
+        about/clients text and whether AI or enterprise topics are mentioned.
+        
+        Then call the score_prospects tool ONCE with the same JSON list of URLs. It scores all prospects together and
+        returns the Company Name, Decision Makers, AI Interest Score and Qualification Notes for each of them.
+        
+        Do NOT call extract_page_data, extract_contact_info or get_website_content yourself - use the qualify_prospects results.
+        Do NOT score prospects yourself - use the score_prospects results.
+        For each prospect, create a complete dictionary entry with ALL required fields from the two results.
+        
+"""
+    else:
+        research_steps = """For EACH URL provided in the previous task:
         1. Research the agency's services and focus
         2. Look for AI or innovation mentions
         3. Analyze their client base and projects
-        4. Identify and extract contact information using the extract_contact_info tool
+        4. Identify and extract contact information using the extract_page_data tool
         5. Assess their potential interest in AI solutions
         
         You MUST process EVERY prospect given to you, one at a time, and record their information in the CSV.
         Never skip or combine prospects. Process each prospect thoroughly before moving to the next one.
         
         For each prospect:
-        1. First use the extract_contact_info tool to get ALL contact details and social media links
-        2. Then use get_website_content to analyze their services and AI mentions
-        3. Create a complete dictionary entry with ALL required fields
-        4. Save each prospect to the CSV file immediately after processing
+        1. Use the extract_page_data tool ONCE to get their content, AI mentions, ALL contact details and social media links
+        2. Create a complete dictionary entry with ALL required fields
+        3. Save each prospect to the CSV file immediately after processing
         
-        Format your response as a list of dictionaries with EXACTLY these fields for each agency:
+        Once every prospect is extracted, call the score_prospects tool ONCE with a JSON list of ALL the URLs to get
+        their Company Name, Decision Makers, AI Interest Score and Qualification Notes in one go, instead of scoring
+        prospects one by one.
+        
+"""
+    qualify_task = Task(
+        description=research_steps + f"""        Format your response as a list of dictionaries with EXACTLY these fields for each agency:
         {{
             "Search Query": "{search_query}",  # Add the search query to each entry
             "Company Name": "Exact name of the agency",
@@ -172,17 +230,17 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
             "Primary Services": "Brief description of main services",
             "AI Mentions": "Yes",  # String "Yes" or "No"
             "Decision Makers": "Name 1, Name 2",  # Comma-separated string
-            "Email": "email1, email2",  # Use emails from extract_contact_info
-            "Phone": "phone1, phone2",  # Use phones from extract_contact_info
-            "LinkedIn": "linkedin_profile_url",  # Use first LinkedIn URL from extract_contact_info
-            "Instagram": "instagram_profile_url",  # Use first Instagram URL from extract_contact_info
-            "Physical Address": "Full physical address",  # Use address from extract_contact_info
+            "Email": "email1, email2",  # Use emails from the extracted contact info
+            "Phone": "phone1, phone2",  # Use phones from the extracted contact info
+            "LinkedIn": "linkedin_profile_url",  # Use first LinkedIn URL from the extracted contact info
+            "Instagram": "instagram_profile_url",  # Use first Instagram URL from the extracted contact info
+            "Physical Address": "Full physical address",  # Use address from the extracted contact info
             "AI Interest Score": 8,  # Number between 1-10
             "Qualification Notes": "Detailed qualification notes"
         }}
         
         Make sure to:
-        1. Include ALL contact information found by the extract_contact_info tool
+        1. Include ALL contact information found by the extract_page_data tool
         2. Process and return data for ALL prospects, regardless of their scores
         3. Include the exact search query in each entry
         4. Fill in ALL fields for each prospect
@@ -226,10 +284,83 @@ def create_tasks(web_tools, search_query=None, num_prospects=None, output_file=N
     
     return tasks
 
+def run_pipeline(web_tools, search_query, num_prospects, output_file, mode=None, job_id=None,
+                 parallel_qualification=None, on_stage=None, step_callback=None):
+    """Run one query in the given pipeline mode; ``on_stage`` / ``step_callback`` report lean stages / crew steps"""
+    mode = (mode or PIPELINE_MODE).lower()
+    _record_job(web_tools, search_query, num_prospects, output_file, mode, parallel_qualification)
+    with get_default_metrics().span("pipeline", job_id=job_id, mode=mode):
+        return _run_pipeline(web_tools, search_query, num_prospects, output_file, mode, job_id,
+                             parallel_qualification, on_stage, step_callback)
+
+async def arun_pipeline(web_tools, search_query, num_prospects, output_file, mode=None, job_id=None,
+                        parallel_qualification=None, on_stage=None, step_callback=None):
+    """``run_pipeline`` for coroutines; the lean pipeline runs on the event loop, a crew on a worker thread"""
+    mode = (mode or PIPELINE_MODE).lower()
+    if mode != LEAN_MODE:
+        # CrewAI calls its tools synchronously; crews queue for one of CREW_JOB_CONCURRENCY threads rather than
+        # holding drivers the pool cannot supply or the threads the async jobs' disk writes run on
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(get_crew_executor(), functools.partial(
+            context.run, run_pipeline, web_tools, search_query, num_prospects, output_file, mode, job_id,
+            parallel_qualification, on_stage, step_callback))
+    _record_job(web_tools, search_query, num_prospects, output_file, mode, parallel_qualification)
+    with get_default_metrics().span("pipeline", job_id=job_id, mode=mode):
+        return await LeanPipeline(
+            web_tools,
+            search_query,
+            num_prospects,
+            output_file,
+            MODEL,
+            job_id=job_id,
+            on_stage=on_stage
+        ).arun()
+
+def _record_job(web_tools, search_query, num_prospects, output_file, mode, parallel_qualification):
+    if web_tools.tape is not None and web_tools.tape.recording:
+        # Enough to re-run the job against its recording
+        web_tools.tape.meta.update(search_query=search_query, num_prospects=num_prospects, output_file=output_file,
+                                   mode=mode, parallel_qualification=parallel_qualification)
+
+def _run_pipeline(web_tools, search_query, num_prospects, output_file, mode, job_id, parallel_qualification,
+                  on_stage, step_callback):
+    if mode == LEAN_MODE:
+        # Deterministic stages in Python; only scoring goes to the LLM
+        return LeanPipeline(
+            web_tools,
+            search_query,
+            num_prospects,
+            output_file,
+            MODEL,
+            job_id=job_id,
+            on_stage=on_stage
+        ).run()
+    
+    tasks = create_tasks(
+        web_tools,
+        search_query,
+        num_prospects,
+        output_file,
+        parallel_qualification=parallel_qualification,
+        job_id=job_id
+    )
+    # Steps and tasks are timed from the callbacks the crew makes after each one
+    timer = CrewTimer(get_default_metrics(), job_id)
+    for task in tasks:
+        task.callback = timer.task
+    crew = Crew(
+        agents=[task.agent for task in tasks],
+        tasks=tasks,
+        process=Process.sequential,
+        verbose=True,
+        step_callback=timer.wrap_step_callback(step_callback)
+    )
+    return crew.kickoff()
+
 def save_task(data, output_file):
     """Save the qualified lead data to a CSV file"""
     try:
-        print(colored("Saving data to CSV...", "cyan"))
+        logger.info("Saving data to CSV...")
         
         # Ensure data is in the correct format (list of dictionaries)
         if isinstance(data, dict):
@@ -244,7 +375,7 @@ def save_task(data, output_file):
                 elif isinstance(parsed_data, list):
                     data = parsed_data
                 else:
-                    print(colored("Error: Invalid data format for CSV", "red"))
+                    logger.error("Error: Invalid data format for CSV")
                     return False
             except json.JSONDecodeError:
                 # Try to parse the markdown-like format
@@ -266,7 +397,7 @@ def save_task(data, output_file):
                 if parsed_data:
                     data = parsed_data
                 else:
-                    print(colored("Error: Invalid data format for CSV", "red"))
+                    logger.error("Error: Invalid data format for CSV")
                     return False
 
         # Generate timestamped filename
@@ -345,23 +476,31 @@ def save_task(data, output_file):
                 }
                 writer.writerow(row_data)
             
-        print(colored("Data saved successfully", "green"))
+        logger.success("Data saved successfully")
         return True
         
     except Exception as e:
-        print(colored(f"Error saving data: {str(e)}", "red"))
+        logger.error(f"Error saving data: {str(e)}")
         return False
 
 def main():
     """Main function to run the lead generation process"""
     try:
-        print(colored("Setting up web tools...", "cyan"))
-        web_tools = WebTools()
+        logger.info("Setting up web tools...")
+        web_tools = WebTools(tape=open_tape())
+        
+        if PIPELINE_MODE == LEAN_MODE:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = os.path.join(OUTPUT_DIR, f"leads_{timestamp}.csv")
+            logger.info(f"Running lean pipeline for {DEFAULT_NUM_PROSPECTS} agencies...")
+            run_pipeline(web_tools, DEFAULT_SEARCH_QUERY, DEFAULT_NUM_PROSPECTS, output_file, mode=LEAN_MODE)
+            logger.success(f"Lead generation process completed successfully: {output_file}")
+            return
         
-        print(colored("Creating tasks...", "cyan"))
+        logger.info("Creating tasks...")
         tasks = create_tasks(web_tools)  # Use default values when running directly
         
-        print(colored("Setting up crew...", "cyan"))
+        logger.info("Setting up crew...")
         crew = Crew(
             agents=[task.agent for task in tasks],
             tasks=tasks,
@@ -369,7 +508,7 @@ def main():
             verbose=True
         )
         
-        print(colored(f"Starting lead generation process for {DEFAULT_NUM_PROSPECTS} agencies...", "cyan"))
+        logger.info(f"Starting lead generation process for {DEFAULT_NUM_PROSPECTS} agencies...")
         result = crew.kickoff()
         
         # Process the final result
@@ -390,17 +529,16 @@ def main():
             # Save the data
             save_task(final_result, output_file)
         
-        print(colored(f"\nLead generation process completed successfully for {DEFAULT_NUM_PROSPECTS} agencies!", "green"))
+        logger.success(f"Lead generation process completed successfully for {DEFAULT_NUM_PROSPECTS} agencies!")
         
     except Exception as e:
-        print(colored(f"\nError during lead generation: {str(e)}", "red"))
+        logger.error(f"Error during lead generation: {str(e)}")
         raise
         
     finally:
-        print(colored("Cleaning up crew resources...", "cyan"))
+        logger.info("Cleaning up crew resources...")
         if 'web_tools' in locals():
             web_tools.cleanup()
-            print(colored("Closing Chrome WebDriver...", "cyan"))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,332 @@
+from collections import OrderedDict
+from bisect import bisect_left
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import os
+
+# Metrics settings (override via environment)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Upper bounds (seconds) of the latency histogram buckets
+METRICS_BUCKETS = [float(b) for b in os.getenv(
+    "METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60,120,300").split(",") if b.strip()]
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "prospects")
+METRICS_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+
+# Job that spans started on this thread (or context) are attributed to when they do not name one
+_current_job = contextvars.ContextVar("metrics_job", default=None)
+
+
+def current_job():
+    """Job of the innermost active span on this thread, if any"""
+    return _current_job.get()
+
+
+def label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Cumulative latency buckets plus count, sum and max"""
+
+    __slots__ = ("bounds", "buckets", "count", "sum", "max")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (the max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 6),
+            "avg_seconds": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "max_seconds": round(self.max, 6),
+        }
+
+
+class MetricSet:
+    """Histograms and counters keyed by metric name and labels"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, labels, value, bounds):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(bounds)
+        histogram.observe(value)
+
+    def inc(self, name, labels, amount):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def summary(self):
+        """{"spans": {name: {labels: summary}}, "counters": {name: {labels: value}}}"""
+        spans = {}
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            spans.setdefault(name, {})["/".join(v for _, v in labels) or "all"] = histogram.summary()
+        counters = {}
+        for (name, labels), value in sorted(self.counters.items()):
+            counters.setdefault(name, {})["/".join(v for _, v in labels) or "all"] = value
+        return {"spans": spans, "counters": counters}
+
+
+class Span:
+    """Times one block of work and records it when the block exits"""
+
+    __slots__ = ("registry", "name", "job_id", "labels", "started", "token")
+
+    def __init__(self, registry, name, job_id, labels):
+        self.registry = registry
+        self.name = name
+        self.job_id = job_id
+        self.labels = labels
+        self.token = None
+
+    def __enter__(self):
+        if self.job_id is None:
+            self.job_id = _current_job.get()
+        else:
+            self.token = _current_job.set(self.job_id)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        if self.token is not None:
+            _current_job.reset(self.token)
+        self.registry.observe(self.name, elapsed, self.job_id, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(f"{self.name}_errors", job_id=self.job_id, **self.labels)
+        return False
+
+
+class _NullSpan:
+    """Stand-in returned while metrics are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class MetricsRegistry:
+    """Latency histograms and counters, aggregated globally and per job.
+
+    ``span(name, **labels)`` times a block of work. Spans that do not name a job
+    are attributed to the job of the enclosing span on the same thread, so page
+    loads and HTTP requests made inside a job's tool calls count towards that job.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, buckets=METRICS_BUCKETS, history_size=METRICS_HISTORY_SIZE,
+                 prefix=METRICS_PREFIX):
+        self.enabled = enabled
+        self.buckets = sorted(buckets)
+        self.history_size = history_size
+        self.prefix = prefix
+        self._global = MetricSet()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def span(self, name, job_id=None, **labels):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, job_id, labels)
+
+    def observe(self, name, seconds, job_id=None, **labels):
+        """Record a duration that was measured elsewhere"""
+        if not self.enabled:
+            return
+        key = label_key(labels)
+        job_id = job_id or _current_job.get()
+        with self._lock:
+            self._global.observe(name, key, seconds, self.buckets)
+            if job_id is not None:
+                self._job(job_id).observe(name, key, seconds, self.buckets)
+
+    def inc(self, name, amount=1, job_id=None, **labels):
+        if not self.enabled:
+            return
+        key = label_key(labels)
+        job_id = job_id or _current_job.get()
+        with self._lock:
+            self._global.inc(name, key, amount)
+            if job_id is not None:
+                self._job(job_id).inc(name, key, amount)
+
+    def for_job(self, job_id):
+        with self._lock:
+            metrics = self._jobs.get(job_id)
+            return metrics.summary() if metrics else {"spans": {}, "counters": {}}
+
+    def summary(self):
+        with self._lock:
+            return self._global.summary()
+
+    def render(self):
+        """Global metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = [(name, labels, h.buckets[:], h.count, h.sum) for (name, labels), h in
+                          sorted(self._global.histograms.items())]
+            counters = sorted(self._global.counters.items())
+        lines = []
+        typed = set()
+        for name, labels, buckets, count, total in histograms:
+            metric = f"{self.prefix}_{name}_seconds"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + [float("inf")], buckets):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{metric}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {total:.6f}")
+            lines.append(f"{metric}_count{format_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def _job(self, job_id):
+        metrics = self._jobs.get(job_id)
+        if metrics is None:
+            metrics = self._jobs[job_id] = MetricSet()
+            while len(self._jobs) > self.history_size:
+                self._jobs.popitem(last=False)
+        return metrics
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def timed(name, **labels):
+    """Decorator timing a method (or coroutine method) as span ``name``, attributed to ``self.job_id``.
+
+    Without labels the span is labelled with the method name, e.g.
+    ``@timed("tool")`` records ``tool{tool="search_urls"}``.
+    """
+
+    def decorate(func):
+        span_labels = labels or {name: func.__name__}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                with get_default_metrics().span(name, job_id=getattr(self, "job_id", None), **span_labels):
+                    return await func(self, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with get_default_metrics().span(name, job_id=getattr(self, "job_id", None), **span_labels):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def bind_job(func):
+    """Wrap ``func`` to run on worker threads in the caller's context.
+
+    Spans it records count towards the caller's current job, and model calls it
+    makes inside a recorded tool call are marked nested on the job's tape.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call runs in its own copy
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+class CrewTimer:
+    """Times crew steps and tasks from the callbacks CrewAI makes once each one finishes.
+
+    A step's duration is the time since the previous step (or task) finished;
+    a task's is the time since the previous task finished.
+    """
+
+    def __init__(self, registry, job_id=None):
+        self.registry = registry
+        self.job_id = job_id
+        self.last_step = self.last_task = time.perf_counter()
+
+    def step(self, step):
+        now = time.perf_counter()
+        # Agent actions are labelled with their tool; tool results and final answers by kind
+        kind = getattr(step, "tool", None) or (
+            "tool_result" if hasattr(step, "result") else "final_answer" if hasattr(step, "output") else "other")
+        self.registry.observe("crew_step", now - self.last_step, self.job_id, kind=kind)
+        self.last_step = now
+
+    def task(self, output):
+        now = time.perf_counter()
+        self.registry.observe("crew_task", now - self.last_task, self.job_id,
+                              agent=getattr(output, "agent", None) or "unknown")
+        self.last_task = self.last_step = now
+
+    def wrap_step_callback(self, callback=None):
+        def step_callback(step):
+            self.step(step)
+            if callback:
+                callback(step)
+        return step_callback
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_default_metrics():
+    """Return the process-wide metrics registry"""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = MetricsRegistry()
+        return _default_metrics
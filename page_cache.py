@@ -0,0 +1,280 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from logging_setup import get_logger
+import threading
+import hashlib
+import sqlite3
+import zlib
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Cache settings (override via environment)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join("cache", "pages.sqlite3"))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", str(24 * 60 * 60)))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Only successful pages and definite "not found" answers are worth keeping
+CACHEABLE_STATUSES = {200, 203, 404, 410}
+
+# Eviction trims the cache to this fraction of the size limit
+EVICT_TARGET_RATIO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    tier TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash);
+-- Stored body bytes, kept up to date by triggers so stores never sum the whole table
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS contents_added AFTER INSERT ON contents
+BEGIN UPDATE totals SET bytes = bytes + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS contents_removed AFTER DELETE ON contents
+BEGIN UPDATE totals SET bytes = bytes - OLD.size; END;
+INSERT OR IGNORE INTO totals (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM contents;
+"""
+
+
+def normalize_cache_key(url):
+    """Normalize a URL for cache lookups: lower-case host, no default port, fragment or trailing slash, sorted query"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class CachedPage:
+    """A page read back from the cache"""
+
+    def __init__(self, url, html, status, tier, etag, last_modified, fetched_at):
+        self.url = url
+        self.html = html
+        self.status = status
+        self.tier = tier
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+    @property
+    def validators(self):
+        """Conditional request headers for revalidating this page"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """On-disk page cache shared across jobs and processes.
+
+    Page bodies are stored once per content hash and referenced from a table keyed
+    by normalized URL. Entries expire after ``ttl`` seconds but can be revalidated
+    with their ETag / Last-Modified; the least recently used pages are evicted once
+    the stored bodies exceed ``max_bytes``.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "revalidated": 0,
+            "stores": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def get(self, url):
+        """Return the cached page for ``url`` (fresh or stale), or None"""
+        key = normalize_cache_key(url)
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT p.url, c.body, p.status, p.tier, p.etag, p.last_modified, p.fetched_at "
+                "FROM pages p JOIN contents c ON c.hash = p.content_hash WHERE p.key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        except sqlite3.Error as e:
+            self._error("reading", e)
+            return None
+
+        page = CachedPage(row[0], zlib.decompress(row[1]).decode("utf-8"), *row[2:])
+        self._count("hits" if page.is_fresh(self.ttl) else "stale")
+        return page
+
+    def put(self, url, html, status=200, tier=None, etag=None, last_modified=None, final_url=None):
+        """Store a page under ``url``; ``final_url`` is where redirects ended up.
+
+        Statuses outside CACHEABLE_STATUSES are ignored.
+        """
+        if status not in CACHEABLE_STATUSES:
+            return
+        body = (html or "").encode("utf-8")
+        content_hash = hashlib.sha256(body).hexdigest()
+        compressed = zlib.compress(body)
+        now = time.time()
+        key = normalize_cache_key(url)
+        try:
+            conn = self._connect()
+            replaced = conn.execute("SELECT content_hash FROM pages WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR IGNORE INTO contents (hash, body, size) VALUES (?, ?, ?)",
+                (content_hash, compressed, len(compressed))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(key, url, content_hash, status, tier, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, final_url or url, content_hash, status, tier, etag, last_modified, now, now)
+            )
+            if replaced is not None and replaced[0] != content_hash:
+                self._delete_orphans(conn, replaced[0])
+            conn.commit()
+            self._count("stores")
+            self._evict(conn)
+        except sqlite3.Error as e:
+            self._error("writing", e)
+
+    def touch(self, url):
+        """Mark a stale page as fresh again after a 304 Not Modified"""
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, normalize_cache_key(url))
+            )
+            conn.commit()
+            self._count("revalidated")
+        except sqlite3.Error as e:
+            self._error("updating", e)
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM pages")
+        conn.execute("DELETE FROM contents")
+        conn.execute("UPDATE totals SET bytes = 0")
+        conn.commit()
+
+    def stats(self):
+        """Hit/miss counters plus the current number of pages and stored bytes"""
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            conn = self._connect()
+            stats["pages"] = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            stats["bytes"] = self._total_bytes(conn)
+        except sqlite3.Error:
+            stats["pages"] = stats["bytes"] = None
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_ratio"] = (stats["hits"] + stats["revalidated"]) / lookups if lookups else 0.0
+        stats.update({"path": self.path, "ttl": self.ttl, "max_bytes": self.max_bytes})
+        return stats
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _total_bytes(self, conn):
+        return conn.execute("SELECT bytes FROM totals").fetchone()[0]
+
+    def _delete_orphans(self, conn, content_hash=None):
+        """Drop ``content_hash`` if no page refers to it any more (an index lookup), or every such body"""
+        if content_hash is None:
+            conn.execute("DELETE FROM contents WHERE hash NOT IN (SELECT content_hash FROM pages)")
+            return
+        conn.execute(
+            "DELETE FROM contents WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM pages WHERE content_hash = ?)",
+            (content_hash, content_hash)
+        )
+
+    def _evict(self, conn):
+        """Drop least recently used pages until the stored bodies fit under the size limit"""
+        total = self._total_bytes(conn)
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        evicted = 0
+        for key, size in conn.execute(
+            "SELECT p.key, c.size FROM pages p JOIN contents c ON c.hash = p.content_hash "
+            "ORDER BY p.accessed_at ASC"
+        ).fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        # Eviction is rare, so it also sweeps up bodies orphaned by pages another process replaced concurrently
+        self._delete_orphans(conn)
+        conn.commit()
+        with self._lock:
+            self._stats["evictions"] += evicted
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _error(self, action, error):
+        self._count("errors")
+        logger.error(f"Page cache error {action}: {str(error)}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide page cache, or None when caching is disabled"""
+    global _default_cache
+    if not PAGE_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache()
+        return _default_cache
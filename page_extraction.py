@@ -0,0 +1,114 @@
+from extractors import KeywordMatcher, get_default_extractor
+from metrics import get_default_metrics
+
+AI_KEYWORDS = ["artificial intelligence", "ai", "machine learning", "ml", "deep learning", "automation"]
+ENTERPRISE_KEYWORDS = ["enterprise", "corporate", "fortune 500", "large business", "multinational"]
+
+CONTACT_LINK_TEXTS = [
+    "contact", "contact us", "get in touch", "say hi", "reach out",
+    "talk to us", "connect", "let's talk", "write to us"
+]
+CONTACT_PATHS = ["/contact", "/contact-us", "/get-in-touch", "/connect", "/about", "/about-us"]
+
+MIN_ADDRESS_LENGTH = 10
+
+# One matcher checks both keyword sets and stops once both have matched
+CONTENT_KEYWORDS = KeywordMatcher({"ai": AI_KEYWORDS, "enterprise": ENTERPRISE_KEYWORDS})
+
+CONTACT_FIELDS = ["emails", "phones", "linkedin_profiles", "instagram_profiles", "physical_addresses"]
+
+
+def empty_contact_info():
+    return {field: [] for field in CONTACT_FIELDS}
+
+
+def merge_contact_info(target, found):
+    """Append every contact field of ``found`` to ``target``"""
+    for field in CONTACT_FIELDS:
+        target[field].extend(found.get(field, []))
+    return target
+
+
+def dedupe_contact_info(contact_info):
+    """Remove duplicates while preserving order"""
+    for field in contact_info:
+        contact_info[field] = list(dict.fromkeys(contact_info[field]))
+    return contact_info
+
+
+def has_contact_details(contact_info):
+    """True when emails, phones or an address were found"""
+    return bool(contact_info["emails"] or contact_info["phones"] or contact_info["physical_addresses"])
+
+
+def extract_content(snapshot):
+    """About/services/clients sections and AI / enterprise keyword flags"""
+    with get_default_metrics().span("extraction", kind="keywords"):
+        matched = CONTENT_KEYWORDS.matches(snapshot.text)
+    return {
+        "about": snapshot.sections.get("about", ""),
+        "services": snapshot.sections.get("services", ""),
+        "clients": snapshot.sections.get("clients", ""),
+        "has_ai_mention": "ai" in matched,
+        "has_enterprise": "enterprise" in matched,
+    }
+
+
+def extract_social_links(snapshot, contact_info=None):
+    """LinkedIn and Instagram links anywhere on the page, footer included"""
+    contact_info = contact_info or empty_contact_info()
+    for link in snapshot.links:
+        href = link["href"]
+        if "linkedin.com" in href:
+            contact_info["linkedin_profiles"].append(href)
+        elif "instagram.com" in href:
+            contact_info["instagram_profiles"].append(href)
+    return contact_info
+
+
+def extract_contacts(snapshot):
+    """Emails, phones, social links and addresses found on one page"""
+    with get_default_metrics().span("extraction", kind="contacts"):
+        return _extract_contacts(snapshot)
+
+
+def _extract_contacts(snapshot):
+    extractor = get_default_extractor()
+    contact_info = empty_contact_info()
+
+    emails, phones = extractor.scan(snapshot.text)
+    contact_info["emails"].extend(emails)
+    contact_info["phones"].extend(phones)
+    extract_social_links(snapshot, contact_info)
+
+    # Prefer explicit address containers, then paragraphs containing a postcode
+    address_texts = list(snapshot.addresses)
+    if not address_texts:
+        address_texts = [p for p in snapshot.paragraphs if extractor.has_postcode(p)]
+    for addr_text in address_texts:
+        addr_text = addr_text.strip()
+        if len(addr_text) > MIN_ADDRESS_LENGTH:
+            contact_info["physical_addresses"].append(addr_text)
+
+    return contact_info
+
+
+def rank_contact_links(snapshot, limit=2):
+    """Links that look like contact pages, best match first (exact text beats substring, earlier texts win)"""
+    scored = {}
+    for link in snapshot.links:
+        link_text = link["text"].lower()
+        for rank, text in enumerate(CONTACT_LINK_TEXTS):
+            score = rank * 2 if link_text == text else rank * 2 + 1 if text in link_text else None
+            if score is not None:
+                href = link["href"].split("#")[0]
+                if href.startswith("http"):
+                    scored[href] = min(score, scored.get(href, score))
+                break
+    return sorted(scored, key=scored.get)[:limit]
+
+
+def guess_contact_urls(url):
+    """Common contact page paths under the site root, most likely first"""
+    base = url.rstrip("/")
+    return [f"{base}{path}" for path in CONTACT_PATHS]
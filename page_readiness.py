@@ -0,0 +1,179 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from urllib.parse import urlparse
+from contextlib import nullcontext
+from logging_setup import get_logger
+from politeness import get_default_scheduler
+from chrome_profile import get_default_profile
+from metrics import get_default_metrics
+import threading
+import time
+import os
+
+logger = get_logger(__name__)
+
+# The unconditional sleep every page load used to pay; used to report time saved
+FIXED_SLEEP_SECONDS = 2.0
+
+# Readiness timeouts (override via environment)
+READY_DEFAULT_TIMEOUT = float(os.getenv("READY_DEFAULT_TIMEOUT", "8"))
+READY_MIN_TIMEOUT = float(os.getenv("READY_MIN_TIMEOUT", "2"))
+READY_MAX_TIMEOUT = float(os.getenv("READY_MAX_TIMEOUT", "20"))
+NETWORK_IDLE_QUIET = float(os.getenv("READY_NETWORK_IDLE_QUIET", "0.5"))
+POLL_INTERVAL = 0.1
+
+# Per-site timeout adaptation
+TIMEOUT_HEADROOM = 3.0   # timeout = observed ready time * headroom
+TIMEOUT_BACKOFF = 1.5    # timeout multiplier after a site times out
+EWMA_ALPHA = 0.3
+
+# Number of network resources the page has loaded so far
+RESOURCE_COUNT_SCRIPT = """
+return window.performance && performance.getEntriesByType
+    ? performance.getEntriesByType('resource').length : 0;
+"""
+
+
+class PageReadiness:
+    """Waits for pages to become usable instead of sleeping a fixed time.
+
+    A page is ready once ``document.readyState`` is complete (or interactive under
+    an eager page load strategy), an optional target selector is present and no
+    new network resources have appeared for a short quiet period. Each host
+    keeps its own adaptive timeout derived from how long its pages have taken
+    so far.
+    """
+
+    def __init__(self, default_timeout=READY_DEFAULT_TIMEOUT, min_timeout=READY_MIN_TIMEOUT,
+                 max_timeout=READY_MAX_TIMEOUT, quiet_period=NETWORK_IDLE_QUIET, scheduler=None, ready_states=None):
+        self.default_timeout = default_timeout
+        # With an eager page load strategy the DOM is usable before every subresource has finished
+        self.ready_states = tuple(ready_states or get_default_profile().ready_states)
+        # Browser navigations share the per-host throttle with plain HTTP requests
+        self.scheduler = scheduler if scheduler is not None else get_default_scheduler()
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.quiet_period = quiet_period
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._stats = {
+            "pages": 0,
+            "timeouts": 0,
+            "selector_misses": 0,
+            "wait_time_total": 0.0,
+            "fixed_sleep_total": 0.0,
+        }
+
+    def load(self, driver, url, selector=None):
+        """Navigate to ``url`` and wait until the page is ready; returns False on timeout"""
+        with self.scheduler.slot(url) if self.scheduler else nullcontext():
+            with get_default_metrics().span("browser_navigation"):
+                driver.get(url)
+            return self.wait_until_ready(driver, url, selector)
+
+    def wait_until_ready(self, driver, url, selector=None):
+        """Wait for readyState, the target selector and network idle, bounded by the host timeout"""
+        host = urlparse(url).netloc.lower()
+        timeout = self.timeout_for(host)
+        started = time.monotonic()
+        deadline = started + timeout
+        ready = True
+        selector_found = True
+
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+                lambda d: d.execute_script("return document.readyState") in self.ready_states
+            )
+            if selector:
+                remaining = max(0.0, deadline - time.monotonic())
+                try:
+                    WebDriverWait(driver, remaining, poll_frequency=POLL_INTERVAL).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                    )
+                except TimeoutException:
+                    selector_found = False
+            self._wait_for_network_idle(driver, deadline)
+        except TimeoutException:
+            ready = False
+        except Exception as e:
+            logger.error(f"Error waiting for page readiness: {str(e)}")
+            ready = False
+
+        elapsed = time.monotonic() - started
+        self._record(host, elapsed, ready, selector_found)
+        get_default_metrics().observe("readiness_wait", elapsed, ready=str(ready).lower())
+        if not ready:
+            logger.warning(f"Page not ready after {timeout:.1f}s: {url}")
+        return ready
+
+    def timeout_for(self, host):
+        """Current adaptive timeout for a host"""
+        with self._lock:
+            site = self._hosts.get(host)
+            return site["timeout"] if site else self.default_timeout
+
+    def stats(self):
+        """Aggregate and per-host readiness metrics, including time saved versus fixed sleeps"""
+        with self._lock:
+            stats = dict(self._stats)
+            hosts = {host: dict(site) for host, site in self._hosts.items()}
+        stats["time_saved"] = stats["fixed_sleep_total"] - stats["wait_time_total"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["pages"] if stats["pages"] else 0.0
+        stats["hosts"] = hosts
+        return stats
+
+    def _wait_for_network_idle(self, driver, deadline):
+        """Return once no new resources have finished loading for the quiet period"""
+        last_count = None
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            count = driver.execute_script(RESOURCE_COUNT_SCRIPT)
+            now = time.monotonic()
+            if count != last_count:
+                last_count = count
+                quiet_since = now
+            elif now - quiet_since >= self.quiet_period:
+                return
+            time.sleep(POLL_INTERVAL)
+
+    def _record(self, host, elapsed, ready, selector_found):
+        with self._lock:
+            self._stats["pages"] += 1
+            self._stats["wait_time_total"] += elapsed
+            self._stats["fixed_sleep_total"] += FIXED_SLEEP_SECONDS
+            if not ready:
+                self._stats["timeouts"] += 1
+            if not selector_found:
+                self._stats["selector_misses"] += 1
+
+            site = self._hosts.setdefault(host, {
+                "pages": 0,
+                "timeouts": 0,
+                "avg_ready_time": None,
+                "timeout": self.default_timeout,
+            })
+            site["pages"] += 1
+            if ready:
+                avg = site["avg_ready_time"]
+                avg = elapsed if avg is None else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * avg
+                site["avg_ready_time"] = avg
+                timeout = avg * TIMEOUT_HEADROOM
+            else:
+                site["timeouts"] += 1
+                timeout = site["timeout"] * TIMEOUT_BACKOFF
+            site["timeout"] = min(self.max_timeout, max(self.min_timeout, timeout))
+
+
+_default_readiness = None
+_default_readiness_lock = threading.Lock()
+
+
+def get_default_readiness():
+    """Return the process-wide readiness engine so per-site timings are shared"""
+    global _default_readiness
+    with _default_readiness_lock:
+        if _default_readiness is None:
+            _default_readiness = PageReadiness()
+        return _default_readiness
@@ -0,0 +1,292 @@
+from urllib.robotparser import RobotFileParser
+from urllib.parse import urlsplit
+from contextlib import asynccontextmanager, contextmanager
+from logging_setup import get_logger
+from metrics import get_default_metrics
+import threading
+import requests
+import asyncio
+import random
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Politeness settings (override via environment)
+POLITENESS_ENABLED = os.getenv("POLITENESS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Requests in flight to one host at a time, and the minimum gap between their starts
+HOST_MAX_CONCURRENCY = int(os.getenv("HOST_MAX_CONCURRENCY", "2"))
+HOST_MIN_INTERVAL = float(os.getenv("HOST_MIN_INTERVAL", "0.25"))
+# robots.txt Crawl-delay / Request-rate are honoured up to this many seconds
+ROBOTS_ENABLED = os.getenv("ROBOTS_ENABLED", "true").lower() in ("1", "true", "yes")
+ROBOTS_MAX_CRAWL_DELAY = float(os.getenv("ROBOTS_MAX_CRAWL_DELAY", "30"))
+ROBOTS_USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "*")
+ROBOTS_TIMEOUT = float(os.getenv("ROBOTS_TIMEOUT", "5"))
+ROBOTS_TTL = float(os.getenv("ROBOTS_TTL", "86400"))
+# A host answering 429/5xx is left alone for base * 2^(failures - 1) seconds (jittered, capped)
+HOST_BACKOFF_BASE = float(os.getenv("HOST_BACKOFF_BASE", "2"))
+HOST_BACKOFF_MAX = float(os.getenv("HOST_BACKOFF_MAX", "120"))
+
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+# Seconds between checks for a free slot while a coroutine waits on a host at its concurrency limit
+ASYNC_SLOT_POLL_INTERVAL = 0.05
+
+
+def host_key(url):
+    """Host (and port) a request goes to"""
+    try:
+        return urlsplit(url).netloc.lower()
+    except ValueError:
+        return ""
+
+
+def retry_after_seconds(headers):
+    """Seconds from a numeric Retry-After header, or None"""
+    try:
+        return float((headers or {}).get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class HostState:
+    """Scheduling state and counters for one host"""
+
+    def __init__(self):
+        self.active = 0
+        self.waiting = 0
+        self.next_start = 0.0
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.crawl_delay = None
+        self.robots_checked_at = None
+        self.robots_ready = threading.Event()
+        self.requests = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class PolitenessScheduler:
+    """Central per-host throttle shared by every fetcher and browser in the process.
+
+    Each request to a host waits for a free slot (``max_concurrency`` in flight),
+    for the host's minimum interval or robots.txt crawl delay since the previous
+    request started, and for any backoff after the host answered 429 or 5xx.
+    """
+
+    def __init__(self, max_concurrency=HOST_MAX_CONCURRENCY, min_interval=HOST_MIN_INTERVAL, robots=ROBOTS_ENABLED,
+                 max_crawl_delay=ROBOTS_MAX_CRAWL_DELAY, backoff_base=HOST_BACKOFF_BASE, backoff_max=HOST_BACKOFF_MAX):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self.robots = robots
+        self.max_crawl_delay = max_crawl_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._hosts = {}
+        self._cond = threading.Condition()
+        self._session = requests.Session()
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's request slots for the duration of a request"""
+        host = host_key(url)
+        if not host:
+            yield
+            return
+        self.crawl_delay(url)
+        self._acquire(host)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    @asynccontextmanager
+    async def aslot(self, url):
+        """``slot`` for coroutines: waits on the event loop instead of blocking a thread"""
+        host = host_key(url)
+        if not host:
+            yield
+            return
+        if self._robots_pending(host):
+            # robots.txt is fetched once per host with the blocking client
+            await asyncio.to_thread(self.crawl_delay, url)
+        await self._aacquire(host)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def record(self, url, status, headers=None):
+        """Back off a host that answered 429/5xx; a normal answer resets its backoff"""
+        host = host_key(url)
+        if not host or status is None:
+            return
+        with self._cond:
+            state = self._state(host)
+            if status in BACKOFF_STATUSES:
+                state.failures += 1
+                state.throttled += 1
+                delay = retry_after_seconds(headers)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (state.failures - 1)) * random.uniform(0.5, 1.0)
+                state.backoff_until = max(state.backoff_until, time.monotonic() + delay)
+                logger.warning(f"{host} answered HTTP {status}, backing off for {delay:.1f}s")
+            else:
+                state.failures = 0
+            self._cond.notify_all()
+
+    def crawl_delay(self, url):
+        """Seconds robots.txt asks between requests to this host (capped), fetched once per host"""
+        if not self.robots:
+            return None
+        host = host_key(url)
+        with self._cond:
+            state = self._state(host)
+            checked_at = state.robots_checked_at
+            fetch = checked_at is None or time.monotonic() - checked_at >= ROBOTS_TTL
+            if fetch:
+                # Claim the check so concurrent requests wait for it instead of all fetching robots.txt
+                state.robots_checked_at = time.monotonic()
+        if not fetch:
+            state.robots_ready.wait(ROBOTS_TIMEOUT)
+            return state.crawl_delay
+        try:
+            delay = self._fetch_crawl_delay(url)
+            with self._cond:
+                state.crawl_delay = delay
+        finally:
+            state.robots_ready.set()
+        return delay
+
+    def _robots_pending(self, host):
+        """True while crawl_delay could still block for this host (robots.txt unchecked, stale or being fetched)"""
+        if not self.robots:
+            return False
+        with self._cond:
+            state = self._state(host)
+            checked_at = state.robots_checked_at
+        return (checked_at is None or time.monotonic() - checked_at >= ROBOTS_TTL
+                or not state.robots_ready.is_set())
+
+    def _fetch_crawl_delay(self, url):
+        parts = urlsplit(url)
+        robots_url = f"{parts.scheme or 'https'}://{parts.netloc}/robots.txt"
+        try:
+            response = self._session.get(robots_url, timeout=ROBOTS_TIMEOUT)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        parser = RobotFileParser()
+        parser.parse(response.text.splitlines())
+        parser.modified()  # crawl_delay() answers None for a parser that was never marked as read
+        delay = parser.crawl_delay(ROBOTS_USER_AGENT)
+        rate = parser.request_rate(ROBOTS_USER_AGENT)
+        if rate and rate.requests:
+            delay = max(float(delay or 0), rate.seconds / rate.requests)
+        if delay:
+            delay = min(float(delay), self.max_crawl_delay)
+            logger.info(f"robots.txt asks for {delay:.1f}s between requests to {parts.netloc}")
+        return float(delay) if delay else None
+
+    def _acquire(self, host):
+        started = time.monotonic()
+        with self._cond:
+            state = self._state(host)
+            state.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    ready_at = max(state.next_start, state.backoff_until)
+                    if state.active < self.max_concurrency and now >= ready_at:
+                        break
+                    # Sleep until the interval/backoff passes, or until a slot is released
+                    self._cond.wait(ready_at - now if now < ready_at else None)
+            finally:
+                state.waiting -= 1
+            waited = self._start(state, started, now)
+        get_default_metrics().observe("politeness_wait", waited)
+        return waited
+
+    async def _aacquire(self, host):
+        started = time.monotonic()
+        with self._cond:
+            state = self._state(host)
+            state.waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    ready_at = max(state.next_start, state.backoff_until)
+                    if state.active < self.max_concurrency and now >= ready_at:
+                        waited = self._start(state, started, now)
+                        break
+                # Released slots only notify threads, so coroutines poll for them
+                await asyncio.sleep(ready_at - now if now < ready_at else ASYNC_SLOT_POLL_INTERVAL)
+        finally:
+            with self._cond:
+                state.waiting -= 1
+        get_default_metrics().observe("politeness_wait", waited)
+        return waited
+
+    def _start(self, state, started, now):
+        """Take a slot and schedule the host's next start; called with the condition held"""
+        state.active += 1
+        state.next_start = now + max(self.min_interval, state.crawl_delay or 0.0)
+        waited = now - started
+        state.requests += 1
+        state.wait_total += waited
+        state.wait_max = max(state.wait_max, waited)
+        return waited
+
+    def _release(self, host):
+        with self._cond:
+            self._hosts[host].active -= 1
+            self._cond.notify_all()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState()
+        return state
+
+    def stats(self):
+        """Queue depth, in-flight requests, wait times and backoff per host"""
+        now = time.monotonic()
+        with self._cond:
+            hosts = {
+                host: {
+                    "queued": state.waiting,
+                    "active": state.active,
+                    "requests": state.requests,
+                    "throttled": state.throttled,
+                    "wait_avg": state.wait_total / state.requests if state.requests else 0.0,
+                    "wait_max": state.wait_max,
+                    "backoff_remaining": max(0.0, state.backoff_until - now),
+                    "crawl_delay": state.crawl_delay,
+                }
+                for host, state in self._hosts.items()
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "min_interval": self.min_interval,
+            "queued": sum(h["queued"] for h in hosts.values()),
+            "throttled": sum(h["throttled"] for h in hosts.values()),
+            "hosts": hosts,
+        }
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler():
+    """Return the process-wide politeness scheduler, or None when throttling is disabled"""
+    global _default_scheduler
+    if not POLITENESS_ENABLED:
+        return None
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = PolitenessScheduler()
+        return _default_scheduler
@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from logging_setup import get_logger
+import asyncio
+import json
+import re
+import os
+
+logger = get_logger(__name__)
+
+# Maximum number of prospects qualified at the same time
+QUALIFY_CONCURRENCY = int(os.getenv("QUALIFY_CONCURRENCY", "4"))
+
+URL_PATTERN = re.compile(r'https?://[^\s,\'"\]\)>]+')
+
+
+def normalize_url(url):
+    """Normalize a URL so the same site compares equal regardless of scheme, www or trailing slash"""
+    if not url:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def parse_url_list(urls):
+    """Turn tool input (list, JSON string or free text) into a de-duplicated list of URLs"""
+    if isinstance(urls, str):
+        try:
+            parsed = json.loads(urls)
+        except json.JSONDecodeError:
+            parsed = URL_PATTERN.findall(urls)
+        urls = parsed if isinstance(parsed, list) else [parsed]
+
+    result = []
+    seen = set()
+    for item in urls:
+        url = (item.get("url") or item.get("URL")) if isinstance(item, dict) else item
+        if not isinstance(url, str) or not url.strip():
+            continue
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            result.append(url.strip())
+    return result
+
+
+class ExtractionFailed(Exception):
+    """Raised when a prospect's website could not be loaded or read"""
+
+
+def qualify_prospect(url, web_tools):
+    """Collect contact details and website content for one prospect"""
+    return qualified_row(url, web_tools.extract_page_data(url))
+
+
+async def aqualify_prospect(url, web_tools):
+    """``qualify_prospect`` for coroutines"""
+    return qualified_row(url, await web_tools.aextract_page_data(url))
+
+
+def qualified_row(url, data):
+    """``prospect_row`` for extracted page data; a failed extraction is an error, not a prospect without AI mentions"""
+    if data is None:
+        raise ExtractionFailed(f"No page data could be extracted from {url}")
+    return prospect_row(url, data)
+
+
+def prospect_row(url, data):
+    """Turn extract_page_data output into CSV-style prospect fields"""
+    data = data or {}
+    contact_info = data.get("contact_info") or {}
+    content = data.get("content") or {}
+
+    return {
+        "URL": url,
+        "Primary Services": content.get("services", ""),
+        "AI Mentions": "Yes" if content.get("has_ai_mention") else "No",
+        "Email": ", ".join(contact_info.get("emails", [])),
+        "Phone": ", ".join(contact_info.get("phones", [])),
+        "LinkedIn": next(iter(contact_info.get("linkedin_profiles", [])), ""),
+        "Instagram": next(iter(contact_info.get("instagram_profiles", [])), ""),
+        "Physical Address": next(iter(contact_info.get("physical_addresses", [])), ""),
+        "About": content.get("about", ""),
+        "Clients": content.get("clients", ""),
+        "Enterprise Focus": "Yes" if content.get("has_enterprise") else "No",
+    }
+
+
+def qualify_prospects(urls, tools_factory, max_workers=QUALIFY_CONCURRENCY, on_result=None):
+    """Qualify prospects concurrently, one WebTools (browser and session) per worker.
+
+    Results are returned in the same order as ``urls``; a prospect that fails is
+    returned with only its URL and an ``Error`` field so nothing is dropped.
+    ``on_result`` is called with each successful result as soon as it is ready.
+    """
+    urls = parse_url_list(urls)
+    if not urls:
+        return []
+
+    workers = max(1, min(max_workers, len(urls)))
+    logger.info(f"Qualifying {len(urls)} prospects with {workers} workers")
+
+    def run(url):
+        web_tools = None
+        try:
+            web_tools = tools_factory()
+            result = qualify_prospect(url, web_tools)
+        except Exception as e:
+            logger.error(f"Error qualifying {url}: {str(e)}")
+            return {"URL": url, "Error": str(e)}
+        finally:
+            if web_tools is not None:
+                web_tools.cleanup()
+        if on_result:
+            try:
+                on_result(result)
+            except Exception as e:
+                logger.error(f"Error streaming result for {url}: {str(e)}")
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qualifier") as executor:
+        results = list(executor.map(run, urls))
+
+    logger.success(f"Qualified {len(results)} prospects")
+    return results
+
+
+async def aqualify_prospects(urls, tools_factory, max_workers=QUALIFY_CONCURRENCY, on_result=None):
+    """``qualify_prospects`` for coroutines: up to ``max_workers`` prospects are researched at once on the event loop"""
+    urls = parse_url_list(urls)
+    if not urls:
+        return []
+
+    workers = max(1, min(max_workers, len(urls)))
+    logger.info(f"Qualifying {len(urls)} prospects with {workers} concurrent tasks")
+    limit = asyncio.Semaphore(workers)
+
+    async def run(url):
+        web_tools = None
+        try:
+            async with limit:
+                web_tools = tools_factory()
+                result = await aqualify_prospect(url, web_tools)
+        except Exception as e:
+            logger.error(f"Error qualifying {url}: {str(e)}")
+            return {"URL": url, "Error": str(e)}
+        finally:
+            if web_tools is not None:
+                await web_tools.acleanup()
+        if on_result:
+            try:
+                # on_result usually writes to disk (CSV, lead store), so it runs on a worker thread
+                await asyncio.to_thread(on_result, result)
+            except Exception as e:
+                logger.error(f"Error streaming result for {url}: {str(e)}")
+        return result
+
+    results = list(await asyncio.gather(*(run(url) for url in urls)))
+    logger.success(f"Qualified {len(results)} prospects")
+    return results
+
+
+def merge_prospect_rows(rows, qualified, fields):
+    """Fill blank ``fields`` in agent-written rows with the data gathered by the qualification workers"""
+    by_url = {normalize_url(q.get("URL")): q for q in qualified}
+    merged = []
+    for row in rows:
+        row = dict(row)
+        found = by_url.get(normalize_url(row.get("URL")))
+        if found:
+            for key in fields:
+                if not row.get(key) and found.get(key):
+                    row[key] = found[key]
+        merged.append(row)
+    return merged
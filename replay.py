@@ -0,0 +1,253 @@
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging_setup import get_logger
+import contextvars
+import functools
+import asyncio
+import inspect
+import threading
+import hashlib
+import gzip
+import json
+import time
+import os
+
+logger = get_logger(__name__)
+
+# Record / replay settings (override via environment)
+# "record" captures every job's tool calls and model exchanges; "replay" answers them from REPLAY_ARCHIVE
+REPLAY_MODE = os.getenv("REPLAY_MODE", "off").strip().lower()
+# Recorded jobs are written here as <job id>.jsonl.gz
+REPLAY_DIR = os.getenv("REPLAY_DIR", "recordings")
+# Archive every job replays in replay mode
+REPLAY_ARCHIVE = os.getenv("REPLAY_ARCHIVE", "")
+# Fail on a call the archive has no exact match for, instead of serving the next recorded one in order
+REPLAY_STRICT = os.getenv("REPLAY_STRICT", "false").lower() in ("1", "true", "yes")
+
+RECORD = "record"
+REPLAY = "replay"
+ARCHIVE_FORMAT = "prospects-tape"
+ARCHIVE_VERSION = 1
+
+# Tapes with a tool call in progress in this thread or task; coroutines on one thread each get their own
+_active_tapes = contextvars.ContextVar("replay_active_tapes", default=frozenset())
+
+
+class ReplayMiss(Exception):
+    """Raised when a replayed call has no recorded answer"""
+
+
+def call_key(*parts):
+    """Deterministic key for a call's inputs"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Tape:
+    """Tool calls and model exchanges of one job, recorded to or replayed from a gzipped JSON-lines archive.
+
+    Entries are matched on their kind (``tool`` / ``llm``), name (tool or agent)
+    and a hash of their inputs. A replayed call without an exact match is served
+    the next unused entry of the same kind and name in recording order, unless
+    ``strict``. Model calls made inside a tool call being recorded (e.g. batch
+    scoring, on the tool's worker threads via ``metrics.bind_job``) are marked
+    nested, since replaying the tool makes them unnecessary.
+    """
+
+    def __init__(self, mode, path, strict=REPLAY_STRICT, meta=None, entries=None):
+        self.mode = mode
+        self.path = path
+        self.strict = strict
+        self.meta = dict(meta or {})
+        self.entries = list(entries or [])
+        self.closed = False
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._in_order = {}
+        self._stats = {"recorded": 0, "replayed": 0, "out_of_order": 0, "missing": 0}
+        for entry in self.entries:
+            self._by_key.setdefault((entry["kind"], entry["name"], entry["key"]), deque()).append(entry)
+            self._in_order.setdefault((entry["kind"], entry["name"]), deque()).append(entry)
+
+    @classmethod
+    def recorder(cls, path, **meta):
+        return cls(RECORD, path, meta=meta)
+
+    @classmethod
+    def player(cls, path, strict=REPLAY_STRICT):
+        """Load an archive written by a recorder"""
+        meta, entries = {}, []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for number, line in enumerate(f):
+                record = json.loads(line)
+                if number == 0:
+                    if record.get("format") != ARCHIVE_FORMAT:
+                        raise ValueError(f"{path} is not a recorded job")
+                    meta = record.get("meta", {})
+                else:
+                    entries.append(record)
+        logger.info(f"Replaying {len(entries)} recorded calls from {path}")
+        return cls(REPLAY, path, strict=strict, meta=meta, entries=entries)
+
+    @property
+    def recording(self):
+        return self.mode == RECORD
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    @contextmanager
+    def call(self):
+        """Mark a tool call in progress; yields False for calls nested in another one on this thread or task"""
+        active = _active_tapes.get()
+        if id(self) in active:
+            yield False
+            return
+        token = _active_tapes.set(active | {id(self)})
+        try:
+            yield True
+        finally:
+            _active_tapes.reset(token)
+
+    def record(self, kind, name, key, output, seconds, **fields):
+        # Only this thread or task's own tool call makes a model call nested, not one running elsewhere
+        nested = kind == "llm" and id(self) in _active_tapes.get()
+        with self._lock:
+            entry = {"seq": len(self.entries), "kind": kind, "name": name, "key": key, "output": output,
+                     "seconds": round(seconds, 6), **fields}
+            if nested:
+                entry["nested"] = True
+            self.entries.append(entry)
+            self._stats["recorded"] += 1
+
+    def replay(self, kind, name, key):
+        """The recorded entry answering this call"""
+        with self._lock:
+            matches = self._by_key.get((kind, name, key))
+            entry = None
+            while matches and entry is None:
+                candidate = matches.popleft()
+                entry = None if candidate.get("used") else candidate
+            if entry is None and not self.strict:
+                queue = self._in_order.get((kind, name)) or deque()
+                while queue and (queue[0].get("used") or queue[0].get("nested") or queue[0].get("live")):
+                    queue.popleft()
+                if queue:
+                    entry = queue.popleft()
+                    self._stats["out_of_order"] += 1
+            if entry is None:
+                self._stats["missing"] += 1
+                raise ReplayMiss(f"No recorded {kind} call for {name} in {self.path}")
+            entry["used"] = True
+            self._stats["replayed"] += 1
+            return entry
+
+    def close(self):
+        """Write a recording to its archive, or log how a replay matched up; safe to call repeatedly"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self.replaying:
+            logger.info(f"Replay of {self.path} finished", **self.stats())
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        header = {"format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION,
+                  "recorded_at": datetime.now().isoformat(), "meta": self.meta}
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            for record in [header] + self.entries:
+                f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        os.replace(temp_path, self.path)
+        logger.info(f"Recorded {len(self.entries)} calls to {self.path}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            unused = sum(1 for e in self.entries if not (e.get("used") or e.get("nested") or e.get("live")))
+        stats.update({"mode": self.mode, "path": self.path, "entries": len(self.entries)})
+        if self.replaying:
+            stats["unused"] = unused
+        return stats
+
+
+def recorded(apply=None, live=False, name=None):
+    """Decorator recording a WebTools method's inputs and output on ``self.tape``, or replaying them.
+
+    On replay the method does not run; ``apply`` names a method called with the
+    recorded output to redo the method's effects on the instance (e.g. streaming
+    rows to the CSV). ``live`` methods only touch local files and run on replay
+    too. Calls nested in another recorded call run normally and are not recorded.
+    Coroutine methods are recorded under ``name``, their blocking counterpart, so
+    either API can replay a job recorded with the other.
+    """
+
+    def decorate(func):
+        call_name = name or func.__name__
+
+        def replay(self, tape, key):
+            entry = tape.replay("tool", call_name, key)
+            if apply:
+                getattr(self, apply)(entry["output"])
+            return entry["output"]
+
+        def record(tape, key, args, kwargs, output, started):
+            if tape.recording:
+                tape.record("tool", call_name, key, output, time.perf_counter() - started,
+                            input={"args": list(args), "kwargs": kwargs}, **({"live": True} if live else {}))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                tape = getattr(self, "tape", None)
+                if tape is None:
+                    return await func(self, *args, **kwargs)
+                with tape.call() as outermost:
+                    if not outermost or (tape.replaying and live):
+                        return await func(self, *args, **kwargs)
+                    key = call_key(call_name, args, kwargs)
+                    if tape.replaying:
+                        # apply redoes the method's effects, e.g. CSV writes, so it stays off the event loop
+                        return await asyncio.to_thread(replay, self, tape, key) if apply else replay(self, tape, key)
+                    started = time.perf_counter()
+                    output = await func(self, *args, **kwargs)
+                    record(tape, key, args, kwargs, output, started)
+                    return output
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tape = getattr(self, "tape", None)
+            if tape is None:
+                return func(self, *args, **kwargs)
+            with tape.call() as outermost:
+                if not outermost or (tape.replaying and live):
+                    return func(self, *args, **kwargs)
+                key = call_key(call_name, args, kwargs)
+                if tape.replaying:
+                    return replay(self, tape, key)
+                started = time.perf_counter()
+                output = func(self, *args, **kwargs)
+                record(tape, key, args, kwargs, output, started)
+                return output
+
+        return wrapper
+
+    return decorate
+
+
+def open_tape(job_id=None, mode=REPLAY_MODE):
+    """Tape for a job as configured by REPLAY_MODE, or None when record/replay is off"""
+    if mode == RECORD:
+        name = job_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        return Tape.recorder(os.path.join(REPLAY_DIR, f"{name}.jsonl.gz"), job_id=job_id)
+    if mode == REPLAY:
+        if not REPLAY_ARCHIVE:
+            raise ValueError("REPLAY_MODE=replay needs REPLAY_ARCHIVE")
+        return Tape.player(REPLAY_ARCHIVE)
+    return None
@@ -0,0 +1,296 @@
+from concurrent.futures import ThreadPoolExecutor
+from logging_setup import get_logger
+from metrics import bind_job
+from qualification import normalize_url
+import threading
+import random
+import json
+import time
+import re
+import os
+
+logger = get_logger(__name__)
+
+# Batched scoring settings (override via environment)
+# Prospects packed into one model call, and the prompt size a batch may not exceed
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "8"))
+SCORE_BATCH_MAX_CHARS = int(os.getenv("SCORE_BATCH_MAX_CHARS", "16000"))
+# Research text kept per prospect; longer fields are truncated
+SCORE_PROSPECT_MAX_CHARS = int(os.getenv("SCORE_PROSPECT_MAX_CHARS", "1500"))
+# Batches scored at the same time
+SCORE_CONCURRENCY = int(os.getenv("SCORE_CONCURRENCY", "4"))
+# Rate-limited calls are retried with exponential backoff and jitter
+SCORE_MAX_RETRIES = int(os.getenv("SCORE_MAX_RETRIES", "4"))
+SCORE_BACKOFF_BASE = float(os.getenv("SCORE_BACKOFF_BASE", "1.0"))
+SCORE_BACKOFF_MAX = float(os.getenv("SCORE_BACKOFF_MAX", "30"))
+
+# Judgment fields filled in by the model; everything else in a row comes from the website
+SCORE_FIELDS = ["Company Name", "Decision Makers", "AI Interest Score", "Qualification Notes"]
+
+# Research fields sent to the model, in prompt order
+RESEARCH_FIELDS = ["URL", "Primary Services", "About", "Clients", "AI Mentions", "Enterprise Focus",
+                   "Physical Address", "LinkedIn"]
+
+BATCH_PROMPT = """You qualify agencies as prospects for AI solutions.
+Search query: {query}
+Target: {criteria}
+
+Research on {count} prospects, one JSON object per line:
+{prospects}
+
+Reply with ONLY a JSON array holding one object per prospect, each with these keys:
+"URL" (exactly as given), "Company Name" (the agency's name), "Decision Makers" (comma-separated names, or ""),
+"AI Interest Score" (integer 1-10: how likely they are to want AI solutions),
+"Qualification Notes" (two or three sentences explaining the score)."""
+
+
+class RateLimited(Exception):
+    """The model kept rejecting calls for exceeding its rate limit"""
+
+
+def heuristic_score(row):
+    """Fallback score from keyword mentions when the model's answer cannot be used"""
+    score = 3
+    if row.get("AI Mentions") == "Yes":
+        score += 4
+    if row.get("Enterprise Focus") == "Yes":
+        score += 2
+    return {
+        "AI Interest Score": min(score, 10),
+        "Qualification Notes": "Scored from AI and enterprise keyword mentions on the website.",
+    }
+
+
+def parse_json_value(text, kind=dict):
+    """First JSON object (or array, with ``kind=list``) in a model reply, tolerating code fences and prose"""
+    pattern = r"\[.*\]" if kind is list else r"\{.*\}"
+    match = re.search(pattern, text or "", re.DOTALL)
+    if not match:
+        return None
+    try:
+        value = json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, kind) else None
+
+
+def parse_json_object(text):
+    return parse_json_value(text, dict)
+
+
+def prospect_summary(row, max_chars=SCORE_PROSPECT_MAX_CHARS):
+    """Compact one-line JSON of the research the model needs, truncated to ``max_chars``"""
+    fields = {field: str(row[field]).strip() for field in RESEARCH_FIELDS if row.get(field)}
+    budget = max_chars - len(fields.get("URL", "")) - 100
+    for field in ("About", "Clients", "Primary Services"):
+        if field in fields:
+            fields[field] = fields[field][:max(budget, 0)]
+            budget -= len(fields[field])
+    return json.dumps(fields, ensure_ascii=False)
+
+
+def make_batches(summaries, max_items=SCORE_BATCH_SIZE, max_chars=SCORE_BATCH_MAX_CHARS):
+    """Group ``(key, summary)`` pairs into batches bounded by count and total characters"""
+    batches = []
+    current = []
+    size = 0
+    for key, summary in summaries:
+        if current and (len(current) >= max_items or size + len(summary) > max_chars):
+            batches.append(current)
+            current = []
+            size = 0
+        current.append((key, summary))
+        size += len(summary) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+
+def validate_score(item, fieldnames=None):
+    """Score fields from one model answer checked against the CSV schema, or None when unusable.
+
+    Only judgment fields that are CSV columns are kept, the score must be an
+    integer from 1 to 10 and text fields must be strings (a list of decision
+    makers is joined).
+    """
+    if not isinstance(item, dict):
+        return None
+    allowed = [field for field in SCORE_FIELDS if fieldnames is None or field in fieldnames]
+    score = item.get("AI Interest Score")
+    if isinstance(score, str) and score.strip().isdigit():
+        score = int(score.strip())
+    if isinstance(score, float) and score.is_integer():
+        score = int(score)
+    if isinstance(score, bool) or not isinstance(score, int) or not 1 <= score <= 10:
+        return None
+    valid = {"AI Interest Score": score}
+    for field in allowed:
+        if field == "AI Interest Score":
+            continue
+        value = item.get(field)
+        if isinstance(value, list):
+            value = ", ".join(str(v).strip() for v in value if str(v).strip())
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return None
+        if value.strip():
+            valid[field] = value.strip()
+    return {field: value for field, value in valid.items() if field in allowed}
+
+
+def is_rate_limited(error):
+    """True for 429 / rate limit errors from the model provider, including ones CrewAI re-raised"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        # litellm and openai both raise a RateLimitError carrying the 429 status
+        if type(error).__name__ == "RateLimitError":
+            return True
+        response = getattr(error, "response", None)
+        if 429 in (getattr(error, "status_code", None), getattr(response, "status_code", None)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, when the error says"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchScorer:
+    """Scores many prospects with one model call per batch.
+
+    Prospects are packed into batches bounded by count and prompt size, batches
+    run concurrently, and every answer is validated against the CSV columns.
+    Prospects missing from a batch's answer are retried once in a new batch and
+    then scored from keyword mentions. A rate-limited call pauses every batch
+    until its backoff has passed.
+    """
+
+    def __init__(self, llm, search_query="", criteria=None, fieldnames=None, batch_size=SCORE_BATCH_SIZE,
+                 max_chars=SCORE_BATCH_MAX_CHARS, concurrency=SCORE_CONCURRENCY, max_retries=SCORE_MAX_RETRIES,
+                 backoff_base=SCORE_BACKOFF_BASE, backoff_max=SCORE_BACKOFF_MAX):
+        self.llm = llm
+        self.search_query = search_query
+        self.criteria = criteria or {}
+        self.fieldnames = fieldnames
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"prospects": 0, "batches": 0, "calls": 0, "scored": 0, "invalid": 0, "retried": 0,
+                       "fallbacks": 0, "rate_limited": 0, "backoff_seconds": 0.0}
+
+    def score(self, prospects):
+        """Return the prospects' rows with the score fields merged in, in the same order"""
+        prospects = list(prospects)
+        if not prospects:
+            return []
+        self._count("prospects", len(prospects))
+        pending = {}
+        for prospect in prospects:
+            pending.setdefault(normalize_url(prospect.get("URL", "")), prospect)
+
+        scores = self._score_batches(pending)
+        missing = {key: prospect for key, prospect in pending.items() if key not in scores}
+        if missing:
+            # Whatever a batch dropped or answered badly gets one more try in fresh batches
+            self._count("retried", len(missing))
+            scores.update(self._score_batches(missing))
+
+        rows = []
+        for prospect in prospects:
+            scored = scores.get(normalize_url(prospect.get("URL", "")))
+            if scored is None:
+                self._count("fallbacks")
+                scored = heuristic_score(prospect)
+            row = dict(prospect)
+            row.update(scored)
+            if self.search_query:
+                row["Search Query"] = self.search_query
+            rows.append(row)
+        return rows
+
+    def _score_batches(self, prospects):
+        summaries = [(key, prospect_summary(prospect)) for key, prospect in prospects.items()]
+        batches = make_batches(summaries, self.batch_size, self.max_chars)
+        workers = max(1, min(self.concurrency, len(batches)))
+        logger.info(f"Scoring {len(summaries)} prospects in {len(batches)} batches with {workers} workers")
+        scores = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scorer") as executor:
+            for batch_scores in executor.map(bind_job(self._score_batch), batches):
+                scores.update(batch_scores)
+        return scores
+
+    def _score_batch(self, batch):
+        """Valid scores keyed by normalized URL for one batch; empty when the call fails"""
+        self._count("batches")
+        prompt = BATCH_PROMPT.format(
+            query=self.search_query,
+            criteria=json.dumps(self.criteria),
+            count=len(batch),
+            prospects="\n".join(summary for _, summary in batch),
+        )
+        try:
+            reply = self._call(prompt)
+        except Exception as e:
+            logger.error(f"Error scoring batch of {len(batch)} prospects: {str(e)}")
+            return {}
+
+        keys = {key for key, _ in batch}
+        scores = {}
+        for item in parse_json_value(reply, list) or []:
+            key = normalize_url(item.get("URL", "")) if isinstance(item, dict) else None
+            valid = validate_score(item, self.fieldnames) if key in keys else None
+            if valid is None:
+                self._count("invalid")
+                continue
+            scores[key] = valid
+        self._count("scored", len(scores))
+        return scores
+
+    def _call(self, prompt):
+        """One model call, retried with backoff while the provider is rate limiting"""
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_cooldown()
+            self._count("calls")
+            try:
+                return self.llm.call([{"role": "user", "content": prompt}])
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimited(str(e)) from e
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self._count("rate_limited")
+                self._count("backoff_seconds", delay)
+                logger.warning(f"Rate limited while scoring, retrying in {delay:.1f}s")
+                with self._lock:
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    def _wait_for_cooldown(self):
+        with self._lock:
+            wait = self._resume_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
@@ -0,0 +1,331 @@
+from urllib.parse import urlencode, urlsplit, parse_qs
+from html.parser import HTMLParser
+from itertools import islice
+from contextlib import aclosing, nullcontext
+from selenium.webdriver.common.by import By
+from logging_setup import get_logger
+from lead_store import normalize_domain
+from metrics import get_default_metrics
+import threading
+import asyncio
+import json
+import os
+
+logger = get_logger(__name__)
+
+# Search settings (override via environment)
+# Providers tried in order until enough results are found: google, duckduckgo, fixture
+SEARCH_PROVIDERS = [p.strip().lower() for p in os.getenv("SEARCH_PROVIDERS", "google,duckduckgo").split(",") if p.strip()]
+# Result pages read per provider before moving on to the next one
+SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", "5"))
+# Results returned when the caller does not ask for a number
+SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "10"))
+# JSON file of canned results for the fixture provider: {"query": [results], "*": [results]}
+SEARCH_FIXTURES = os.getenv("SEARCH_FIXTURES", "")
+# DuckDuckGo HTML endpoint; point it at a mirror or a local recording to search offline
+SEARCH_DUCKDUCKGO_URL = os.getenv("SEARCH_DUCKDUCKGO_URL", "https://html.duckduckgo.com/html/")
+
+# Social networks and directories that list agencies rather than being one
+BLACKLISTED_DOMAINS = {
+    "linkedin.com", "facebook.com", "twitter.com", "x.com", "instagram.com", "youtube.com", "tiktok.com",
+    "pinterest.com", "reddit.com", "medium.com", "wikipedia.org", "yelp.com", "yelp.co.uk", "yell.com",
+    "clutch.co", "designrush.com", "sortlist.com", "sortlist.co.uk", "goodfirms.co", "upcity.com",
+    "themanifest.com", "agencyspotter.com", "crunchbase.com", "glassdoor.com", "glassdoor.co.uk",
+    "indeed.com", "trustpilot.com", "google.com", "bing.com", "duckduckgo.com",
+} | {d.strip().lower() for d in os.getenv("SEARCH_BLACKLIST", "").split(",") if d.strip()}
+
+
+def is_blacklisted(url, blacklist=BLACKLISTED_DOMAINS):
+    """True for URLs on a blacklisted domain or one of its subdomains"""
+    domain = normalize_domain(url)
+    return any(domain == blocked or domain.endswith("." + blocked) for blocked in blacklist)
+
+
+def parse_search_input(query, num_results=None):
+    """Tool input is either a plain query or JSON like {"query": "...", "num_results": 10}"""
+    if isinstance(query, str) and query.strip().startswith("{"):
+        try:
+            parsed = json.loads(query)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict) and parsed.get("query"):
+            query = parsed["query"]
+            num_results = num_results or parsed.get("num_results") or parsed.get("num_prospects")
+    return str(query).strip(), int(num_results) if num_results else None
+
+
+class GoogleProvider:
+    """Google results pages rendered in the job's Chrome driver.
+
+    ``apage`` renders on ``browser`` (an AsyncBrowser) under ``browser_lock`` and
+    calls ``release`` after each page, like the async page loads, so a coroutine
+    only holds a driver while a results page is rendering.
+    """
+
+    name = "google"
+
+    def __init__(self, get_driver, readiness, page_size=10, browser=None, browser_lock=None, release=None):
+        self.get_driver = get_driver
+        self.readiness = readiness
+        self.page_size = page_size
+        self.browser = browser
+        self.browser_lock = browser_lock
+        self.release = release
+
+    async def apage(self, query, page_index):
+        if self.browser is None:
+            return await asyncio.to_thread(self.page, query, page_index)
+        return await self.browser.run(self._render_page, query, page_index)
+
+    def _render_page(self, query, page_index):
+        with self.browser_lock or nullcontext():
+            try:
+                return self.page(query, page_index)
+            finally:
+                if self.release is not None:
+                    self.release()
+
+    def page(self, query, page_index):
+        params = urlencode({"q": query, "start": page_index * self.page_size})
+        driver = self.get_driver()
+        self.readiness.load(driver, f"https://www.google.com/search?{params}", selector="div.g")
+        results = []
+        for element in driver.find_elements(By.CSS_SELECTOR, "div.g"):
+            try:
+                link_elem = element.find_element(By.CSS_SELECTOR, "a")
+                title_elem = element.find_element(By.CSS_SELECTOR, "h3")
+                snippets = element.find_elements(By.CSS_SELECTOR, "div.VwiC3b")
+                results.append({
+                    "url": link_elem.get_attribute("href"),
+                    "title": title_elem.text,
+                    "snippet": snippets[0].text if snippets else "",
+                })
+            except Exception as e:
+                logger.error(f"Error extracting result: {str(e)}")
+        return results
+
+
+class _DuckDuckGoParser(HTMLParser):
+    """Collects result links, titles and snippets from the DuckDuckGo HTML results page"""
+
+    def __init__(self):
+        super().__init__()
+        self.results = []
+        self._field = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "a" and "result__a" in classes:
+            self.results.append({"url": self._target(attrs.get("href") or ""), "title": "", "snippet": ""})
+            self._field = "title"
+        elif "result__snippet" in classes and self.results:
+            self._field = "snippet"
+
+    def handle_endtag(self, tag):
+        if tag in ("a", "div", "td"):
+            self._field = None
+
+    def handle_data(self, data):
+        if self._field and self.results:
+            self.results[-1][self._field] += data
+
+    @staticmethod
+    def _target(href):
+        """Unwrap DuckDuckGo's redirect links to the result URL"""
+        if href.startswith("//"):
+            href = "https:" + href
+        parts = urlsplit(href)
+        if parts.netloc.endswith("duckduckgo.com") and parts.path == "/l/":
+            return parse_qs(parts.query).get("uddg", [""])[0]
+        return href
+
+
+class DuckDuckGoProvider:
+    """DuckDuckGo's HTML results, fetched over plain HTTP without a browser"""
+
+    name = "duckduckgo"
+    page_size = 30
+
+    def __init__(self, http, endpoint=SEARCH_DUCKDUCKGO_URL, async_http=None):
+        self.http = http
+        self.endpoint = endpoint
+        # AsyncHttpFetcher used by apage
+        self.async_http = async_http
+
+    def page(self, query, page_index):
+        return self._results(self.http.get(self._url(query, page_index)))
+
+    async def apage(self, query, page_index):
+        if self.async_http is None:
+            return await asyncio.to_thread(self.page, query, page_index)
+        return self._results(await self.async_http.get(self._url(query, page_index)))
+
+    def _url(self, query, page_index):
+        params = {"q": query}
+        if page_index:
+            params.update({"s": page_index * self.page_size, "dc": page_index * self.page_size + 1})
+        return f"{self.endpoint}?{urlencode(params)}"
+
+    def _results(self, response):
+        if response is None or response.status_code != 200:
+            return []
+        parser = _DuckDuckGoParser()
+        parser.feed(response.text)
+        parser.close()
+        # Ads link through duckduckgo.com/y.js and unwrap to nothing
+        return [
+            {**result, "title": " ".join(result["title"].split()), "snippet": " ".join(result["snippet"].split())}
+            for result in parser.results if result["url"].startswith("http")
+        ]
+
+
+class FixtureProvider:
+    """Canned results for tests and offline runs, served in pages like a real engine"""
+
+    name = "fixture"
+
+    def __init__(self, fixtures=None, path=SEARCH_FIXTURES, page_size=10):
+        if fixtures is None:
+            with open(path, encoding="utf-8") as f:
+                fixtures = json.load(f)
+        # A bare list answers every query
+        self.fixtures = {"*": fixtures} if isinstance(fixtures, list) else fixtures
+        self.page_size = page_size
+
+    def page(self, query, page_index):
+        results = self.fixtures.get(query, self.fixtures.get(query.lower(), self.fixtures.get("*", [])))
+        start = page_index * self.page_size
+        return [dict(result) for result in results[start:start + self.page_size]]
+
+
+def build_providers(names=None, get_driver=None, readiness=None, http=None, async_http=None, browser=None,
+                    browser_lock=None, release=None):
+    """Providers by name, in order; names that cannot be built here are skipped with a warning"""
+    providers = []
+    for name in names or SEARCH_PROVIDERS:
+        if name == "google" and get_driver is not None and readiness is not None:
+            providers.append(GoogleProvider(get_driver, readiness, browser=browser, browser_lock=browser_lock,
+                                             release=release))
+        elif name == "duckduckgo" and http is not None:
+            providers.append(DuckDuckGoProvider(http, async_http=async_http))
+        elif name == "fixture" and SEARCH_FIXTURES:
+            providers.append(FixtureProvider())
+        else:
+            logger.warning(f"Search provider '{name}' is not available")
+    return providers
+
+
+class SearchHarvester:
+    """Pages through search providers, yielding each new, non-blacklisted domain once.
+
+    Results are produced lazily, so later pages (and later providers) are only
+    requested while the caller still needs more candidates.
+    """
+
+    def __init__(self, providers, max_pages=SEARCH_MAX_PAGES, blacklist=BLACKLISTED_DOMAINS):
+        self.providers = providers
+        self.max_pages = max_pages
+        self.blacklist = blacklist
+        self._lock = threading.Lock()
+        self._stats = {"searches": 0, "pages": 0, "results": 0, "duplicates": 0, "blacklisted": 0,
+                       "rejected": 0, "yielded": 0, "errors": 0}
+
+    def harvest(self, query, accept=None):
+        """Yield result dicts for ``query``; ``accept(result)`` may return None to skip a result"""
+        self._count("searches")
+        seen = set()
+        for provider in self.providers:
+            for page_index in range(self.max_pages):
+                try:
+                    with get_default_metrics().span("search_page", provider=provider.name):
+                        results = provider.page(query, page_index)
+                except Exception as e:
+                    self._count("errors")
+                    logger.error(f"Error searching {provider.name} (page {page_index + 1}): {str(e)}")
+                    break
+                self._count("pages")
+                if not results:
+                    break
+                yield from self._accepted(provider, page_index, results, seen, accept)
+
+    async def aharvest(self, query, accept=None):
+        """``harvest`` for coroutines; providers without ``apage`` run on a thread, as does ``accept``"""
+        self._count("searches")
+        seen = set()
+        for provider in self.providers:
+            for page_index in range(self.max_pages):
+                try:
+                    with get_default_metrics().span("search_page", provider=provider.name):
+                        if hasattr(provider, "apage"):
+                            results = await provider.apage(query, page_index)
+                        else:
+                            results = await asyncio.to_thread(provider.page, query, page_index)
+                except Exception as e:
+                    self._count("errors")
+                    logger.error(f"Error searching {provider.name} (page {page_index + 1}): {str(e)}")
+                    break
+                self._count("pages")
+                if not results:
+                    break
+                for result in self._candidates(provider, page_index, results, seen):
+                    # accept may look results up in the lead store
+                    result = await asyncio.to_thread(self._accept, result, accept) if accept else self._accept(result)
+                    if result is not None:
+                        yield result
+
+    def _accepted(self, provider, page_index, results, seen, accept):
+        """New, non-blacklisted results of one page that ``accept`` lets through"""
+        for result in self._candidates(provider, page_index, results, seen):
+            result = self._accept(result, accept)
+            if result is not None:
+                yield result
+
+    def _candidates(self, provider, page_index, results, seen):
+        """New, non-blacklisted results of one page, annotated with where they were found"""
+        for rank, result in enumerate(results):
+            self._count("results")
+            domain = normalize_domain(result.get("url"))
+            if not domain or domain in seen:
+                self._count("duplicates")
+                continue
+            seen.add(domain)
+            # Blacklisted sites are dropped before any truncation, so they never cost a slot
+            if is_blacklisted(result["url"], self.blacklist):
+                self._count("blacklisted")
+                continue
+            yield dict(result, provider=provider.name, page=page_index + 1, rank=rank + 1)
+
+    def _accept(self, result, accept=None):
+        """``result`` as ``accept`` returns it, or None when rejected"""
+        if accept is not None:
+            result = accept(result)
+            if result is None:
+                self._count("rejected")
+                return None
+        self._count("yielded")
+        return result
+
+    def search(self, query, limit=SEARCH_RESULTS, accept=None):
+        """The first ``limit`` accepted results"""
+        return list(islice(self.harvest(query, accept), limit))
+
+    async def asearch(self, query, limit=SEARCH_RESULTS, accept=None):
+        """The first ``limit`` accepted results, without requesting pages that are not needed"""
+        results = []
+        if limit is not None and limit <= 0:
+            return results
+        async with aclosing(self.aharvest(query, accept)) as harvested:
+            async for result in harvested:
+                results.append(result)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
@@ -0,0 +1,57 @@
+import functools
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Modules live at the repository root, as the app and benchmarks import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time(): tests move time forward by adding seconds to ``clock[0]``"""
+    now = [1_000_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+@functools.lru_cache(maxsize=None)
+def _function_calling_llm_class():
+    # crewai is imported on first use, after the test modules set their telemetry defaults
+    from crewai import BaseLLM
+    from pydantic import Field
+
+    class FunctionCallingLLM(BaseLLM):
+        """Native tool-calling model: asks for the first tool offered, then answers once it has the result"""
+
+        calls: list = Field(default_factory=list)
+        latency: float = 0.0
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+            # Copies made per call share this list, so it counts every call that reached the model
+            self.calls.append(messages)
+            time.sleep(self.latency)
+            if tools and not any(message.get("role") == "tool" for message in messages):
+                name = tools[0]["function"]["name"]
+                return [{"id": "call_1", "type": "function",
+                         "function": {"name": name, "arguments": json.dumps({"query": "london"})}}]
+            prompt = str(messages[-1]["content"])
+            self._track_token_usage_internal({"prompt_tokens": len(prompt), "completion_tokens": 7})
+            return "Influencer marketing agencies in London"
+
+        def supports_function_calling(self):
+            return True
+
+        def get_context_window_size(self):
+            return 128000
+
+    return FunctionCallingLLM
+
+
+@pytest.fixture
+def function_calling_llm():
+    """The fake native tool-calling model class; subclass it to change what the model answers"""
+    return _function_calling_llm_class()
@@ -0,0 +1,48 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from contact_probe import ContactProber
+
+
+class FakeHttp:
+    def head(self, url):
+        return SimpleNamespace(status_code=404 if url.endswith("/connect") else 200)
+
+
+def homepage(url):
+    return SimpleNamespace(url=url, links=[])
+
+
+def test_probing_stops_without_waiting_for_pages_still_loading():
+    prober = ContactProber(FakeHttp(), max_workers=3, required_fields=["emails", "phones"])
+    release = threading.Event()
+    visited = []
+
+    def visit(page_url):
+        visited.append(page_url)
+        if page_url.endswith("/contact"):
+            return {"emails": ["hi@agency.example"], "phones": ["0161 496 0789"]}
+        release.wait(5)
+        return None
+
+    started = time.perf_counter()
+    contact_info = prober.probe("https://agency.example", homepage("https://agency.example/"), visit)
+    elapsed = time.perf_counter() - started
+    release.set()
+
+    assert elapsed < 1
+    assert contact_info["emails"] == ["hi@agency.example"]
+    assert "https://agency.example/connect" not in visited
+    stats = prober.stats()
+    assert (stats["pages_loaded"], stats["early_exits"], stats["head_missing"]) == (1, 1, 1)
+    # Pages not started when the prober stopped are never loaded
+    assert stats["pages_skipped"] >= 1
+
+
+def test_probing_waits_for_every_page_when_fields_stay_missing():
+    prober = ContactProber(FakeHttp(), max_workers=2, required_fields=["emails"])
+    contact_info = prober.probe("https://agency.example", homepage("https://agency.example"),
+                                lambda page_url: {"phones": [page_url]})
+    assert len(contact_info["phones"]) == 5
+    assert prober.stats()["pages_loaded"] == 5
@@ -0,0 +1,88 @@
+import csv
+import os
+
+import pytest
+
+from csv_stream import StreamingCsvWriter, merge_rows
+
+FIELDS = ["URL", "Company Name", "Email", "Score"]
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_rows_are_on_disk_before_finalize(tmp_path):
+    path = str(tmp_path / "leads.csv")
+    writer = StreamingCsvWriter(path, FIELDS)
+    writer.write({"URL": "https://a.example", "Company Name": "A"})
+
+    assert not os.path.exists(path)
+    assert read_csv(path + ".part") == [{"URL": "https://a.example", "Company Name": "A", "Email": "", "Score": ""}]
+    assert writer.rows()[0]["Company Name"] == "A"
+
+
+def test_finalize_merges_rows_per_key_and_removes_part_file(tmp_path):
+    path = str(tmp_path / "leads.csv")
+    writer = StreamingCsvWriter(path, FIELDS, key_func=lambda url: url.rstrip("/").lower())
+    writer.write({"URL": "https://a.example", "Company Name": "A"})
+    writer.write({"URL": "https://b.example", "Company Name": "B"})
+    writer.write({"URL": "https://A.example/", "Email": "hi@a.example", "Score": "8"})
+
+    assert writer.prospect_count == 2
+    assert writer.finalize() is True
+    assert not os.path.exists(path + ".part")
+    assert read_csv(path) == [
+        {"URL": "https://A.example/", "Company Name": "A", "Email": "hi@a.example", "Score": "8"},
+        {"URL": "https://b.example", "Company Name": "B", "Email": "", "Score": ""},
+    ]
+    assert writer.finalize() is True
+
+
+def test_rows_left_by_a_crashed_run_are_recovered(tmp_path):
+    path = str(tmp_path / "leads.csv")
+    crashed = StreamingCsvWriter(path, FIELDS)
+    crashed.write({"URL": "https://a.example", "Company Name": "A"})
+    crashed.close()  # the process dies before finalize
+
+    resumed = StreamingCsvWriter(path, FIELDS)
+    assert [row["URL"] for row in resumed.rows()] == ["https://a.example"]
+    resumed.write({"URL": "https://b.example", "Company Name": "B"})
+    resumed.finalize()
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read().count("URL,Company Name") == 1
+    assert [row["URL"] for row in read_csv(path)] == ["https://a.example", "https://b.example"]
+
+
+def test_finalize_without_rows_writes_nothing(tmp_path):
+    path = str(tmp_path / "leads.csv")
+
+    assert StreamingCsvWriter(path, FIELDS).finalize() is False
+    assert not os.path.exists(path)
+
+
+def test_writes_after_finalize_are_refused(tmp_path):
+    writer = StreamingCsvWriter(str(tmp_path / "leads.csv"), FIELDS)
+    writer.write({"URL": "https://a.example"})
+    writer.finalize()
+
+    with pytest.raises(ValueError):
+        writer.write({"URL": "https://b.example"})
+
+
+def test_defaults_and_row_callback(tmp_path):
+    seen = []
+    writer = StreamingCsvWriter(str(tmp_path / "leads.csv"), FIELDS, defaults={"Score": "0"},
+                                on_row=lambda row, count: seen.append((row["URL"], row["Score"], count)))
+    writer.write({"URL": "https://a.example", "Score": ""})
+    writer.write({"URL": "https://b.example", "Score": "7"})
+
+    assert seen == [("https://a.example", "0", 1), ("https://b.example", "7", 2)]
+
+
+def test_merge_keeps_unkeyed_rows_last():
+    rows = [{"URL": "", "Company Name": "Orphan"}, {"URL": "https://a.example", "Company Name": "A"}]
+
+    assert [row["Company Name"] for row in merge_rows(rows, "URL", FIELDS)] == ["A", "Orphan"]
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from driver_pool import DriverPool, PoolTimeout
+
+
+class FakeDriver:
+    """Stands in for a Chrome WebDriver: counts resets and can be made to crash"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.crashed = False
+        self.quit_calls = 0
+        self.loaded = []
+
+    def execute_script(self, script):
+        time.sleep(self.delay)
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        return {}
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.loaded.append(url)
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def make_pool(delay=0.0, **kwargs):
+    created = []
+
+    def factory():
+        driver = FakeDriver(delay)
+        created.append(driver)
+        return driver
+
+    kwargs.setdefault("min_size", 0)
+    kwargs.setdefault("max_size", 2)
+    kwargs.setdefault("acquire_timeout", 0.2)
+    return DriverPool(driver_factory=factory, **kwargs), created
+
+
+def test_released_driver_is_reused():
+    pool, created = make_pool()
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert len(created) == 1
+    assert created[0].loaded[-1] == "about:blank"
+    assert pool.stats()["acquired"] == 2
+
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    pool, _ = make_pool(max_size=1)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_worn_out_driver_is_recycled():
+    pool, created = make_pool(max_page_loads=2)
+    pooled = pool.acquire()
+    pooled.get("https://example.com/a")
+    pooled.get("https://example.com/b")
+    pool.release(pooled)
+
+    stats = pool.stats()
+    assert stats["recycled"] == 1
+    assert stats["size"] == 0
+    assert created[0].quit_calls == 1
+    assert pool.acquire()._driver is created[1]
+
+
+def test_crashed_driver_is_discarded():
+    pool, created = make_pool()
+    pooled = pool.acquire()
+    created[0].crashed = True
+    pool.release(pooled)
+
+    assert pool.stats()["discarded"] == 1
+    assert pool.acquire()._driver is created[1]
+
+
+def test_concurrent_double_release_returns_driver_once():
+    # Slow health checks widen the window between two releases of the same driver
+    pool, _ = make_pool(delay=0.01, max_size=1)
+    pooled = pool.acquire()
+    barrier = threading.Barrier(8)
+
+    def release():
+        barrier.wait()
+        pool.release(pooled)
+
+    threads = [threading.Thread(target=release) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert stats["released"] == 1
+    assert stats["idle"] == 1
+    assert stats["size"] == 1
+
+
+def test_context_manager_returns_driver_on_error():
+    pool, _ = make_pool(max_size=1)
+    with pytest.raises(ValueError):
+        with pool.driver():
+            raise ValueError("extraction failed")
+
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["idle"] == 1
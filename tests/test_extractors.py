@@ -0,0 +1,95 @@
+import random
+import re
+
+import pytest
+
+from extractors import EMAIL_DOMAIN_MAX, EMAIL_PATTERN, EMAIL_PLACEHOLDERS, ContactExtractor, KeywordMatcher
+
+
+@pytest.fixture
+def uk():
+    return ContactExtractor(["uk"])
+
+
+def emails(extractor, text):
+    return extractor.scan(text)[0]
+
+
+def test_finds_emails_in_order(uk):
+    text = "Write to hello@northlight.co.uk or talent@paradesocial.com (press: press@brightside.agency)."
+    assert emails(uk, text) == ["hello@northlight.co.uk", "talent@paradesocial.com", "press@brightside.agency"]
+
+
+def test_placeholder_emails_are_dropped(uk):
+    assert emails(uk, "you@example.com, name@domain.com, email@agency.com, real@agency.com") == ["real@agency.com"]
+
+
+@pytest.mark.parametrize("gap", [EMAIL_DOMAIN_MAX - 30, EMAIL_DOMAIN_MAX - 22, EMAIL_DOMAIN_MAX - 20])
+def test_an_email_crossing_an_earlier_windows_end_is_matched_in_full(uk, gap):
+    text = "Follow us @agency" + " " * gap + "bob@agency.com.au"
+    assert emails(uk, text) == ["bob@agency.com.au"]
+
+
+def test_the_tail_of_an_over_long_token_is_not_an_email(uk):
+    assert emails(uk, "x" * 100 + "@agency.com") == []
+
+
+def test_an_email_right_after_another_match_is_kept(uk):
+    assert emails(uk, "x@y.iofirst.last+tag@sub.agency.com") == ["x@y.iofirst.last", "+tag@sub.agency.com"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("jane [at] agency [dot] co [dot] uk", "jane@agency.co.uk"),
+    ("jane (at) agency.com", "jane@agency.com"),
+    ("jane{at}agency{dot}com", "jane@agency.com"),
+    ("Email jane at agency dot co dot uk today", "jane@agency.co.uk"),
+])
+def test_obfuscated_emails_are_decoded(uk, text, expected):
+    assert emails(uk, text) == [expected]
+
+
+def test_words_around_dot_are_not_emails(uk):
+    assert emails(uk, "Look at our work, dot by dot, and at the dots we connected") == []
+
+
+def test_matches_the_plain_pattern_on_random_text(uk):
+    rng = random.Random(7)
+    tokens = ["hello", "@", "@team", "agency.co.uk", "a.b", "x@y.io", ".", "-", "   ", " " * 230, "\n",
+              "mail@studio.london", "first.last+tag@sub.agency.com", "@@", "co", "uk"]
+    for _ in range(300):
+        text = "".join(rng.choice(tokens) + rng.choice(["", " "]) for _ in range(rng.randint(1, 80)))
+        if re.search(r'[a-zA-Z0-9._%+-]{65,}@', text):
+            continue  # over-long local parts are skipped on purpose
+        expected = [e for e in re.findall(EMAIL_PATTERN, text) if not any(x in e.lower() for x in EMAIL_PLACEHOLDERS)]
+        assert uk._find_emails(text) == re.findall(EMAIL_PATTERN, text)
+        assert emails(uk, text)[:len(expected)] == expected
+
+
+@pytest.mark.parametrize("countries, text, expected", [
+    (["uk"], "Call 0161 496 0789 or +44 20 7946 0123", ["0161 496 0789", "+44 20 7946 0123"]),
+    (["us"], "Call (212) 555-0187 today", ["(212) 555-0187"]),
+    (["ie"], "Call +353 1 555 0142", ["+353 1 555 0142"]),
+    (["uk", "us"], "US (212) 555-0187, UK 0117 496 0312", ["(212) 555-0187", "0117 496 0312"]),
+])
+def test_phones_follow_the_configured_countries(countries, text, expected):
+    assert ContactExtractor(countries).scan(text)[1] == expected
+
+
+def test_postcodes(uk):
+    assert uk.has_postcode("8 Stevenson Square, Manchester M1 1FB")
+    assert not uk.has_postcode("Suite 4, Manchester")
+    assert ContactExtractor(["de"]).has_postcode("Torstraße 1, 10119 Berlin")
+
+
+def test_unknown_country_is_rejected():
+    with pytest.raises(ValueError):
+        ContactExtractor(["xx"])
+
+
+def test_keyword_matcher_groups_and_stops_early():
+    matcher = KeywordMatcher({"ai": ["machine learning", "AI-powered"], "enterprise": ["enterprise", "Fortune 500"]})
+    text = "AI-powered campaigns for ENTERPRISE brands and Fortune 500 clients"
+    assert matcher.scan(text, stop_when_all_found=False) == {"ai": {"ai-powered"},
+                                                             "enterprise": {"enterprise", "fortune 500"}}
+    assert matcher.matches(text) == {"ai", "enterprise"}
+    assert matcher.matches("We build websites") == set()
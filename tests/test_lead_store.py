@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import lead_store
+from lead_store import DAY, FRESH, NEW, STALE, DomainClaims, LeadStore, normalize_domain
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return LeadStore(path=str(tmp_path / "leads.sqlite3"), fresh_days=30, max_age_days=365)
+
+
+def test_domains_are_normalized():
+    assert normalize_domain("https://WWW.Agency.co.uk:8443/contact?x=1") == "agency.co.uk"
+    assert normalize_domain("agency.co.uk/about") == "agency.co.uk"
+    assert normalize_domain("") == ""
+
+
+def test_unknown_prospect_is_new(store):
+    assert store.classify("https://agency.example") == (NEW, None)
+
+
+def test_lead_is_fresh_then_stale_then_new_again(store, clock):
+    store.upsert("https://agency.example", {"URL": "https://agency.example", "Company Name": "Agency"})
+
+    state, lead = store.classify("https://www.agency.example/about")
+    assert state == FRESH and lead.row["Company Name"] == "Agency"
+
+    clock[0] += 31 * DAY
+    assert store.classify("https://agency.example")[0] == STALE
+
+    clock[0] += 365 * DAY
+    assert store.classify("https://agency.example")[0] == NEW
+    stats = store.stats()
+    assert (stats["fresh"], stats["stale"], stats["new"]) == (1, 1, 1)
+
+
+def test_stale_lead_is_merged_but_expired_lead_is_replaced(store, clock):
+    store.upsert("https://agency.example", {"Company Name": "Agency", "Email": "hi@agency.example"}, job_id="j1")
+
+    clock[0] += 60 * DAY
+    lead = store.upsert("https://agency.example", {"Phone": "020 7946 0000", "Email": ""}, job_id="j2")
+    assert lead.row == {"Company Name": "Agency", "Email": "hi@agency.example", "Phone": "020 7946 0000"}
+    assert lead.times_seen == 2
+    assert store.classify("https://agency.example")[0] == FRESH
+
+    clock[0] += 400 * DAY
+    lead = store.upsert("https://agency.example", {"Company Name": "Agency Ltd"}, job_id="j3")
+    assert lead.row == {"Company Name": "Agency Ltd"}
+
+
+def test_same_job_does_not_count_twice(store):
+    store.upsert("https://agency.example", {"Company Name": "Agency"}, job_id="j1")
+
+    assert store.upsert("https://agency.example", {"Email": "hi@agency.example"}, job_id="j1").times_seen == 1
+
+
+def test_company_is_recognised_by_contacts_under_another_domain(store):
+    store.upsert("https://agency.example", {"Email": "Hello@Agency.example", "Phone": "+44 20 7946 0000"})
+
+    assert store.find_by_contacts(emails=["hello@agency.example"], exclude_domain="agency.co").domain == "agency.example"
+    assert store.find_by_contacts(phones=["+44 (20) 7946-0000"], exclude_domain="agency.co").domain == "agency.example"
+    assert store.find_by_contacts(emails=["hello@agency.example"], exclude_domain="agency.example") is None
+
+
+def test_each_domain_is_claimed_by_one_job():
+    claims = DomainClaims()
+    winners = []
+    barrier = threading.Barrier(6)
+
+    def claim(job_id):
+        barrier.wait()
+        if claims.claim("https://www.agency.example/contact", job_id):
+            winners.append(job_id)
+
+    threads = [threading.Thread(target=claim, args=(f"job-{i}",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(winners) == 1
+    assert claims.claim("https://agency.example", winners[0])
+    assert claims.claimed_by_other("https://agency.example", "someone-else")
+    assert len(claims) == 1
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Agent, Crew, Task
+from crewai.tools import tool
+
+from llm_cache import TOOL_CALLS, CachedLLM, ResponseCache, UsageTracker, cache_key, encode_tool_calls
+
+
+@tool("Search URLs")
+def search_urls(query: str) -> str:
+    """Search the web and return matching agency URLs"""
+    return "https://agency.example"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / "llm.sqlite3"))
+
+
+def wrap(inner, cache, tracker=None, agent=None):
+    return CachedLLM(model="gpt-4o-mini", inner=inner, cache=cache, tracker=tracker or UsageTracker(),
+                     job_id="job", agent_label=agent)
+
+
+def run_query_analyzer(llm):
+    analyzer = Agent(role="Query Analyzer", goal="Understand the search query", backstory="Researcher",
+                     tools=[search_urls], llm=llm)
+    task = Task(description="Analyze the query: influencer agencies in London", expected_output="Search keywords",
+                agent=analyzer)
+    return Crew(agents=[analyzer], tasks=[task]).kickoff().raw
+
+
+def test_tool_schemas_are_part_of_the_key():
+    messages = [{"role": "user", "content": "hi"}]
+    schema = [{"type": "function", "function": {"name": "search_urls", "parameters": {}}}]
+
+    assert cache_key("m", messages) == cache_key("m", messages, tools=None)
+    assert cache_key("m", messages) != cache_key("m", messages, tools=schema)
+
+
+def test_repeated_crew_run_with_function_calling_is_served_from_cache(cache, function_calling_llm):
+    inner = function_calling_llm(model="gpt-4o-mini")
+
+    first = run_query_analyzer(wrap(inner, cache))
+    model_calls = len(inner.calls)
+    assert model_calls == 2  # a tool call, then the answer
+    assert cache.stats()["stores"] == 2
+
+    tracker = UsageTracker()
+    assert run_query_analyzer(wrap(inner, cache, tracker)) == first
+    assert len(inner.calls) == model_calls
+    assert tracker.for_job("job")["agents"]["Query Analyzer"]["cache_hits"] == 2
+
+
+def test_tool_calls_round_trip_through_the_cache(cache):
+    class Function:
+        name = "search_urls"
+        arguments = {"query": "agencies"}
+
+    class ToolCall:
+        id = "call_9"
+        function = Function()
+
+    encoded = encode_tool_calls([ToolCall()])
+    cache.put("key", "gpt-4o-mini", encoded, 10, 2, kind=TOOL_CALLS)
+
+    assert cache.get("key").response == [
+        {"id": "call_9", "type": "function", "function": {"name": "search_urls", "arguments": '{"query": "agencies"}'}}
+    ]
+    assert encode_tool_calls("plain answer") is None
+    assert encode_tool_calls([object()]) is None
+
+
+def test_calls_that_run_functions_are_not_cached(cache, function_calling_llm):
+    inner = function_calling_llm(model="gpt-4o-mini")
+    llm = wrap(inner, cache)
+    messages = [{"role": "user", "content": "Find agencies"}]
+
+    llm.call(messages, available_functions={"search_urls": lambda query: ""})
+    llm.call(messages, available_functions={"search_urls": lambda query: ""})
+
+    assert len(inner.calls) == 2
+    assert cache.stats()["stores"] == 0
+
+
+def test_concurrent_calls_keep_their_own_token_counts(cache, function_calling_llm):
+    inner = function_calling_llm(model="gpt-4o-mini", latency=0.02)
+    tracker = UsageTracker()
+    llm = wrap(inner, None, tracker, agent="Lead Scorer")
+    prompts = [f"Score batch {i}: " + "x" * (10 * i) for i in range(12)]
+
+    threads = [threading.Thread(target=llm.call, args=([{"role": "user", "content": p}],)) for p in prompts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    usage = tracker.for_job("job")["agents"]["Lead Scorer"]
+    assert usage["calls"] == len(prompts)
+    assert usage["prompt_tokens"] == sum(len(p) for p in prompts)
+    assert usage["completion_tokens"] == 7 * len(prompts)
+    assert inner.stop == []
+
+
+def test_stop_words_reach_the_model_without_changing_it(cache, function_calling_llm):
+    seen = []
+
+    class StopRecorder(function_calling_llm):
+        def call(self, messages, **kwargs):
+            seen.append(self.stop_sequences)
+            return "ok"
+
+    inner = StopRecorder(model="gpt-4o-mini")
+    llm = wrap(inner, None)
+    llm.stop = ["Observation:"]
+    llm.call("hello")
+
+    assert seen == [["Observation:"]]
+    assert inner.stop == []
+
+
+def test_cache_written_before_tool_calls_is_upgraded(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+        "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, size INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO responses VALUES ('old', 'm', 'cached answer', 1, 1, 13, ?, ?)",
+                 (time.time(), time.time()))
+    conn.commit()
+    conn.close()
+
+    assert ResponseCache(path=path).get("old").response == "cached answer"
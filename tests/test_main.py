@@ -0,0 +1,44 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+# main checks for a key at import; these tests never call the model
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import main
+
+
+def test_async_crews_run_on_their_own_bounded_threads(monkeypatch):
+    monkeypatch.setattr(main, "CREW_JOB_CONCURRENCY", 2)
+    monkeypatch.setattr(main, "_crew_executor", None)
+    running, peak, threads = [0], [0], set()
+    lock = threading.Lock()
+
+    def run_pipeline(*args):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return args[1]
+
+    monkeypatch.setattr(main, "run_pipeline", run_pipeline)
+
+    async def run_jobs():
+        return await asyncio.gather(*(main.arun_pipeline(None, f"query {i}", 1, "out.csv", mode=main.CREW_MODE)
+                                      for i in range(6)))
+
+    try:
+        assert asyncio.run(run_jobs()) == [f"query {i}" for i in range(6)]
+    finally:
+        main.get_crew_executor().shutdown()
+    assert peak[0] == 2
+    assert threads and all(name.startswith("crew-job") for name in threads)
@@ -0,0 +1,161 @@
+import time
+
+import pytest
+
+import page_cache
+from page_cache import PageCache, normalize_cache_key
+from http_fetcher import PageSnapshot, TieredFetcher
+
+# Long enough that the static page is served over HTTP rather than escalated to Chrome
+PAGE_TEXT = "We run influencer campaigns for consumer brands across the United Kingdom. " * 10
+
+
+def page_html(title):
+    return f"<html><body><h1>{title}</h1><p>{PAGE_TEXT}</p></body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return PageCache(path=str(tmp_path / "pages.sqlite3"), ttl=60, max_bytes=10 ** 6)
+
+
+def test_normalized_urls_share_an_entry(cache):
+    cache.put("https://Example.com:443/about/?b=2&a=1#team", page_html("About"))
+
+    assert normalize_cache_key("https://Example.com:443/about/?b=2&a=1#team") == "https://example.com/about?a=1&b=2"
+    assert cache.get("https://example.com/about?a=1&b=2").html == page_html("About")
+
+
+def test_entries_go_stale_after_ttl(cache, clock):
+    cache.put("https://example.com/", page_html("Home"))
+    assert cache.get("https://example.com/").is_fresh(cache.ttl)
+
+    clock[0] += 61
+    page = cache.get("https://example.com/")
+    assert page is not None and not page.is_fresh(cache.ttl)
+
+    cache.touch("https://example.com/")
+    assert cache.get("https://example.com/").is_fresh(cache.ttl)
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale"], stats["revalidated"]) == (2, 1, 1)
+
+
+def test_validators_come_from_stored_headers(cache):
+    cache.put("https://example.com/", page_html("Home"), tier="http", etag='"v1"',
+              last_modified="Wed, 01 Jan 2025 00:00:00 GMT")
+    cache.put("https://example.com/plain", page_html("Plain"))
+
+    assert cache.get("https://example.com/").validators == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT",
+    }
+    assert cache.get("https://example.com/plain").validators == {}
+
+
+def test_uncacheable_statuses_are_ignored(cache):
+    cache.put("https://example.com/busy", "Too many requests", status=429)
+    cache.put("https://example.com/gone", "Not found", status=404)
+
+    assert cache.get("https://example.com/busy") is None
+    assert cache.get("https://example.com/gone").status == 404
+
+
+def test_identical_bodies_are_stored_once(cache):
+    cache.put("https://example.com/a", page_html("Same"))
+    cache.put("https://example.com/b", page_html("Same"))
+    conn = cache._connect()
+
+    assert conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0] == 1
+    assert cache.stats()["pages"] == 2
+
+
+def stored_bytes(cache):
+    return cache._connect().execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()[0]
+
+
+def test_replaced_bodies_are_dropped_unless_another_page_shares_them(cache):
+    cache.put("https://example.com/a", page_html("Same"))
+    cache.put("https://example.com/b", page_html("Same"))
+    cache.put("https://example.com/a", page_html("New"))
+    conn = cache._connect()
+    assert conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0] == 2
+
+    cache.put("https://example.com/b", page_html("New"))
+    assert conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0] == 1
+    assert cache.get("https://example.com/a").html == cache.get("https://example.com/b").html == page_html("New")
+    assert cache.stats()["bytes"] == stored_bytes(cache)
+
+
+def test_byte_total_is_added_to_an_existing_cache(tmp_path):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageCache(path=path)
+    cache.put("https://example.com/a", page_html("A"))
+    cache.put("https://example.com/b", page_html("B"))
+    # A cache file written before the totals table existed
+    conn = cache._connect()
+    conn.executescript("DROP TRIGGER contents_added; DROP TRIGGER contents_removed; DROP TABLE totals;")
+
+    reopened = PageCache(path=path)
+    assert reopened.stats()["bytes"] == stored_bytes(reopened) > 0
+    reopened.put("https://example.com/c", page_html("C"))
+    assert reopened.stats()["bytes"] == stored_bytes(reopened)
+    reopened.clear()
+    assert reopened.stats()["bytes"] == 0
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path, clock):
+    bodies = {name: page_html(name) + f"<!-- {name * 400} -->" for name in "abc"}
+    sizes = [len(page_cache.zlib.compress(body.encode("utf-8"))) for body in bodies.values()]
+    # Room for any two pages once trimmed to the eviction target, but not for three
+    max_bytes = int(max(sizes) * 2 / page_cache.EVICT_TARGET_RATIO) + 1
+    assert sum(sizes) > max_bytes
+    cache = PageCache(path=str(tmp_path / "pages.sqlite3"), ttl=60, max_bytes=max_bytes)
+
+    cache.put("https://example.com/a", bodies["a"])
+    clock[0] += 1
+    cache.put("https://example.com/b", bodies["b"])
+    clock[0] += 1
+    cache.get("https://example.com/a")  # a is now more recently used than b
+    clock[0] += 1
+    cache.put("https://example.com/c", bodies["c"])
+
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a") is not None
+    assert cache.get("https://example.com/c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == stored_bytes(cache) <= cache.max_bytes
+
+
+class FakeHttp:
+    """Answers fetches with canned snapshots and records the conditional headers sent"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def fetch(self, url, headers=None):
+        self.requests.append((url, headers))
+        return self.answers.pop(0)
+
+
+def test_stale_page_is_revalidated_with_a_conditional_request(cache, clock):
+    html = page_html("Home")
+    http = FakeHttp(
+        PageSnapshot("https://example.com/", html=html, text=PAGE_TEXT, headers={"ETag": '"v1"'}, tier="http"),
+        PageSnapshot("https://example.com/", status=304, tier="http"),
+    )
+    fetcher = TieredFetcher(http=http, cache=cache)
+
+    def no_browser():
+        raise AssertionError("static pages must not be rendered")
+
+    assert fetcher.load("https://example.com/", no_browser, readiness=None).tier == "http"
+    assert fetcher.load("https://example.com/", no_browser, readiness=None).html == html
+    assert len(http.requests) == 1
+
+    clock[0] += 61
+    snapshot = fetcher.load("https://example.com/", no_browser, readiness=None)
+    assert snapshot.html == html
+    assert http.requests[-1] == ("https://example.com/", {"If-None-Match": '"v1"'})
+    assert cache.get("https://example.com/").is_fresh(cache.ttl)
+    assert fetcher.stats()["cache_served"] == 2
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+from politeness import PolitenessScheduler, host_key
+
+
+def scheduler(**kwargs):
+    kwargs.setdefault("robots", False)
+    return PolitenessScheduler(**kwargs)
+
+
+def hold_slots(politeness, url, count, hold):
+    """Run ``count`` requests to ``url`` at once, each holding its slot for ``hold`` seconds"""
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def request():
+        with politeness.slot(url):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(hold)
+            with lock:
+                in_flight[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return peak[0]
+
+
+def test_hosts_are_keyed_by_netloc():
+    assert host_key("https://Agency.example:8443/contact") == "agency.example:8443"
+    assert host_key("not a url") == ""
+
+
+def test_requests_to_one_host_are_capped():
+    politeness = scheduler(max_concurrency=2, min_interval=0)
+
+    assert hold_slots(politeness, "https://agency.example/", 6, 0.03) == 2
+    assert politeness.stats()["hosts"]["agency.example"]["requests"] == 6
+
+
+def test_request_starts_are_spaced_by_the_min_interval():
+    politeness = scheduler(max_concurrency=4, min_interval=0.05)
+    starts = []
+
+    for _ in range(3):
+        with politeness.slot("https://agency.example/"):
+            starts.append(time.monotonic())
+
+    assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_retry_after_backs_the_host_off_and_success_resets_it():
+    politeness = scheduler(min_interval=0)
+    politeness.record("https://agency.example/", 429, {"Retry-After": "0.1"})
+
+    assert politeness.stats()["hosts"]["agency.example"]["backoff_remaining"] > 0
+    started = time.monotonic()
+    with politeness.slot("https://agency.example/"):
+        assert time.monotonic() - started >= 0.09
+    politeness.record("https://agency.example/", 200)
+    assert politeness.stats()["hosts"]["agency.example"]["throttled"] == 1
+    # Other hosts are not held up by one host's backoff
+    politeness.record("https://slow.example/", 503, {"Retry-After": "30"})
+    started = time.monotonic()
+    with politeness.slot("https://agency.example/"):
+        assert time.monotonic() - started < 1
+
+
+def test_coroutines_share_the_host_limit_with_threads():
+    politeness = scheduler(max_concurrency=1, min_interval=0)
+    active = []
+
+    async def request():
+        async with politeness.aslot("https://agency.example/"):
+            # Slots held by threads and coroutines are counted together
+            active.append(politeness.stats()["hosts"]["agency.example"]["active"])
+            await asyncio.sleep(0.02)
+
+    async def main():
+        thread = threading.Thread(target=hold_slots, args=(politeness, "https://agency.example/", 2, 0.05))
+        thread.start()
+        await asyncio.gather(*(request() for _ in range(4)))
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(main())
+    assert active == [1, 1, 1, 1]
+    assert politeness.stats()["hosts"]["agency.example"]["requests"] == 6
@@ -0,0 +1,45 @@
+import asyncio
+
+from qualification import aqualify_prospects, qualify_prospects
+
+PAGES = {
+    "https://a.example": {"url": "https://a.example", "content": {"has_ai_mention": True},
+                          "contact_info": {"emails": ["hi@a.example"]}},
+    # extract_page_data returns None for a site it could not load
+    "https://down.example": None,
+}
+
+
+class FakeTools:
+    def extract_page_data(self, url):
+        return PAGES[url]
+
+    async def aextract_page_data(self, url):
+        return PAGES[url]
+
+    def cleanup(self):
+        pass
+
+    async def acleanup(self):
+        self.cleanup()
+
+
+def check(results, streamed):
+    assert results[0]["URL"] == "https://a.example"
+    assert (results[0]["AI Mentions"], results[0]["Email"]) == ("Yes", "hi@a.example")
+    assert set(results[1]) == {"URL", "Error"}
+    assert results[1]["URL"] == "https://down.example"
+    # Failed prospects are not streamed as negatives
+    assert [row["URL"] for row in streamed] == ["https://a.example"]
+
+
+def test_a_failed_extraction_is_an_error_row():
+    streamed = []
+    results = qualify_prospects(list(PAGES), FakeTools, max_workers=2, on_result=streamed.append)
+    check(results, streamed)
+
+
+def test_a_failed_extraction_is_an_error_row_in_async_code():
+    streamed = []
+    results = asyncio.run(aqualify_prospects(list(PAGES), FakeTools, max_workers=2, on_result=streamed.append))
+    check(results, streamed)
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Agent, Crew, Task
+from crewai.tools import tool
+
+from llm_cache import CachedLLM, UsageTracker
+from metrics import bind_job
+from replay import ReplayMiss, Tape, recorded
+
+
+def round_trip(tape, strict=False):
+    """Write a recording to its archive and load it back for replay"""
+    tape.close()
+    return Tape.player(tape.path, strict=strict)
+
+
+class Tools:
+    """Minimal stand-in for WebTools: recorded methods plus the side effects replay has to redo"""
+
+    def __init__(self, tape):
+        self.tape = tape
+        self.fetched = []
+        self.saved = []
+        self.collected = []
+
+    @recorded()
+    def get_website_content(self, url):
+        self.fetched.append(url)
+        return f"content of {url}"
+
+    @recorded(apply="_collect")
+    def qualify(self, urls):
+        return [{"URL": url, "Score": 7} for url in urls.split(",")]
+
+    @recorded(name="get_website_content")
+    async def aget_website_content(self, url):
+        self.fetched.append(url)
+        return f"content of {url}"
+
+    @recorded(live=True)
+    def save(self, rows):
+        self.saved.append(rows)
+        return "saved"
+
+    def _collect(self, rows):
+        self.collected.extend(rows)
+
+
+def test_tool_calls_replay_from_the_archive_without_running(tmp_path):
+    recorder = Tools(Tape.recorder(str(tmp_path / "job.jsonl.gz"), job_id="job"))
+    assert recorder.get_website_content("https://a.example") == "content of https://a.example"
+    recorder.qualify("https://a.example,https://b.example")
+    recorder.save("rows")
+
+    player = Tools(round_trip(recorder.tape))
+    assert player.tape.meta == {"job_id": "job"}
+    assert player.get_website_content("https://a.example") == "content of https://a.example"
+    assert player.qualify("https://a.example,https://b.example") == player.collected
+    assert player.save("rows") == "saved"
+
+    assert player.fetched == []
+    assert [row["URL"] for row in player.collected] == ["https://a.example", "https://b.example"]
+    assert player.saved == ["rows"]
+    assert player.tape.stats()["unused"] == 0
+
+
+def test_async_tools_replay_calls_recorded_by_blocking_ones(tmp_path):
+    recorder = Tools(Tape.recorder(str(tmp_path / "job.jsonl.gz")))
+    recorder.get_website_content("https://a.example")
+
+    player = Tools(round_trip(recorder.tape))
+    assert asyncio.run(player.aget_website_content("https://a.example")) == "content of https://a.example"
+    assert player.fetched == []
+
+
+def test_unmatched_call_gets_next_recorded_one_unless_strict(tmp_path):
+    recorder = Tools(Tape.recorder(str(tmp_path / "job.jsonl.gz")))
+    recorder.get_website_content("https://a.example")
+    recorder.tape.close()
+
+    player = Tools(Tape.player(recorder.tape.path))
+    assert player.get_website_content("https://changed.example") == "content of https://a.example"
+    assert player.tape.stats()["out_of_order"] == 1
+    with pytest.raises(ReplayMiss):
+        player.get_website_content("https://a.example")
+
+    with pytest.raises(ReplayMiss):
+        Tools(Tape.player(recorder.tape.path, strict=True)).get_website_content("https://changed.example")
+
+
+def test_model_calls_are_nested_only_inside_their_own_tool_call():
+    tape = Tape.recorder("unused.jsonl.gz")
+    inside_tool = threading.Event()
+    top_level_done = threading.Event()
+
+    def tool_call():
+        with tape.call():
+            inside_tool.set()
+            # A worker the tool hands scoring to runs in the tool call's context
+            worker = threading.Thread(target=bind_job(tape.record), args=("llm", "Lead Scorer", "k1", "7", 0.1))
+            worker.start()
+            worker.join()
+            top_level_done.wait(5)
+
+    def top_level_call():
+        inside_tool.wait(5)
+        tape.record("llm", "Query Analyzer", "k2", "keywords", 0.1)
+        top_level_done.set()
+
+    threads = [threading.Thread(target=tool_call), threading.Thread(target=top_level_call)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    nested = {entry["name"]: entry.get("nested", False) for entry in tape.entries}
+    assert nested == {"Lead Scorer": True, "Query Analyzer": False}
+
+
+def test_function_calling_crew_replays_from_a_recording(tmp_path, function_calling_llm):
+    class UnreachableLLM(function_calling_llm):
+        def call(self, messages, **kwargs):
+            raise AssertionError("a replayed job must not call the model")
+
+    searches = []
+
+    @tool("Search URLs")
+    def search_urls(query: str) -> str:
+        """Search the web and return matching agency URLs"""
+        searches.append(query)
+        return "https://agency.example"
+
+    def run(inner, tape):
+        llm = CachedLLM(model="gpt-4o-mini", inner=inner, tracker=UsageTracker(), tape=tape, job_id="job")
+        analyzer = Agent(role="Query Analyzer", goal="Find agencies", backstory="Researcher", tools=[search_urls],
+                         llm=llm)
+        task = Task(description="Find influencer agencies in London", expected_output="Agencies", agent=analyzer)
+        return Crew(agents=[analyzer], tasks=[task]).kickoff().raw
+
+    recording = Tape.recorder(str(tmp_path / "crew.jsonl.gz"))
+    recorded_output = run(function_calling_llm(model="gpt-4o-mini"), recording)
+    assert recording.entries[0]["response_type"] == "tool_calls"
+
+    player = round_trip(recording, strict=True)
+    assert run(UnreachableLLM(model="gpt-4o-mini"), player) == recorded_output
+    assert searches == ["london", "london"]
+    assert player.stats()["replayed"] == 2
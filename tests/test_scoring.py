@@ -0,0 +1,45 @@
+from scoring import is_rate_limited, retry_after
+
+
+class RateLimitError(Exception):
+    """Same name as the litellm / openai exception"""
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status_code=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+def test_rate_limit_errors_are_recognised():
+    assert is_rate_limited(RateLimitError("slow down"))
+    assert is_rate_limited(ApiError("too many requests", status_code=429))
+    assert is_rate_limited(ApiError("too many requests", response=Response(429)))
+
+
+def test_wrapped_rate_limit_error_is_recognised():
+    try:
+        try:
+            raise ApiError("quota", status_code=429)
+        except ApiError as e:
+            raise RuntimeError("LLM call failed") from e
+    except RuntimeError as wrapped:
+        assert is_rate_limited(wrapped)
+
+
+def test_errors_merely_mentioning_429_are_not_rate_limits():
+    assert not is_rate_limited(TimeoutError("Request timed out after 4290 ms"))
+    assert not is_rate_limited(ValueError("Bad URL https://example.com/page/429"))
+    assert not is_rate_limited(ApiError("server error", status_code=500))
+
+
+def test_retry_after_reads_the_response_header():
+    assert retry_after(ApiError("slow down", response=Response(429, {"retry-after": "2.5"}))) == 2.5
+    assert retry_after(ApiError("slow down")) is None
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+from async_fetcher import AsyncBrowser
+from search_providers import GoogleProvider, SearchHarvester
+
+
+class FakeGoogle(GoogleProvider):
+    """GoogleProvider serving canned results pages, noting the thread and lock state of each render"""
+
+    def __init__(self, pages, **kwargs):
+        super().__init__(get_driver=None, readiness=None, **kwargs)
+        self.pages = pages
+        self.renders = []
+
+    def page(self, query, page_index):
+        locked = self.browser_lock.locked() if self.browser_lock is not None else None
+        self.renders.append((threading.current_thread().name, locked))
+        return self.pages[page_index] if page_index < len(self.pages) else []
+
+
+def results(*urls):
+    return [{"url": url, "title": url} for url in urls]
+
+
+def test_google_pages_render_on_browser_threads_and_release_the_driver():
+    browser = AsyncBrowser(max_concurrency=1)
+    releases = []
+    try:
+        google = FakeGoogle([results("https://a.example")], browser=browser, browser_lock=threading.Lock(),
+                            release=lambda: releases.append(threading.current_thread().name))
+        assert asyncio.run(google.apage("agencies", 0)) == results("https://a.example")
+    finally:
+        browser.close()
+    thread, locked = google.renders[0]
+    assert thread.startswith("async-browser")
+    assert locked
+    assert releases == [thread]
+
+
+def test_aharvest_accepts_on_worker_threads_like_harvest():
+    pages = [results("https://a.example", "https://b.example", "https://a.example/about"),
+             results("https://c.example")]
+    seen_on = []
+
+    def accept(result):
+        seen_on.append(threading.current_thread() is threading.main_thread())
+        return None if "b.example" in result["url"] else result
+
+    async def collect(harvester):
+        return [result async for result in harvester.aharvest("agencies", accept=accept)]
+
+    harvester = SearchHarvester([FakeGoogle(pages)], max_pages=3, blacklist=[])
+    urls = [result["url"] for result in asyncio.run(collect(harvester))]
+    assert urls == ["https://a.example", "https://c.example"]
+    assert seen_on and not any(seen_on)
+
+    sync_urls = [result["url"] for result in SearchHarvester([FakeGoogle(pages)], max_pages=3, blacklist=[])
+                 .harvest("agencies", accept=lambda result: None if "b.example" in result["url"] else result)]
+    assert sync_urls == urls
+    stats = harvester.stats()
+    assert (stats["rejected"], stats["yielded"], stats["duplicates"]) == (1, 2, 1)
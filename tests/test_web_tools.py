@@ -0,0 +1,79 @@
+import csv
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from csv_stream import StreamingCsvWriter
+from driver_pool import DriverPool
+from lead_store import DomainClaims, LeadStore
+from qualification import normalize_url
+from web_tools import CSV_FIELDNAMES, WebTools
+
+
+@pytest.fixture
+def tools_for(tmp_path, monkeypatch):
+    # Default caches are created relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    def build(csv_writer=None):
+        return WebTools(pool=DriverPool(min_size=0), csv_writer=csv_writer,
+                        lead_store=LeadStore(path=str(tmp_path / "leads.sqlite3")))
+
+    return build
+
+
+def read_urls(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["URL"] for row in csv.DictReader(f)]
+
+
+def test_saves_append_to_the_job_csv_until_the_job_finalizes_it(tmp_path, tools_for):
+    output_file = str(tmp_path / "downloads" / "agencies_leads_1.csv")
+    writer = StreamingCsvWriter(output_file, CSV_FIELDNAMES, key_func=normalize_url)
+    tools = tools_for(csv_writer=writer)
+
+    tools.save_to_csv_file({"URL": "https://a.example", "Email": "hi@a.example"}, output_file)
+    tools.save_to_csv_file([{"URL": "https://b.example"}], output_file)
+    # Rows researched after a save are still streamed
+    tools._stream_prospect({"URL": "https://c.example"})
+
+    assert not writer.finalized
+    assert writer.finalize()
+    assert read_urls(output_file) == ["https://a.example", "https://b.example", "https://c.example"]
+
+
+def test_saves_to_another_file_keep_the_rows_it_already_holds(tmp_path, tools_for):
+    output_file = str(tmp_path / "downloads" / "agencies_leads_2.csv")
+    tools = tools_for()
+
+    tools.save_to_csv_file({"URL": "https://a.example", "Phone": "0161 496 0789"}, output_file)
+    tools.save_to_csv_file({"URL": "https://b.example"}, output_file)
+    tools.save_to_csv_file({"URL": "https://a.example/", "Email": "hi@a.example"}, output_file)
+
+    with open(output_file, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["URL"] for row in rows] == ["https://a.example/", "https://b.example"]
+    assert (rows[0]["Phone"], rows[0]["Email"], rows[0]["Search Query"]) == ("0161 496 0789", "hi@a.example",
+                                                                           "agencies")
+
+
+def test_no_driver_is_checked_out_after_cleanup(tools_for):
+    tools = tools_for()
+    tools.cleanup()
+    with pytest.raises(RuntimeError):
+        tools.driver
+    assert tools.pool.stats()["acquired"] == 0
+
+
+def test_a_domain_claimed_by_another_query_is_not_researched(tools_for, monkeypatch):
+    tools = tools_for()
+    tools.claims, tools.job_id = DomainClaims(), "query-b"
+    loaded = []
+    monkeypatch.setattr(tools, "_load_page", lambda url, **kwargs: loaded.append(url))
+    # Passed the search-time check, then another query claimed it first
+    assert tools._accept_result({"url": "https://a.example"}) is not None
+    tools.claims.claim("https://a.example/", "query-a")
+
+    assert tools.extract_page_data("https://a.example") is None
+    assert loaded == []
@@ -1,37 +1,95 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from termcolor import colored
+from logging_setup import get_logger
 from langchain.tools import Tool
-import time
+from driver_pool import get_default_pool
+from page_readiness import get_default_readiness
+from http_fetcher import get_default_fetcher
+from async_fetcher import AsyncHttpFetcher, AsyncTieredFetcher, get_default_async_fetcher
+from qualification import QUALIFY_CONCURRENCY, ExtractionFailed, qualify_prospect, qualify_prospects, aqualify_prospects, merge_prospect_rows, normalize_url, prospect_row, parse_url_list
+from page_extraction import dedupe_contact_info, has_contact_details, extract_content, extract_contacts
+from contact_probe import ContactProber, get_default_prober
+from csv_stream import StreamingCsvWriter
+from lead_store import FRESH, STALE, get_default_lead_store, normalize_domain
+from scoring import BatchScorer
+from search_providers import SEARCH_RESULTS, SearchHarvester, build_providers, parse_search_input
+from metrics import timed
+from replay import recorded
+import threading
+import asyncio
 import csv
 import os
 
+logger = get_logger(__name__)
+
+# Columns written by save_to_csv_file
+CSV_FIELDNAMES = [
+    "Search Query",
+    "Company Name",
+    "URL",
+    "Primary Services",
+    "AI Mentions",
+    "Decision Makers",
+    "Email",
+    "Phone",
+    "LinkedIn",
+    "Instagram",
+    "Physical Address",
+    "AI Interest Score",
+    "Qualification Notes"
+]
+
 class WebTools:
-    def __init__(self):
-        print(colored("Setting up Chrome WebDriver...", "cyan"))
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.set_page_load_timeout(30)
-            print(colored("Chrome WebDriver initialized successfully", "green"))
-            
-        except Exception as e:
-            print(colored(f"Error initializing Chrome WebDriver: {str(e)}", "red"))
-            raise
+    def __init__(self, pool=None, qualify_concurrency=QUALIFY_CONCURRENCY, readiness=None, fetcher=None, prober=None,
+                 csv_writer=None, lead_store=None, job_id=None, claims=None, tape=None, async_fetcher=None):
+        self.pool = pool or get_default_pool()
+        self.readiness = readiness or get_default_readiness()
+        self.fetcher = fetcher or get_default_fetcher()
+        # Used by the async tools (asearch_urls, aextract_page_data, ...); one built here for a custom fetcher
+        # shares the default render threads and has its HTTP client closed by acleanup
+        self._owns_async_fetcher = async_fetcher is None and fetcher is not None
+        if async_fetcher is not None:
+            self.async_fetcher = async_fetcher
+        elif fetcher is not None:
+            self.async_fetcher = AsyncTieredFetcher(self.fetcher, http=AsyncHttpFetcher(
+                timeout=fetcher.http.timeout, scheduler=fetcher.http.scheduler, retries=fetcher.http.retries))
+        else:
+            self.async_fetcher = get_default_async_fetcher()
+        self.qualify_concurrency = qualify_concurrency
+        self.qualified_prospects = []
+        self._driver = None
+        self._closed = False
+        self._browser_lock = threading.Lock()
+        self._snapshots = {}
+        self.prober = prober or (ContactProber(self.fetcher.http, async_http=self.async_fetcher.http) if fetcher
+                                 else get_default_prober())
+        # Prospects are appended here as soon as they are researched
+        self.csv_writer = csv_writer
+        # Prospects researched by earlier jobs
+        self.leads = lead_store or get_default_lead_store()
+        self.job_id = job_id
+        self._reused_domains = set()
+        # Domains claimed by the other jobs of a batch
+        self.claims = claims
+        # Records this job's tool calls, or answers them from a recording
+        self.tape = tape
+        # Paginated search over the configured providers
+        self.search = SearchHarvester(build_providers(
+            get_driver=lambda: self.driver,
+            readiness=self.readiness,
+            http=self.fetcher.http,
+            async_http=self.async_fetcher.http,
+            browser=self.async_fetcher.browser,
+            browser_lock=self._browser_lock,
+            release=self._release_driver
+        ))
+        # Model and search query used by score_prospects, set with configure_scoring
+        self.scoring_llm = None
+        self.search_query = ""
             
         self.tools = [
             Tool(
                 name="search_urls",
                 func=self.search_urls,
-                description="Searches the web for URLs related to a query"
+                description="Searches the web for agency websites. Pass a JSON object like {\"query\": \"...\", \"num_results\": 10}; results are paged through until that many new agencies are found"
             ),
             Tool(
                 name="get_website_content",
@@ -43,6 +101,21 @@ class WebTools:
                 func=self.extract_contact_info,
                 description="Extracts contact information from the website"
             ),
+            Tool(
+                name="extract_page_data",
+                func=self.extract_page_data,
+                description="Loads a website once and returns its content (services, about, clients, AI/enterprise mentions) and contact information together"
+            ),
+            Tool(
+                name="qualify_prospects",
+                func=self.qualify_prospects,
+                description="Researches many prospect URLs in parallel (pass a JSON list of URLs) and returns their contact details and website content"
+            ),
+            Tool(
+                name="score_prospects",
+                func=self.score_prospects,
+                description="Scores many researched prospects together (pass a JSON list of URLs) and returns each one's Company Name, Decision Makers, AI Interest Score and Qualification Notes"
+            ),
             Tool(
                 name="save_to_csv_file",
                 func=self.save_to_csv_file,
@@ -50,265 +123,417 @@ class WebTools:
             )
         ]
         
-    def search_urls(self, query):
-        """Search for URLs related to the query"""
+    @property
+    def driver(self):
+        """Chrome driver checked out of the pool on first use"""
+        if self._closed:
+            # e.g. a contact page still loading after the prober stopped early
+            raise RuntimeError("WebTools was cleaned up; no further pages are rendered")
+        if self._driver is None:
+            try:
+                self._driver = self.pool.acquire()
+            except Exception as e:
+                logger.error(f"Error acquiring Chrome WebDriver: {str(e)}")
+                raise
+        return self._driver
+        
+    @timed("tool")
+    @recorded()
+    def search_urls(self, query, num_results=None):
+        """Search for agency websites, paging through results until ``num_results`` new candidates are found"""
         try:
-            print(colored(f"Searching for: {query}", "yellow"))
-            
-            # Use real web search
-            self.driver.get(f"https://www.google.com/search?q={query}")
-            time.sleep(2)  # Allow time for results to load
+            query, num_results = parse_search_input(query, num_results)
+            logger.info(f"Searching for: {query}")
+            results = self.search.search(query, num_results or SEARCH_RESULTS, accept=self._accept_result)
+            logger.success(f"Found {len(results)} agency websites")
+            return results
             
-            # Extract search results
-            results = []
-            elements = self.driver.find_elements(By.CSS_SELECTOR, "div.g")
+        except Exception as e:
+            logger.error(f"Error searching URLs: {str(e)}")
+            return []
             
-            for element in elements[:5]:  # Get first 5 results
-                try:
-                    title_elem = element.find_element(By.CSS_SELECTOR, "h3")
-                    link_elem = element.find_element(By.CSS_SELECTOR, "a")
-                    snippet_elem = element.find_element(By.CSS_SELECTOR, "div.VwiC3b")
-                    
-                    result = {
-                        "url": link_elem.get_attribute("href"),
-                        "title": title_elem.text,
-                        "snippet": snippet_elem.text
-                    }
-                    
-                    # Filter out unwanted results
-                    if any(x in result["url"].lower() for x in ["linkedin", "facebook", "twitter", "instagram", "youtube"]):
-                        continue
-                        
-                    results.append(result)
-                except Exception as e:
-                    print(colored(f"Error extracting result: {str(e)}", "red"))
-                    continue
-            
-            print(colored(f"Found {len(results)} agency websites", "green"))
+    @timed("tool")
+    @recorded(name="search_urls")
+    async def asearch_urls(self, query, num_results=None):
+        """``search_urls`` for coroutines; result pages are fetched with the async HTTP client"""
+        try:
+            query, num_results = parse_search_input(query, num_results)
+            logger.info(f"Searching for: {query}")
+            results = await self.search.asearch(query, num_results or SEARCH_RESULTS, accept=self._accept_result)
+            logger.success(f"Found {len(results)} agency websites")
             return results
             
         except Exception as e:
-            print(colored(f"Error searching URLs: {str(e)}", "red"))
+            logger.error(f"Error searching URLs: {str(e)}")
             return []
             
-    def get_website_content(self, url):
-        """Get relevant content from a website"""
+    def _accept_result(self, result):
+        """Drop results another batch query or a recent job already researched; flag older leads for a refresh"""
+        if self.claims is not None and self.claims.claimed_by_other(result["url"], self.job_id):
+            logger.info(f"Skipping {result['url']} (researched by another query in this batch)")
+            return None
+        if self.leads is None:
+            return result
+        state, lead = self.leads.classify(result["url"])
+        if lead is not None and self.job_id is not None and lead.last_job == self.job_id:
+            # Found earlier in this same job
+            state = None
+        if state == FRESH:
+            logger.info(f"Skipping known lead {result['url']} (researched {lead.age_days:.0f} days ago)")
+            return None
+        if state == STALE:
+            result["known_lead"] = True
+            result["last_researched_days_ago"] = round(lead.age_days)
+        return result
+            
+    def _reuse_lead(self, url):
+        """Stored lead for ``url`` if an earlier job researched it recently enough, else None"""
+        if self.leads is None:
+            return None
+        state, lead = self.leads.classify(url)
+        if state != FRESH or (self.job_id is not None and lead.last_job == self.job_id):
+            return None
+        logger.info(f"Reusing stored lead for {url} (researched {lead.age_days:.0f} days ago)")
+        self._reused_domains.add(lead.domain)
+        return lead
+            
+    def _reuse_leads(self, urls):
+        """Rows of the stored leads reused for ``urls``, by URL, each streamed to the CSV"""
+        reused = {}
+        for url in urls:
+            lead = self._reuse_lead(url)
+            if lead is not None:
+                reused[url] = {**lead.row, "URL": url}
+                self._stream_prospect(reused[url])
+        return reused
+            
+    def _record_lead(self, url, row, page_data=None):
+        """Save a researched prospect to the lead store, noting companies already known under another domain"""
+        if self.leads is None or normalize_domain(url) in self._reused_domains:
+            return row
+        duplicate = self.leads.find_by_contacts(
+            emails=[e.strip() for e in (row.get("Email") or "").split(",") if e.strip()],
+            phones=[p.strip() for p in (row.get("Phone") or "").split(",") if p.strip()],
+            exclude_domain=normalize_domain(url)
+        )
+        if duplicate is not None and not row.get("Qualification Notes"):
+            row["Qualification Notes"] = f"Shares contact details with known lead {duplicate.url}"
+        self.leads.upsert(url, row, page_data=page_data, job_id=self.job_id)
+        return row
+            
+    def _load_page(self, url, selector=None, force_browser=False):
+        """Load a page once per WebTools; later calls reuse the same snapshot.
+
+        Pages go through the tiered fetcher (cache, plain HTTP, then Chrome).
+        A forced browser render replaces the remembered snapshot.
+        """
+        key = normalize_url(url)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and (not force_browser or snapshot.tier == "browser"):
+            return snapshot
+        snapshot = self.fetcher.load(
+            url, lambda: self.driver, self.readiness,
+            selector=selector, force_browser=force_browser, browser_lock=self._browser_lock
+        )
+        self._snapshots[key] = snapshot
+        return snapshot
+            
+    def _visit_contact_page(self, contact_url):
+        """Load one candidate contact page and extract its contact details"""
+        logger.info(f"Loading contact page: {contact_url}")
+        snapshot = self._load_page(contact_url)
+        if not snapshot.ok:
+            logger.info(f"Skipping {contact_url} (HTTP {snapshot.status})")
+            return None
+        
+        found = extract_contacts(snapshot)
+        
+        # Static HTML found nothing useful: render the page in Chrome and try again
+        if snapshot.tier != "browser" and not has_contact_details(found):
+            self.fetcher.record_empty_escalation()
+            snapshot = self._load_page(contact_url, force_browser=True)
+            found = extract_contacts(snapshot)
+        return found
+            
+    async def _aload_page(self, url, selector=None, force_browser=False):
+        """``_load_page`` for coroutines, sharing the same remembered snapshots"""
+        key = normalize_url(url)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and (not force_browser or snapshot.tier == "browser"):
+            return snapshot
+        # The driver goes back to the pool after each render, so tasks waiting on render threads never
+        # hold a driver that another task needs
+        snapshot = await self.async_fetcher.load(
+            url, lambda: self.driver, self.readiness,
+            selector=selector, force_browser=force_browser, browser_lock=self._browser_lock,
+            release=self._release_driver
+        )
+        self._snapshots[key] = snapshot
+        return snapshot
+            
+    async def _avisit_contact_page(self, contact_url):
+        """``_visit_contact_page`` for coroutines"""
+        logger.info(f"Loading contact page: {contact_url}")
+        snapshot = await self._aload_page(contact_url)
+        if not snapshot.ok:
+            logger.info(f"Skipping {contact_url} (HTTP {snapshot.status})")
+            return None
+        
+        found = extract_contacts(snapshot)
+        
+        if snapshot.tier != "browser" and not has_contact_details(found):
+            self.async_fetcher.record_empty_escalation()
+            snapshot = await self._aload_page(contact_url, force_browser=True)
+            found = extract_contacts(snapshot)
+        return found
+            
+    @timed("tool")
+    @recorded(apply="_stream_page_data")
+    def extract_page_data(self, url):
+        """Load a website once and extract its content and contact information together"""
         try:
-            print(colored(f"Analyzing content for: {url}", "yellow"))
-            print(colored(f"Loading URL: {url}", "cyan"))
-            
-            self.driver.get(url)
-            time.sleep(2)  # Allow time for dynamic content to load
-            
-            # Extract text content
-            body_text = self.driver.find_element(By.TAG_NAME, "body").text.lower()
-            
-            # Extract basic information
-            content = {
-                "about": "",
-                "services": "",
-                "clients": "",
-                "has_ai_mention": False,
-                "has_enterprise": False
+            logger.info(f"Extracting page data from: {url}")
+            
+            lead = self._reuse_lead(url)
+            if lead is not None and lead.page_data:
+                self._stream_prospect(prospect_row(url, lead.page_data))
+                return lead.page_data
+            
+            if self.claims is not None and not self.claims.claim(url, self.job_id):
+                # Claimed since the search; the other query researches and saves it
+                logger.info(f"Skipping {url} (being researched by another query in this batch)")
+                return None
+            
+            # The homepage is loaded once and every extractor runs against the same snapshot
+            homepage = self._load_page(url)
+            content = extract_content(homepage)
+            
+            # Contact pages are probed concurrently until the required fields are found
+            contact_info = self.prober.probe(url, homepage, self._visit_contact_page, extract_contacts(homepage))
+            
+            data = {
+                "url": url,
+                "content": content,
+                "contact_info": dedupe_contact_info(contact_info)
             }
+            self._stream_prospect(self._record_lead(url, prospect_row(url, data), page_data=data))
+            return data
             
-            # Look for about section
-            about_elements = self.driver.find_elements(By.CSS_SELECTOR, "section#about, div#about, section.about, div.about")
-            if about_elements:
-                content["about"] = about_elements[0].text
-                
-            # Look for services section
-            services_elements = self.driver.find_elements(By.CSS_SELECTOR, "section#services, div#services, section.services, div.services")
-            if services_elements:
-                content["services"] = services_elements[0].text
-                
-            # Look for client section
-            client_elements = self.driver.find_elements(By.CSS_SELECTOR, "section#clients, div#clients, section.clients, div.clients")
-            if client_elements:
-                content["clients"] = client_elements[0].text
-                
-            # Check for AI mentions
-            ai_keywords = ["artificial intelligence", "ai", "machine learning", "ml", "deep learning", "automation"]
-            content["has_ai_mention"] = any(keyword in body_text for keyword in ai_keywords)
+        except Exception as e:
+            logger.error(f"Error extracting page data: {str(e)}")
+            return None
             
-            # Check for enterprise focus
-            enterprise_keywords = ["enterprise", "corporate", "fortune 500", "large business", "multinational"]
-            content["has_enterprise"] = any(keyword in body_text for keyword in enterprise_keywords)
+    @timed("tool")
+    @recorded(apply="_stream_page_data", name="extract_page_data")
+    async def aextract_page_data(self, url):
+        """``extract_page_data`` for coroutines: pages load on the event loop, Chrome renders on a render thread"""
+        try:
+            logger.info(f"Extracting page data from: {url}")
+            
+            # Lead store lookups and CSV writes block, so they run on worker threads
+            lead = await asyncio.to_thread(self._reuse_lead, url)
+            if lead is not None and lead.page_data:
+                await asyncio.to_thread(self._stream_prospect, prospect_row(url, lead.page_data))
+                return lead.page_data
+            
+            if self.claims is not None and not self.claims.claim(url, self.job_id):
+                # Claimed since the search; the other query researches and saves it
+                logger.info(f"Skipping {url} (being researched by another query in this batch)")
+                return None
+            
+            homepage = await self._aload_page(url)
+            content = extract_content(homepage)
+            contact_info = await self.prober.aprobe(url, homepage, self._avisit_contact_page, extract_contacts(homepage))
+            
+            data = {
+                "url": url,
+                "content": content,
+                "contact_info": dedupe_contact_info(contact_info)
+            }
+            row = await asyncio.to_thread(self._record_lead, url, prospect_row(url, data), data)
+            await asyncio.to_thread(self._stream_prospect, row)
+            return data
             
-            return content
+        except Exception as e:
+            logger.error(f"Error extracting page data: {str(e)}")
+            return None
+            
+    @timed("tool")
+    @recorded()
+    def get_website_content(self, url):
+        """Get relevant content from a website"""
+        try:
+            logger.info(f"Analyzing content for: {url}")
+            return extract_content(self._load_page(url))
             
         except Exception as e:
-            print(colored(f"Error getting website content: {str(e)}", "red"))
+            logger.error(f"Error getting website content: {str(e)}")
             return None
             
+    @timed("tool")
+    @recorded(name="get_website_content")
+    async def aget_website_content(self, url):
+        """``get_website_content`` for coroutines"""
+        try:
+            logger.info(f"Analyzing content for: {url}")
+            return extract_content(await self._aload_page(url))
+            
+        except Exception as e:
+            logger.error(f"Error getting website content: {str(e)}")
+            return None
+            
+    @timed("tool")
     def extract_contact_info(self, url):
-        """Extract contact information from the website"""
+        """Extract contact information from the website (recorded and replayed through extract_page_data)"""
         try:
-            print(colored(f"Extracting contact info from: {url}", "yellow"))
-            
-            contact_info = {
-                "emails": [],
-                "phones": [],
-                "linkedin_profiles": [],
-                "instagram_profiles": [],
-                "physical_addresses": []
-            }
+            logger.info(f"Extracting contact info from: {url}")
+            data = self.extract_page_data(url)
+            return data["contact_info"] if data else None
             
-            # First try to find contact page link from homepage
-            print(colored(f"Loading homepage: {url}", "cyan"))
-            self.driver.get(url)
-            time.sleep(2)
-            
-            # Extract social media links from homepage first
-            # Look for links containing social media URLs, regardless of their text content
-            social_links = self.driver.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"], a[href*="instagram.com"]')
-            for link in social_links:
-                href = link.get_attribute("href")
-                if href:
-                    if "linkedin.com" in href:
-                        contact_info["linkedin_profiles"].append(href)
-                    elif "instagram.com" in href:
-                        contact_info["instagram_profiles"].append(href)
-            
-            # Also look for social media links in the footer specifically
-            footer_elements = self.driver.find_elements(By.CSS_SELECTOR, 'footer, .footer, [class*="footer"]')
-            for footer in footer_elements:
-                social_links = footer.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"], a[href*="instagram.com"]')
-                for link in social_links:
-                    href = link.get_attribute("href")
-                    if href:
-                        if "linkedin.com" in href:
-                            contact_info["linkedin_profiles"].append(href)
-                        elif "instagram.com" in href:
-                            contact_info["instagram_profiles"].append(href)
-            
-            # Look for contact page links with various common texts
-            contact_link = None
-            contact_texts = [
-                "contact", "contact us", "get in touch", "say hi", "reach out",
-                "talk to us", "connect", "let's talk", "write to us"
-            ]
-            
-            # Try finding link by text
-            for text in contact_texts:
-                try:
-                    # Try exact text
-                    elements = self.driver.find_elements(By.XPATH, f"//a[translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')='{text}']")
-                    if elements:
-                        contact_link = elements[0].get_attribute("href")
-                        break
-                        
-                    # Try contains text
-                    elements = self.driver.find_elements(By.XPATH, f"//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{text}')]")
-                    if elements:
-                        contact_link = elements[0].get_attribute("href")
-                        break
-                except:
-                    continue
-            
-            # If no link found by text, try common URLs
-            if not contact_link:
-                contact_urls = [
-                    f"{url}/contact",
-                    f"{url}/contact-us",
-                    f"{url}/get-in-touch",
-                    f"{url}/connect",
-                    f"{url}/about",
-                    f"{url}/about-us"
-                ]
-            else:
-                contact_urls = [contact_link]
-                
-            for contact_url in contact_urls:
-                try:
-                    print(colored(f"Loading contact page: {contact_url}", "cyan"))
-                    self.driver.get(contact_url)
-                    time.sleep(2)
-                    
-                    # Get page content
-                    page_text = self.driver.find_element(By.TAG_NAME, "body").text
-                    page_html = self.driver.page_source
-                    
-                    # Extract emails using common patterns
-                    import re
-                    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-                    found_emails = re.findall(email_pattern, page_text)
-                    contact_info["emails"].extend([e for e in found_emails if not any(x in e.lower() for x in ["example", "domain", "email"])])
-                    
-                    # Extract phone numbers (UK format)
-                    phone_pattern = r'(?:\+44|0)(?:[\s-]*\d){9,10}'
-                    found_phones = re.findall(phone_pattern, page_text)
-                    contact_info["phones"].extend(found_phones)
-                    
-                    # Extract social media profiles from contact page
-                    social_elements = self.driver.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"], a[href*="instagram.com"]')
-                    for elem in social_elements:
-                        href = elem.get_attribute("href")
-                        if href:
-                            if "linkedin.com" in href:
-                                contact_info["linkedin_profiles"].append(href)
-                            elif "instagram.com" in href:
-                                contact_info["instagram_profiles"].append(href)
-                    
-                    # Extract physical address
-                    # Look for common address containers
-                    address_elements = self.driver.find_elements(
-                        By.XPATH,
-                        "//*[contains(@class, 'address') or contains(@class, 'location') or contains(@class, 'contact-details')]"
-                    )
-                    
-                    if not address_elements:
-                        # Try finding paragraphs containing postal code patterns
-                        uk_postcode_pattern = r'[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}'
-                        paragraphs = self.driver.find_elements(By.TAG_NAME, "p")
-                        for p in paragraphs:
-                            text = p.text
-                            if re.search(uk_postcode_pattern, text):
-                                address_elements.append(p)
-                    
-                    for elem in address_elements:
-                        addr_text = elem.text.strip()
-                        if addr_text and len(addr_text) > 10:  # Basic validation to avoid too short strings
-                            contact_info["physical_addresses"].append(addr_text)
-                            
-                except Exception as e:
-                    print(colored(f"Error loading {contact_url}: {str(e)}", "red"))
-                    continue
-            
-            # Remove duplicates while preserving order
-            for key in contact_info:
-                contact_info[key] = list(dict.fromkeys(contact_info[key]))
-            
-            return contact_info
+        except Exception as e:
+            logger.error(f"Error extracting contact info: {str(e)}")
+            return None
+            
+    @timed("tool")
+    async def aextract_contact_info(self, url):
+        """``extract_contact_info`` for coroutines"""
+        try:
+            logger.info(f"Extracting contact info from: {url}")
+            data = await self.aextract_page_data(url)
+            return data["contact_info"] if data else None
             
         except Exception as e:
-            print(colored(f"Error extracting contact info: {str(e)}", "red"))
+            logger.error(f"Error extracting contact info: {str(e)}")
             return None
             
+    @timed("tool")
+    @recorded(apply="_collect_prospects")
+    def qualify_prospects(self, urls):
+        """Collect contact info and website content for many prospects concurrently"""
+        try:
+            # Prospects researched recently by another job are taken from the lead store
+            urls = parse_url_list(urls)
+            reused = self._reuse_leads(urls)
+            
+            researched = qualify_prospects(
+                [url for url in urls if url not in reused],
+                lambda: WebTools(
+                    pool=self.pool,
+                    qualify_concurrency=1,
+                    readiness=self.readiness,
+                    fetcher=self.fetcher,
+                    async_fetcher=self.async_fetcher,
+                    prober=self.prober,
+                    lead_store=self.leads,
+                    job_id=self.job_id,
+                    claims=self.claims
+                ),
+                max_workers=self.qualify_concurrency,
+                on_result=self._stream_prospect
+            )
+            researched = iter(researched)
+            results = [reused[url] if url in reused else next(researched) for url in urls]
+            self.qualified_prospects.extend(results)
+            return results
+        except Exception as e:
+            logger.error(f"Error qualifying prospects: {str(e)}")
+            return []
+            
+    @timed("tool")
+    @recorded(apply="_collect_prospects", name="qualify_prospects")
+    async def aqualify_prospects(self, urls):
+        """``qualify_prospects`` for coroutines: prospects are researched as concurrent tasks instead of threads"""
+        try:
+            urls = parse_url_list(urls)
+            reused = await asyncio.to_thread(self._reuse_leads, urls)
+            
+            researched = await aqualify_prospects(
+                [url for url in urls if url not in reused],
+                lambda: WebTools(
+                    pool=self.pool,
+                    qualify_concurrency=1,
+                    readiness=self.readiness,
+                    fetcher=self.fetcher,
+                    async_fetcher=self.async_fetcher,
+                    prober=self.prober,
+                    lead_store=self.leads,
+                    job_id=self.job_id,
+                    claims=self.claims
+                ),
+                max_workers=self.qualify_concurrency,
+                on_result=self._stream_prospect
+            )
+            researched = iter(researched)
+            results = [reused[url] if url in reused else next(researched) for url in urls]
+            self.qualified_prospects.extend(results)
+            return results
+        except Exception as e:
+            logger.error(f"Error qualifying prospects: {str(e)}")
+            return []
+            
+    def configure_scoring(self, llm, search_query=""):
+        """Model used to score prospects in batches"""
+        self.scoring_llm = llm
+        self.search_query = search_query
+            
+    @timed("tool")
+    @recorded(apply="_collect_prospects")
+    def score_prospects(self, urls):
+        """Score researched prospects in batched model calls, validated against the CSV columns"""
+        try:
+            if self.scoring_llm is None:
+                raise ValueError("No scoring model configured")
+            researched = {normalize_url(p.get("URL")): p for p in self.qualified_prospects if not p.get("Error")}
+            prospects, failed = [], []
+            for url in parse_url_list(urls) or list(researched):
+                # Prospects not qualified in parallel are loaded from this job's page snapshots
+                try:
+                    prospects.append(researched.get(normalize_url(url)) or qualify_prospect(url, self))
+                except ExtractionFailed as e:
+                    # Unreadable sites are reported, not scored as prospects without AI mentions
+                    failed.append({"URL": url, "Error": str(e)})
+            
+            scorer = BatchScorer(self.scoring_llm, self.search_query, fieldnames=CSV_FIELDNAMES)
+            rows = scorer.score(prospects) + failed
+            # save_to_csv_file fills fields the agent left blank from these rows
+            self._collect_prospects(rows)
+            return rows
+        except Exception as e:
+            logger.error(f"Error scoring prospects: {str(e)}")
+            return []
+            
+    async def ascore_prospects(self, urls):
+        """``score_prospects`` for coroutines; the model client blocks, so scoring runs on a worker thread"""
+        return await asyncio.to_thread(self.score_prospects, urls)
+            
+    def _stream_prospect(self, row):
+        """Append a researched prospect to the streaming CSV, if one is attached"""
+        if self.csv_writer is not None and not self.csv_writer.finalized:
+            self.csv_writer.write(row)
+            
+    def _collect_prospects(self, rows):
+        """Keep researched or scored rows for save_to_csv_file and stream the ones without errors"""
+        self.qualified_prospects.extend(rows)
+        for row in rows:
+            if not row.get("Error"):
+                self._stream_prospect(row)
+            
+    def _stream_page_data(self, data):
+        """Stream a prospect replayed from extract_page_data"""
+        if data:
+            self._stream_prospect(prospect_row(data["url"], data))
+            
+    @timed("tool")
+    @recorded(live=True)
     def save_to_csv_file(self, data, output_file):
         """Save lead data to CSV file"""
         try:
-            print(colored(f"Saving data to: {output_file}", "cyan"))
+            logger.info(f"Saving data to: {output_file}")
             
             # Ensure output directory exists
             os.makedirs(os.path.dirname(output_file), exist_ok=True)
             
-            # Define fieldnames based on expected data structure
-            fieldnames = [
-                "Search Query",
-                "Company Name",
-                "URL", 
-                "Primary Services",
-                "AI Mentions",
-                "Decision Makers",
-                "Email",
-                "Phone",
-                "LinkedIn",
-                "Instagram",
-                "Physical Address",
-                "AI Interest Score",
-                "Qualification Notes"
-            ]
+            fieldnames = CSV_FIELDNAMES
             
             # Extract search query from the output file name
             filename = os.path.basename(output_file)
@@ -316,7 +541,7 @@ class WebTools:
             search_query = filename.split('_leads_')[0]
             # Handle multi-word queries by replacing underscores with spaces
             search_query = ' '.join(word for word in search_query.split('_') if word)
-            print(colored(f"Using search query: {search_query}", "cyan"))
+            logger.info(f"Using search query: {search_query}")
             
             # Convert single dictionary to list if necessary
             if isinstance(data, dict):
@@ -348,30 +573,66 @@ class WebTools:
             elif not isinstance(data, list):
                 raise ValueError("Data must be a dictionary or list of dictionaries")
             
-            # Write data to CSV
-            with open(output_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in data:
-                    row_data = dict(row)  # Create a copy of the row
-                    # Ensure search query is included and matches the filename
-                    if "Search Query" not in row_data or not row_data["Search Query"]:
-                        row_data["Search Query"] = search_query
-                    writer.writerow(row_data)
+            # Fill in details gathered by parallel qualification workers
+            if self.qualified_prospects:
+                data = merge_prospect_rows(data, self.qualified_prospects, fieldnames)
+            
+            # Append to the job's streaming CSV (merged with rows already streamed for the same URL); the
+            # job finalizes it, so the agent can save one prospect at a time. Any other file is merged with
+            # the rows it already holds and atomically moved into place.
+            writer = self.csv_writer
+            owned = writer is None or writer.finalized or os.path.abspath(writer.path) != os.path.abspath(output_file)
+            if owned:
+                writer = StreamingCsvWriter(output_file, fieldnames, key_func=normalize_url)
+                if os.path.exists(output_file):
+                    with open(output_file, newline="", encoding="utf-8") as f:
+                        writer.write_rows(list(csv.DictReader(f)))
+            for row in data:
+                row_data = dict(row)  # Create a copy of the row
+                # Ensure search query is included and matches the filename
+                if "Search Query" not in row_data or not row_data["Search Query"]:
+                    row_data["Search Query"] = search_query
+                writer.write(self._record_lead(row_data.get("URL"), row_data) if row_data.get("URL") else row_data)
+            if owned:
+                writer.finalize()
                 
-            print(colored("Data saved successfully", "green"))
+            logger.success("Data saved successfully")
             return True
             
         except Exception as e:
             error_msg = f"Error saving to CSV: {str(e)}"
-            print(colored(error_msg, "red"))
+            logger.error(error_msg)
             raise ValueError(error_msg)
             
+    async def asave_to_csv_file(self, data, output_file):
+        """``save_to_csv_file`` for coroutines; the CSV and lead store are written on a worker thread"""
+        return await asyncio.to_thread(self.save_to_csv_file, data, output_file)
+            
+    def _release_driver(self):
+        if self._driver is not None:
+            logger.info("Returning Chrome WebDriver to pool...")
+            self.pool.release(self._driver)
+            self._driver = None
+            
     def cleanup(self):
-        """Clean up resources"""
+        """Return the driver to the pool and write the job's recording"""
         try:
-            print(colored("Closing Chrome WebDriver...", "cyan"))
-            if hasattr(self, 'driver'):
-                self.driver.quit()
+            # Page loads only check the driver out under the browser lock, so a contact page still rendering
+            # after the prober stopped early finishes first and none start afterwards
+            with self._browser_lock:
+                self._closed = True
+                self._release_driver()
+            self._snapshots.clear()
+            if self.tape is not None:
+                self.tape.close()
         except Exception as e:
-            print(colored(f"Error during cleanup: {str(e)}", "red")) 
\ No newline at end of file
+            logger.error(f"Error during cleanup: {str(e)}")
+            
+    async def acleanup(self):
+        """``cleanup`` for coroutines; returning a driver and writing a recording block, so they run on a thread"""
+        if self._driver is None and self.tape is None:
+            self.cleanup()
+        else:
+            await asyncio.to_thread(self.cleanup)
+        if self._owns_async_fetcher:
+            await self.async_fetcher.aclose()